@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 from wallet import Wallet
 from transaction import Transaction
+from block import InclusionProof, header_hash, verify_inclusion_proof
 
 # ---------------- CONFIG ----------------
 # SERVER_URL = "https://he-future-proof-digital-wallet.onrender.com"
@@ -76,6 +77,7 @@ def dashboard():
             "Create Transaction",
             "Mine Block",
             "View Blockchain",
+            "Verify Payment",
             "Verify Blockchain",
             "Logout"
         ]
@@ -116,17 +118,11 @@ def dashboard():
                 tx_hash = temp_tx.calculate_hash()
                 signature = st.session_state.wallet.sign(tx_hash)
 
-                payload = {
-                    "sender": st.session_state.wallet.get_address(),
-                    "receiver": receiver,
-                    "amount": amount,
-                    "timestamp": temp_tx.timestamp,
-                    "signature": [s.hex() for s in signature],
-                    "public_key": [
-                        (pk0.hex(), pk1.hex())
-                        for pk0, pk1 in st.session_state.wallet.public_key
-                    ]
-                }
+                payload = temp_tx.replace(
+                    signature=signature,
+                    public_key=st.session_state.wallet.get_verification_key(),
+                    scheme=st.session_state.wallet.scheme_id
+                ).to_dict()
 
                 r = requests.post(f"{SERVER_URL}/add_transaction", json=payload)
 
@@ -153,6 +149,28 @@ def dashboard():
                 st.write("Previous Hash:", block["previous_hash"])
                 st.write("Transactions:", block["transactions"])
 
+    # -------- VERIFY PAYMENT --------
+    elif choice == "Verify Payment":
+        txid = st.text_input("Transaction ID")
+
+        if st.button("Verify Payment"):
+            r = requests.get(f"{SERVER_URL}/proof/{txid}")
+            if r.status_code != 200:
+                st.error(r.json().get("error", "Transaction not found"))
+            else:
+                data = r.json()
+                header = data["header"]
+                proof = InclusionProof(**data["proof"])
+
+                # Checked locally: the proof against the header's root, and
+                # the header against the block hash
+                if (proof.txid == txid
+                        and verify_inclusion_proof(proof, header)
+                        and header_hash(header) == data["block_hash"]):
+                    st.success(f"Payment included in block {data['block_index']} ✔")
+                else:
+                    st.error("Inclusion proof invalid ❌")
+
     # -------- VERIFY --------
     elif choice == "Verify Blockchain":
         r = requests.get(f"{SERVER_URL}/verify")
@@ -0,0 +1,446 @@
+"""
+Microbenchmarks for the registered signature schemes.
+
+Every scheme in pqc_crypto.SCHEMES is measured for keygen, sign and
+verify throughput plus the bytes each signature and verification key
+adds to a transaction, so deployments can pick a scheme from numbers.
+
+Usage:
+    python benchmark.py                  # all schemes
+    python benchmark.py merkle wots      # selected schemes
+    python benchmark.py -n 50            # iterations per measurement
+    python benchmark.py --lamport-engine # Lamport sign/verify, old vs new
+    python benchmark.py --audit          # full-chain audit, serial vs parallel
+    python benchmark.py --startup        # import, load and first-request time
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from pqc_crypto import (
+    CHUNK_BYTES,
+    LEGACY_SCHEME,
+    SCHEMES,
+    generate_lamport_keypair,
+    get_scheme,
+    public_key_size,
+    sha256,
+    sign_lamport_message,
+    signature_size,
+    verify_lamport_signature
+)
+
+
+def ops_per_second(func, iterations, repeat=3):
+    """
+    Run func `iterations` times and return calls per second.
+    The best of `repeat` runs is kept to filter out scheduler noise.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(iterations):
+            func(i)
+        best = min(best, time.perf_counter() - start)
+    return iterations / best if best else float("inf")
+
+
+def benchmark_scheme(name, iterations=20):
+    """Measure keygen/sign/verify ops/sec and sizes for one scheme."""
+    scheme = get_scheme(name)
+
+    keygen = ops_per_second(lambda i: scheme.generate_keypair(), iterations, repeat=1)
+
+    # One-time schemes need a fresh key per signature; generate them
+    # up front so only signing is timed.
+    keys = [scheme.generate_keypair() for _ in range(iterations)]
+    if scheme.max_signatures(keys[0][0]) >= iterations:
+        keys = [keys[0]] * iterations
+    messages = [f"benchmark message {i}" for i in range(iterations)]
+
+    signatures = []
+    sign = ops_per_second(
+        lambda i: signatures.append(scheme.sign(messages[i], keys[i][0])),
+        iterations, repeat=1
+    )
+
+    verification_keys = [scheme.verification_key(pub) for _, pub in keys]
+    verify = ops_per_second(
+        lambda i: scheme.verify(messages[i], signatures[i], verification_keys[i]),
+        iterations
+    )
+    assert all(
+        scheme.verify(messages[i], signatures[i], verification_keys[i])
+        for i in range(iterations)
+    ), f"{name}: benchmark signatures failed to verify"
+
+    return {
+        "scheme": name,
+        "keygen_per_sec": keygen,
+        "sign_per_sec": sign,
+        "verify_per_sec": verify,
+        "signature_bytes": signature_size(signatures[0]),
+        "key_bytes": public_key_size(verification_keys[0]),
+    }
+
+
+def reference_sign(message, private_key):
+    """Original bit-by-bit Lamport signing loop, kept as the baseline."""
+    message_hash = sha256(message.encode())
+    signature = []
+    for i, bit in enumerate(message_hash):
+        for j in range(8):
+            bit_value = (bit >> (7 - j)) & 1
+            signature.append(private_key[i * 8 + j][bit_value])
+    return signature
+
+
+def reference_verify(message, signature, public_key):
+    """Original bit-by-bit Lamport verification loop, kept as the baseline."""
+    message_hash = sha256(message.encode())
+    sig_index = 0
+    for i, byte in enumerate(message_hash):
+        for j in range(8):
+            bit_value = (byte >> (7 - j)) & 1
+            if sha256(signature[sig_index]) != public_key[i * 8 + j][bit_value]:
+                return False
+            sig_index += 1
+    return True
+
+
+def as_pairs(flat_key):
+    """Convert a flat Lamport key into the original list of 256 pairs."""
+    return [
+        (flat_key[i:i + CHUNK_BYTES], flat_key[i + CHUNK_BYTES:i + 2 * CHUNK_BYTES])
+        for i in range(0, len(flat_key), 2 * CHUNK_BYTES)
+    ]
+
+
+def benchmark_lamport_engine(iterations=200):
+    """
+    Compare the original engine (nested bit loop over lists of pairs)
+    with the current one (bit table over flat buffers) on the same keys.
+    """
+    private_key, public_key = generate_lamport_keypair()
+    private_pairs, public_pairs = as_pairs(private_key), as_pairs(public_key)
+    messages = [f"engine message {i}" for i in range(iterations)]
+
+    engines = {
+        "before": (reference_sign, reference_verify, private_pairs, public_pairs),
+        "after": (sign_lamport_message, verify_lamport_signature,
+                  private_key, public_key),
+    }
+    signatures = {
+        label: [sign(m, priv) for m in messages]
+        for label, (sign, _, priv, _) in engines.items()
+    }
+    assert all(
+        b''.join(old) == new
+        for old, new in zip(signatures["before"], signatures["after"])
+    ), "engines disagree on signatures"
+
+    results = {}
+    for label, (sign, verify, priv, pub) in engines.items():
+        sigs = signatures[label]
+        results[label] = {
+            "sign_per_sec": ops_per_second(
+                lambda i: sign(messages[i], priv), iterations),
+            "verify_per_sec": ops_per_second(
+                lambda i: verify(messages[i], sigs[i], pub), iterations),
+        }
+    return results
+
+
+def print_engine_results(results):
+    print(f"{'engine':<10}{'sign/s':>12}{'verify/s':>12}")
+    print("-" * 34)
+    for label, r in results.items():
+        print(f"{label:<10}{r['sign_per_sec']:>12.1f}{r['verify_per_sec']:>12.1f}")
+    before, after = results["before"], results["after"]
+    print(f"{'speedup':<10}{after['sign_per_sec'] / before['sign_per_sec']:>11.2f}x"
+          f"{after['verify_per_sec'] / before['verify_per_sec']:>11.2f}x")
+
+
+def build_chain(blocks, transactions_per_block):
+    """Build a chain of signed blocks full of signed transactions."""
+    from blockchain import Blockchain
+    from transaction import Transaction
+    from wallet import Wallet
+
+    blockchain = Blockchain()
+    miner = Wallet(scheme="merkle", height=8)
+    for _ in range(blocks):
+        transactions = []
+        for _ in range(transactions_per_block):
+            wallet = Wallet()
+            tx = Transaction(wallet.get_address(), "receiver", 1, None, None)
+            transactions.append(tx.replace(
+                signature=wallet.sign(tx.txid),
+                public_key=wallet.get_verification_key(),
+                scheme=wallet.scheme_id
+            ))
+        blockchain.add_block(transactions, miner)
+    return blockchain
+
+
+def benchmark_audit(blocks=64, transactions_per_block=8):
+    """Time a full audit in-process and across the worker pool."""
+    from blockchain import audit_chain
+    from pqc_crypto import worker_count
+
+    chain = build_chain(blocks, transactions_per_block).chain
+    audit_chain(chain[:2], parallel=True)  # start the pool outside the timing
+
+    results = {"workers": worker_count()}
+    for label, parallel in (("serial", False), ("parallel", True)):
+        start = time.perf_counter()
+        report = audit_chain(chain, parallel=parallel)
+        results[label] = time.perf_counter() - start
+        assert report.valid, f"{label} audit failed: {report}"
+    return results
+
+
+def print_audit_results(results):
+    print(f"workers:  {results['workers']}")
+    print(f"serial:   {results['serial']:.3f}s")
+    print(f"parallel: {results['parallel']:.3f}s")
+    print(f"speedup:  {results['serial'] / results['parallel']:.2f}x")
+
+
+def best_time(func, repeat=3):
+    """Best wall-clock time of `repeat` calls to func."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_startup(blocks=64, transactions_per_block=8):
+    """
+    Time server-style startup on a saved chain: importing the core
+    modules, loading the chain, and being ready for a first request
+    (balances synced and the chain checked). "before" is the old path -
+    building a throwaway genesis block, an eager load and a full validation;
+    "after" is Blockchain.from_ledger with lazy bodies, the checkpoint
+    and a state snapshot at the tip.
+    """
+    from block import Block
+    from blockchain import Blockchain
+    from ledger import Ledger
+    from state import AccountState
+    from wallet import Wallet
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    import_time = best_time(lambda: subprocess.run(
+        [sys.executable, "-c", "import blockchain, ledger, state, keypool"],
+        cwd=here, check=True
+    ))
+    interpreter_time = best_time(lambda: subprocess.run(
+        [sys.executable, "-c", "pass"], check=True
+    ))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "blockchain.json")
+        chain = build_chain(blocks, transactions_per_block)
+        ledger = Ledger(path)
+        ledger.save_blockchain(chain)
+        state = AccountState()
+        state.sync(chain.chain)
+        ledger.save_snapshot(state.snapshot())
+
+        def load_before():
+            # Blockchain() used to generate a genesis wallet (full Lamport
+            # keygen) and sign a fresh genesis block, thrown away once the
+            # saved chain replaced it
+            genesis_wallet = Wallet(scheme=LEGACY_SCHEME)
+            blockchain = Blockchain([
+                Block(index=0, transactions=[], previous_hash="0").signed_by(genesis_wallet)
+            ])
+            ledger = Ledger(path)
+            blockchain.set_chain(ledger.load_blockchain())
+            return blockchain, ledger
+
+        def load_after():
+            ledger = Ledger(path)
+            return Blockchain.from_ledger(ledger), ledger
+
+        def ready_before():
+            # Balances came from SQLite; /verify re-validated everything
+            blockchain, _ = load_before()
+            blockchain.is_chain_valid(full=True)
+
+        def ready_after():
+            blockchain, ledger = load_after()
+            state = AccountState.from_snapshot(ledger.load_snapshot())
+            state.sync(blockchain.chain)
+            blockchain.is_chain_valid()
+
+        return {
+            "blocks": blocks,
+            "import": import_time - interpreter_time,
+            "before": {
+                "load": best_time(load_before),
+                "ready": best_time(ready_before),
+            },
+            "after": {
+                "load": best_time(load_after),
+                "ready": best_time(ready_after),
+            },
+        }
+
+
+def print_startup_results(results):
+    print(f"chain: {results['blocks']} blocks")
+    print(f"import (core modules): {results['import'] * 1000:.1f} ms")
+    print(f"{'path':<10}{'load ms':>12}{'ready ms':>12}")
+    print("-" * 34)
+    for label in ("before", "after"):
+        r = results[label]
+        print(f"{label:<10}{r['load'] * 1000:>12.1f}{r['ready'] * 1000:>12.1f}")
+
+
+def print_results(results):
+    header = (f"{'scheme':<16}{'keygen/s':>12}{'sign/s':>12}"
+              f"{'verify/s':>12}{'sig bytes':>12}{'key bytes':>12}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['scheme']:<16}{r['keygen_per_sec']:>12.1f}"
+              f"{r['sign_per_sec']:>12.1f}{r['verify_per_sec']:>12.1f}"
+              f"{r['signature_bytes']:>12}{r['key_bytes']:>12}")
+
+
+def benchmark_ledger_format(blocks=64, transactions_per_block=8):
+    """
+    Compare the old pretty-printed blockchain.json (hex signatures and
+    keys) with the binary block log: bytes on disk and full load time.
+    """
+    import json
+    from ledger import Ledger
+
+    chain = build_chain(blocks, transactions_per_block)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "old", "blockchain.json")
+        binary_path = os.path.join(tmp, "new", "blockchain.json")
+        os.makedirs(os.path.dirname(json_path))
+        with open(json_path, "w") as f:
+            json.dump([block.to_dict() for block in chain.chain], f, indent=4)
+        Ledger(binary_path).save_blockchain(chain)
+
+        results = {"blocks": blocks, "transactions": blocks * transactions_per_block}
+        for label, path, size in (
+                ("json", json_path, os.path.getsize(json_path)),
+                ("binary", binary_path, Ledger(binary_path).log.size())):
+            loaded = Ledger(path).load_blockchain()
+            assert [b.hash for b in loaded] == [b.hash for b in chain.chain]
+            results[label] = {
+                "bytes": size,
+                "load": best_time(lambda: Ledger(path).load_blockchain()),
+            }
+        return results
+
+
+def print_ledger_format_results(results):
+    print(f"chain: {results['blocks']} blocks, {results['transactions']} transactions")
+    print(f"{'format':<10}{'bytes':>12}{'load ms':>12}")
+    print("-" * 34)
+    for label in ("json", "binary"):
+        r = results[label]
+        print(f"{label:<10}{r['bytes']:>12}{r['load'] * 1000:>12.1f}")
+    before, after = results["json"], results["binary"]
+    print(f"{'ratio':<10}{before['bytes'] / after['bytes']:>11.2f}x"
+          f"{before['load'] / after['load']:>11.2f}x")
+
+
+def benchmark_chain_store(sizes=(16, 64), transactions_per_block=4):
+    """
+    Startup time and peak Python heap for loading a saved chain: an eager
+    list of decoded blocks vs the index-backed ChainView. The view's
+    cost should track the index, not the chain.
+    """
+    import tracemalloc
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    results = []
+    for blocks in sizes:
+        chain = build_chain(blocks, transactions_per_block)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blockchain.json")
+            Ledger(path).save_blockchain(chain)
+
+            row = {"blocks": blocks, "bytes": Ledger(path).log.size()}
+            for label, lazy in (("eager", False), ("view", True)):
+                def startup():
+                    blockchain = Blockchain.from_ledger(Ledger(path), lazy=lazy)
+                    assert blockchain.is_chain_valid()
+                    return blockchain
+
+                tracemalloc.start()
+                startup()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                row[label] = {"startup": best_time(startup), "peak": peak}
+            results.append(row)
+    return results
+
+
+def print_chain_store_results(results):
+    print(f"{'blocks':>8}{'log MB':>10}{'eager ms':>12}{'eager MB':>12}"
+          f"{'view ms':>12}{'view MB':>12}")
+    print("-" * 66)
+    for r in results:
+        print(f"{r['blocks']:>8}{r['bytes'] / 1e6:>10.1f}"
+              f"{r['eager']['startup'] * 1000:>12.1f}{r['eager']['peak'] / 1e6:>12.2f}"
+              f"{r['view']['startup'] * 1000:>12.1f}{r['view']['peak'] / 1e6:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signature scheme benchmarks")
+    parser.add_argument("schemes", nargs="*", help="scheme ids (default: all)")
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument("--lamport-engine", action="store_true",
+                        help="compare old and new Lamport sign/verify loops")
+    parser.add_argument("--audit", action="store_true",
+                        help="time a full-chain audit, serial vs parallel")
+    parser.add_argument("--startup", action="store_true",
+                        help="time import, chain load and first-request readiness")
+    parser.add_argument("--ledger-format", action="store_true",
+                        help="compare blockchain.json with the binary block log")
+    parser.add_argument("--chain-store", action="store_true",
+                        help="startup time and memory, eager load vs ChainView")
+    args = parser.parse_args()
+
+    if args.chain_store:
+        n = max(args.iterations, 16)
+        print_chain_store_results(benchmark_chain_store(sizes=(n, 4 * n)))
+        return
+
+    if args.ledger_format:
+        print_ledger_format_results(benchmark_ledger_format(blocks=max(args.iterations, 16)))
+        return
+
+    if args.startup:
+        print_startup_results(benchmark_startup(blocks=max(args.iterations, 16)))
+        return
+
+    if args.audit:
+        print_audit_results(benchmark_audit(blocks=max(args.iterations, 16)))
+        return
+
+    if args.lamport_engine:
+        print_engine_results(benchmark_lamport_engine(max(args.iterations, 100)))
+        return
+
+    names = args.schemes or list(SCHEMES)
+    print_results([benchmark_scheme(name, args.iterations) for name in names])
+
+
+if __name__ == "__main__":
+    main()
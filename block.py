@@ -1,10 +1,364 @@
 import time
 import json
 import hashlib
-from pqc_crypto import verify_signature
+import struct
+from collections import namedtuple
+from pqc_crypto import (
+    DEFAULT_SCHEME,
+    LEGACY_SCHEME,
+    build_merkle_tree,
+    decode_public_key,
+    decode_signature,
+    encode_public_key,
+    encode_signature,
+    get_scheme,
+    merkle_auth_path,
+    merkle_root_from_path,
+    public_key_bytes,
+    sha256,
+    signature_bytes,
+    verify_cached
+)
+from transaction import Transaction
+
+# Format versions: 1 hashed the full list of txids, 2 hashes a
+# constant-size header that commits to the Merkle root of the txids,
+# 3 also commits to the transaction count and hashes each leaf with a
+# 0x00 prefix (internal nodes use 0x01), so a proof cannot pass off an
+# internal node as a txid. Only version 3 blocks give inclusion proofs.
+LEGACY_BLOCK_VERSION = 1
+ROOT_BLOCK_VERSION = 2
+BLOCK_VERSION = 3
+
+# Root of a block without transactions
+EMPTY_MERKLE_ROOT = hashlib.sha256(b"").hexdigest()
+
+# Fields a version-2 and a version-3 block hash covers, and the full
+# stored header
+_HASHED_HEADER_FIELDS = ("version", "index", "timestamp", "merkle_root", "previous_hash")
+_COUNTED_HEADER_FIELDS = _HASHED_HEADER_FIELDS + ("tx_count",)
+_HEADER_FIELDS = _COUNTED_HEADER_FIELDS + ("signature", "public_key", "scheme")
+
+# Binary header: version (u8), index (int64), timestamp (float64), the
+# transaction count (u32, version 3 only), then merkle_root,
+# previous_hash and the stored hash as tagged hashes, the scheme id
+# (u16 length-prefixed) and u32 length-prefixed signature and public
+# key bytes. Hex digests are stored as their 32 raw bytes; any other
+# value (genesis's "0") keeps its text, and None is a bare tag.
+_HEADER_PREFIX = struct.Struct(">Bqd")
+_TX_COUNT = struct.Struct(">I")
+_SHORT_LEN = struct.Struct(">H")
+_LONG_LEN = struct.Struct(">I")
+_DIGEST, _TEXT, _NONE = 0, 1, 2
+
+
+def _pack_hash(value):
+    if value is None:
+        return bytes((_NONE,))
+    if len(value) == 64:
+        try:
+            raw = bytes.fromhex(value)
+        except ValueError:
+            raw = None
+        if raw is not None and raw.hex() == value:
+            return bytes((_DIGEST,)) + raw
+    data = value.encode()
+    return bytes((_TEXT,)) + _SHORT_LEN.pack(len(data)) + data
+
+
+def _unpack_hash(data, offset):
+    tag = data[offset]
+    offset += 1
+    if tag == _DIGEST:
+        return bytes(data[offset:offset + 32]).hex(), offset + 32
+    if tag == _NONE:
+        return None, offset
+    value, offset = _unpack_bytes(data, offset, _SHORT_LEN)
+    return value.decode(), offset
+
+
+def _unpack_bytes(data, offset, length):
+    (size,) = length.unpack_from(data, offset)
+    offset += length.size
+    return bytes(data[offset:offset + size]), offset + size
+
+
+def _decode_public_key(scheme, data, keys):
+    if not data:
+        return None
+    if keys is not None:
+        return keys.unpack(scheme, data)
+    return scheme.public_key_from_bytes(data)
+
+
+# Proof that a txid is leaf `leaf_index` of a block's transaction tree;
+# hashes are hex so the proof is JSON-ready via _asdict()
+InclusionProof = namedtuple(
+    "InclusionProof", ["txid", "leaf_index", "leaf_count", "path"]
+)
+
+
+def _hashed_field_names(version):
+    return _COUNTED_HEADER_FIELDS if version >= BLOCK_VERSION else _HASHED_HEADER_FIELDS
+
+
+def transaction_leaf(txid):
+    """Merkle leaf for a hex txid in a version-3 block."""
+    return sha256(b"\x00" + bytes.fromhex(txid))
+
+
+def _merkle_levels(txids, version):
+    if version >= BLOCK_VERSION:
+        return build_merkle_tree(transaction_leaf(txid) for txid in txids)
+    return build_merkle_tree(bytes.fromhex(txid) for txid in txids)
+
+
+def transaction_merkle_root(txids, version=BLOCK_VERSION):
+    """Return the hex Merkle root over a list of hex txids."""
+    if not txids:
+        return EMPTY_MERKLE_ROOT
+    return _merkle_levels(txids, version)[-1][0].hex()
+
+
+def header_hash(header):
+    """Hash a version-2/3 block header (a dict with at least the hashed fields)."""
+    hashed = {name: header[name] for name in _hashed_field_names(header["version"])}
+    header_string = json.dumps(hashed, sort_keys=True)
+    return hashlib.sha256(header_string.encode()).hexdigest()
+
+
+def legacy_block_hash(index, timestamp, txids, previous_hash):
+    """Version-1 block hash over the full list of txids."""
+    block_data = {
+        "index": index,
+        "timestamp": timestamp,
+        "transactions": list(txids),
+        "previous_hash": previous_hash
+    }
+    block_string = json.dumps(block_data, sort_keys=True)
+    return hashlib.sha256(block_string.encode()).hexdigest()
+
+
+def verify_inclusion_proof(proof, header):
+    """
+    Check that proof.txid is in the block with this header (its hashed
+    fields, as from hashed_fields()). Needs O(log n) hashes and no other
+    transaction data. The leaf count must match the header's, so only
+    version-3 headers can verify.
+    """
+    if header.get("version") != BLOCK_VERSION or proof.leaf_count != header.get("tx_count"):
+        return False
+    try:
+        root = merkle_root_from_path(
+            transaction_leaf(proof.txid),
+            proof.leaf_index,
+            [bytes.fromhex(node) for node in proof.path],
+            proof.leaf_count
+        )
+    except (TypeError, ValueError):
+        return False
+    return root is not None and root.hex() == header["merkle_root"]
+
+
+class BlockHeader:
+    """
+    Immutable block header: everything link and signature validation
+    needs, without the transactions. Version-2/3 headers hash themselves;
+    version-1 hashes cover the txid list, so they carry the stored hash.
+    tx_count is set (and hashed) only from version 3.
+    """
+
+    __slots__ = _HEADER_FIELDS + ("hash",)
+
+    def __init__(
+        self,
+        index,
+        timestamp,
+        previous_hash,
+        merkle_root,
+        signature=None,
+        public_key=None,
+        scheme=None,
+        version=BLOCK_VERSION,
+        block_hash=None,
+        tx_count=None
+    ):
+        if version < BLOCK_VERSION:
+            tx_count = None
+        elif tx_count is None:
+            raise ValueError(f"Version {version} headers need the transaction count")
+        _set = object.__setattr__
+        _set(self, "version", version)
+        _set(self, "index", index)
+        _set(self, "timestamp", timestamp)
+        _set(self, "merkle_root", merkle_root)
+        _set(self, "tx_count", tx_count)
+        _set(self, "previous_hash", previous_hash)
+        _set(self, "signature", signature)
+        _set(self, "public_key", public_key)
+        _set(self, "scheme", scheme or DEFAULT_SCHEME)
+
+        if version != LEGACY_BLOCK_VERSION:
+            block_hash = header_hash(self.hashed_fields())
+        elif block_hash is None:
+            raise ValueError("Version 1 headers need the stored block hash")
+        _set(self, "hash", block_hash)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BlockHeader is immutable; use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("BlockHeader is immutable")
+
+    def __reduce__(self):
+        return (self.__class__, (
+            self.index, self.timestamp, self.previous_hash, self.merkle_root,
+            self.signature, self.public_key, self.scheme, self.version, self.hash,
+            self.tx_count
+        ))
+
+    def replace(self, **changes):
+        """Return a copy with the given fields changed."""
+        fields = {name: getattr(self, name) for name in _HEADER_FIELDS}
+        fields["block_hash"] = self.hash
+        fields.update(changes)
+        return self.__class__(**fields)
+
+    def signed_by(self, wallet):
+        """Return this header signed over its hash by wallet (PQC)."""
+        return self.replace(
+            signature=wallet.sign(self.hash),
+            public_key=wallet.get_verification_key(),
+            scheme=wallet.scheme_id
+        )
+
+    def hashed_fields(self):
+        """The fields a version-2/3 block hash covers."""
+        return {name: getattr(self, name) for name in _hashed_field_names(self.version)}
+
+    def to_dict(self):
+        """JSON-ready dict, as stored in the ledger."""
+        data = {
+            "version": self.version,
+            "index": self.index,
+            "timestamp": self.timestamp,
+            "previous_hash": self.previous_hash,
+            "merkle_root": self.merkle_root,
+            "hash": self.hash,
+            "scheme": self.scheme,
+            "signature": None if self.signature is None else encode_signature(self.signature),
+            "public_key": None if self.public_key is None else encode_public_key(self.public_key)
+        }
+        if self.tx_count is not None:
+            data["tx_count"] = self.tx_count
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a header from its to_dict output, or from a full block record.
+        Records without a version are legacy, txid-list-hashed blocks.
+        """
+        signature, public_key = data.get("signature"), data.get("public_key")
+        return cls(
+            index=data["index"],
+            timestamp=data["timestamp"],
+            previous_hash=data["previous_hash"],
+            merkle_root=data.get("merkle_root"),
+            signature=None if signature is None else decode_signature(signature),
+            public_key=None if public_key is None else decode_public_key(public_key),
+            scheme=data.get("scheme", LEGACY_SCHEME),
+            version=data.get("version", LEGACY_BLOCK_VERSION),
+            block_hash=data.get("hash"),
+            tx_count=data.get("tx_count")
+        )
+
+    def to_bytes(self, keys=None):
+        """
+        Binary record of the header; round-trips through decode. With a
+        PublicKeyTable, the key field holds the table's reference.
+        """
+        signature = b"" if self.signature is None else signature_bytes(self.signature)
+        public_key = b"" if self.public_key is None else public_key_bytes(self.public_key)
+        if keys is not None and public_key:
+            public_key = keys.pack(public_key)
+        scheme = self.scheme.encode()
+        stored_hash = self.hash if self.version == LEGACY_BLOCK_VERSION else None
+        tx_count = b"" if self.tx_count is None else _TX_COUNT.pack(self.tx_count)
+        return (
+            _HEADER_PREFIX.pack(self.version, self.index, self.timestamp)
+            + tx_count
+            + _pack_hash(self.merkle_root)
+            + _pack_hash(self.previous_hash)
+            + _pack_hash(stored_hash)
+            + _SHORT_LEN.pack(len(scheme)) + scheme
+            + _LONG_LEN.pack(len(signature)) + signature
+            + _LONG_LEN.pack(len(public_key)) + public_key
+        )
+
+    @classmethod
+    def decode(cls, data, offset=0, keys=None):
+        """
+        Decode one binary header at offset; return (header, end offset).
+        keys is the PublicKeyTable the header was written with, if any.
+        """
+        version, index, timestamp = _HEADER_PREFIX.unpack_from(data, offset)
+        offset += _HEADER_PREFIX.size
+        tx_count = None
+        if version >= BLOCK_VERSION:
+            (tx_count,) = _TX_COUNT.unpack_from(data, offset)
+            offset += _TX_COUNT.size
+        merkle_root, offset = _unpack_hash(data, offset)
+        previous_hash, offset = _unpack_hash(data, offset)
+        stored_hash, offset = _unpack_hash(data, offset)
+        scheme_id, offset = _unpack_bytes(data, offset, _SHORT_LEN)
+        signature, offset = _unpack_bytes(data, offset, _LONG_LEN)
+        public_key, offset = _unpack_bytes(data, offset, _LONG_LEN)
+
+        scheme = get_scheme(scheme_id.decode())
+        header = cls(
+            index=index,
+            timestamp=timestamp,
+            previous_hash=previous_hash,
+            merkle_root=merkle_root,
+            signature=scheme.signature_from_bytes(signature) if signature else None,
+            public_key=_decode_public_key(scheme, public_key, keys),
+            scheme=scheme.name,
+            version=version,
+            block_hash=stored_hash,
+            tx_count=tx_count
+        )
+        return header, offset
+
+    @classmethod
+    def from_bytes(cls, data, keys=None):
+        return cls.decode(data, 0, keys)[0]
+
+    def verification_item(self):
+        """Return (scheme, message, signature, public_key) for verify_batch."""
+        return (self.scheme, self.hash, self.signature, self.public_key)
+
+    def verify_signature(self):
+        """Verify PQC signature of the block."""
+        if self.signature is None or self.public_key is None:
+            return False
+        return verify_cached(self.verification_item())
+
+
+# Block attributes read straight from the header
+_HEADER_ATTRS = frozenset(_HEADER_FIELDS + ("hash",))
 
 
 class Block:
+    """
+    Immutable block: a BlockHeader plus its transactions (the body).
+    Header fields (index, hash, previous_hash, ...) read through to the
+    header. Blocks built with from_header() load their body on first
+    access to .transactions, so header-only work never touches it.
+    """
+
+    __slots__ = ("header", "_transactions", "_load_body")
+
     def __init__(
         self,
         index,
@@ -12,40 +366,165 @@ class Block:
         previous_hash,
         signature=None,
         public_key=None,
-        timestamp=None
+        timestamp=None,
+        scheme=None,
+        version=BLOCK_VERSION
     ):
-        self.index = index
-        self.timestamp = timestamp or time.time()
-        self.transactions = transactions
-        self.previous_hash = previous_hash
-        self.signature = signature
-        self.public_key = public_key
-        self.hash = self.calculate_hash()
+        transactions = tuple(transactions)
+        txids = [tx.txid for tx in transactions]
+        timestamp = timestamp or time.time()
+        block_hash = None
+        if version == LEGACY_BLOCK_VERSION:
+            block_hash = legacy_block_hash(index, timestamp, txids, previous_hash)
 
-    def calculate_hash(self):
-        """Calculate SHA-256 hash of the block."""
-        block_data = {
+        header = BlockHeader(
+            index, timestamp, previous_hash, transaction_merkle_root(txids, version),
+            signature, public_key, scheme, version, block_hash, len(txids)
+        )
+        _set = object.__setattr__
+        _set(self, "header", header)
+        _set(self, "_transactions", transactions)
+        _set(self, "_load_body", None)
+
+    @classmethod
+    def from_header(cls, header, transactions=None, load_body=None):
+        """
+        Build a block around an existing header. Without transactions,
+        load_body(index) is called the first time the body is needed.
+        """
+        block = cls.__new__(cls)
+        _set = object.__setattr__
+        _set(block, "header", header)
+        _set(block, "_transactions", None if transactions is None else tuple(transactions))
+        _set(block, "_load_body", load_body)
+        return block
+
+    def __getattr__(self, name):
+        if name in _HEADER_ATTRS:
+            return getattr(self.header, name)
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Block is immutable; use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Block is immutable")
+
+    def __reduce__(self):
+        return (self.__class__, (
+            self.index, self.transactions, self.previous_hash, self.signature,
+            self.public_key, self.timestamp, self.scheme, self.version
+        ))
+
+    @property
+    def transactions(self):
+        if self._transactions is None:
+            object.__setattr__(
+                self, "_transactions", tuple(self._load_body(self.index))
+            )
+        return self._transactions
+
+    @property
+    def body_loaded(self):
+        return self._transactions is not None
+
+    def replace(self, **changes):
+        """Return a copy with the given fields changed."""
+        fields = {
             "index": self.index,
+            "transactions": self.transactions,
+            "previous_hash": self.previous_hash,
+            "signature": self.signature,
+            "public_key": self.public_key,
             "timestamp": self.timestamp,
-            "transactions": [
-                tx.calculate_hash() for tx in self.transactions
-            ],
-            "previous_hash": self.previous_hash
+            "scheme": self.scheme,
+            "version": self.version
         }
-        block_string = json.dumps(block_data, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        fields.update(changes)
+        return self.__class__(**fields)
+
+    def signed_by(self, wallet):
+        """Return this block signed over its hash by wallet (PQC)."""
+        return self.from_header(
+            self.header.signed_by(wallet), self._transactions, self._load_body
+        )
+
+    def calculate_hash(self):
+        """Recompute the block hash from the body."""
+        txids = [tx.txid for tx in self.transactions]
+        if self.version == LEGACY_BLOCK_VERSION:
+            return legacy_block_hash(self.index, self.timestamp, txids, self.previous_hash)
+        header = self.header.hashed_fields()
+        header["merkle_root"] = transaction_merkle_root(txids, self.version)
+        if self.version >= BLOCK_VERSION:
+            header["tx_count"] = len(txids)
+        return header_hash(header)
+
+    def verify_body(self):
+        """
+        Check the transactions match the header. Blocks built from their
+        transactions match by construction; only separately loaded
+        header/body pairs need (and pay for) the check.
+        """
+        if self._load_body is None:
+            return True
+        return self.calculate_hash() == self.hash
+
+    def merkle_proof(self, txid):
+        """
+        Return an InclusionProof for txid, or None if it is not in the
+        block or the block predates version 3 (see BLOCK_VERSION).
+        """
+        if self.version != BLOCK_VERSION:
+            return None
+        txids = [tx.txid for tx in self.transactions]
+        if txid not in txids:
+            return None
+        leaf_index = txids.index(txid)
+        levels = _merkle_levels(txids, self.version)
+        return InclusionProof(
+            txid=txid,
+            leaf_index=leaf_index,
+            leaf_count=len(txids),
+            path=[node.hex() for node in merkle_auth_path(levels, leaf_index)]
+        )
+
+    def to_dict(self):
+        """JSON-ready dict, as stored in the ledger."""
+        data = self.header.to_dict()
+        data["transactions"] = [tx.to_dict() for tx in self.transactions]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a block (and its transactions) from to_dict output.
+        Records without a version are legacy, txid-list-hashed blocks.
+        """
+        signature, public_key = data.get("signature"), data.get("public_key")
+        return cls(
+            index=data["index"],
+            transactions=[Transaction.from_dict(tx) for tx in data["transactions"]],
+            previous_hash=data["previous_hash"],
+            signature=None if signature is None else decode_signature(signature),
+            public_key=None if public_key is None else decode_public_key(public_key),
+            timestamp=data["timestamp"],
+            scheme=data.get("scheme", LEGACY_SCHEME),
+            version=data.get("version", LEGACY_BLOCK_VERSION)
+        )
+
+    def verification_item(self):
+        """Return (scheme, message, signature, public_key) for verify_batch."""
+        return self.header.verification_item()
 
     def verify_block_signature(self):
         """Verify PQC signature of the block."""
-        if self.signature is None or self.public_key is None:
-            return False
-        return verify_signature(self.hash, self.signature, self.public_key)
+        return self.header.verify_signature()
 
 
 # ---------------- TEST BLOCK ----------------
 if __name__ == "__main__":
     from wallet import Wallet
-    from transaction import Transaction
 
     miner_wallet = Wallet()
 
@@ -63,13 +542,10 @@ if __name__ == "__main__":
     tx_signature = miner_wallet.sign(tx_hash)
 
     # Step 3: Create signed transaction
-    tx = Transaction(
-        sender="Alice",
-        receiver="Bob",
-        amount=5,
+    tx = temp_tx.replace(
         signature=tx_signature,
-        public_key=miner_wallet.public_key,
-        timestamp=temp_tx.timestamp
+        public_key=miner_wallet.get_verification_key(),
+        scheme=miner_wallet.scheme_id
     )
 
     # Step 4: Create block
@@ -80,8 +556,10 @@ if __name__ == "__main__":
     )
 
     # Step 5: Sign block hash
-    block.signature = miner_wallet.sign(block.hash)
-    block.public_key = miner_wallet.public_key
+    block = block.signed_by(miner_wallet)
 
     print("Block hash:", block.hash)
-    print("Block signature valid:", block.verify_block_signature())
\ No newline at end of file
+    print("Block signature valid:", block.verify_block_signature())
+
+    proof = block.merkle_proof(tx.txid)
+    print("Inclusion proof valid:", verify_inclusion_proof(proof, block.header.hashed_fields()))
@@ -1,26 +1,214 @@
+import json
+import os
+from collections import defaultdict, namedtuple
 from block import Block
+from blocklog import ChainView
 from wallet import Wallet
+from pqc_crypto import get_worker_pool, sha256, verify_batch, verify_item, worker_count
+
+# The genesis block ships as data, so every node starts from the same
+# block and startup does no keygen or signing
+GENESIS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "genesis.json")
+
+# Inputs that reproduce genesis.json exactly (see build_genesis_block).
+# The signing seed is public: the genesis key signs nothing else.
+GENESIS_TIMESTAMP = 1767225600.0
+GENESIS_SEED = sha256(b"pqc-blockchain genesis")
+GENESIS_SCHEME = "wots"
+GENESIS_VERSION = 2
+GENESIS_HASH = "7dc37970bc80157e941f7de1766ddff6d23ebbd7d96680f0cf2253dad946759c"
+
+# Highest block known to be valid, identified by height and hash
+Checkpoint = namedtuple("Checkpoint", ["height", "hash"])
+
+# Result of a full audit; first_bad_index/reason are None when valid
+AuditReport = namedtuple(
+    "AuditReport",
+    ["valid", "first_bad_index", "reason", "blocks", "transactions"]
+)
+
+# Chains shorter than this are audited in-process
+AUDIT_PARALLEL_THRESHOLD = 16
+
+# Ranges per worker; more, smaller ranges even out uneven block sizes
+AUDIT_RANGES_PER_WORKER = 4
+
+
+def build_genesis_block():
+    """Rebuild the genesis block from its fixed inputs (used to write GENESIS_FILE)."""
+    genesis_wallet = Wallet.from_seed(GENESIS_SEED, scheme=GENESIS_SCHEME)
+    return Block(
+        index=0,
+        transactions=[],
+        previous_hash="0",
+        timestamp=GENESIS_TIMESTAMP,
+        version=GENESIS_VERSION
+    ).signed_by(genesis_wallet)
+
+
+def write_genesis_file(filename=GENESIS_FILE):
+    with open(filename, "w") as f:
+        json.dump(build_genesis_block().to_dict(), f, indent=4)
+
+
+_genesis_block = None
+
+
+def load_genesis_block():
+    """Load the shipped genesis block once; blocks are immutable, so it is shared."""
+    global _genesis_block
+    if _genesis_block is None:
+        with open(GENESIS_FILE, "r") as f:
+            genesis_block = Block.from_dict(json.load(f))
+        if genesis_block.hash != GENESIS_HASH:
+            raise ValueError(f"{GENESIS_FILE} does not match GENESIS_HASH")
+        _genesis_block = genesis_block
+    return _genesis_block
+
+
+def validate_headers(headers):
+    """
+    Check hash links and block signatures using headers only, so the
+    cost is proportional to header bytes rather than chain size.
+    """
+    # Block signatures are independent, so verify them as one batch
+    signature_results = verify_batch(
+        header.verification_item() for header in headers[1:]
+    )
+
+    for i in range(1, len(headers)):
+        # Verify previous hash link
+        if headers[i].previous_hash != headers[i - 1].hash:
+            print("[!] Chain broken at index", headers[i].index)
+            return False
+
+        # Verify PQC signature
+        if not signature_results[i - 1]:
+            print("[!] Invalid block signature at index", headers[i].index)
+            return False
+
+    return True
+
+
+def _audit_range(blocks):
+    """
+    Audit (header, transactions) pairs in a worker: body hash, block
+    signature and every transaction signature. Returns
+    (first failure as (index, reason) or None, transactions checked).
+    """
+    checked = 0
+    for header, transactions in blocks:
+        block = Block.from_header(header, transactions)
+        if block.calculate_hash() != header.hash:
+            return (header.index, "block hash mismatch"), checked
+        if header.index > 0 and not verify_item(header.verification_item()):
+            return (header.index, "invalid block signature"), checked
+        for tx in block.transactions:
+            checked += 1
+            if not verify_item(tx.verification_item()):
+                return (header.index, f"invalid transaction signature {tx.txid}"), checked
+    return None, checked
+
+
+def audit_chain(chain, parallel=None):
+    """
+    Full audit of every block: hash links, block hashes, block and
+    transaction signatures. Links only compare stored hashes, so they
+    are checked here; everything else is independent per block and is
+    sharded into index ranges across the worker pool.
+    """
+    failures = []
+    for i in range(1, len(chain)):
+        if chain[i].previous_hash != chain[i - 1].hash:
+            failures.append((chain[i].index, "chain broken"))
+            break
+
+    items = [(block.header, block.transactions) for block in chain]
+    workers = worker_count()
+    if parallel is None:
+        parallel = workers > 1 and len(items) >= AUDIT_PARALLEL_THRESHOLD
+
+    if parallel and len(items) > 1:
+        range_size = -(-len(items) // (workers * AUDIT_RANGES_PER_WORKER))
+        ranges = [items[i:i + range_size] for i in range(0, len(items), range_size)]
+        results = list(get_worker_pool().map(_audit_range, ranges))
+    else:
+        results = [_audit_range(items)]
+
+    failures.extend(failure for failure, _ in results if failure is not None)
+    first = min(failures, default=None)
+    return AuditReport(
+        valid=first is None,
+        first_bad_index=None if first is None else first[0],
+        reason=None if first is None else first[1],
+        blocks=len(chain),
+        transactions=sum(checked for _, checked in results)
+    )
 
 
 class Blockchain:
-    def __init__(self):
+    def __init__(self, chain=None, checkpoint=None):
+        """
+        Start from an existing chain (e.g. loaded from the ledger), or
+        create a new genesis block when none is given.
+        """
         self.chain = []
-        self.create_genesis_block()
+        self.checkpoint = None
 
-    def create_genesis_block(self):
-        """Create the first block in the blockchain."""
-        genesis_wallet = Wallet()
+        # Lookup indexes. Block hashes are indexed from headers; the
+        # transaction indexes need bodies, so they are built on first use
+        # and then kept up to date by add_block.
+        self.block_heights = {}
+        self._tx_locations = None
+        self._address_locations = None
+
+        if chain:
+            self.set_chain(chain, checkpoint)
+        else:
+            self.create_genesis_block()
+
+    @classmethod
+    def from_ledger(cls, ledger, lazy=True):
+        """
+        Load the persisted chain and its checkpoint. A genesis wallet and
+        block are only created when the ledger has no chain yet.
+        """
+        chain = ledger.load_blockchain(lazy=lazy)
+        if chain:
+            return cls(chain, ledger.load_checkpoint())
+        return cls()
 
-        genesis_block = Block(
-            index=0,
-            transactions=[],
-            previous_hash="0"
-        )
+    def set_chain(self, chain, checkpoint=None):
+        """
+        Replace the chain (e.g. with one loaded from the ledger) and re-index
+        it. A ChainView is kept as is, and indexed without decoding blocks.
+        """
+        if isinstance(chain, ChainView):
+            self.chain = chain
+            # A store that indexes blocks itself is queried instead
+            hashes = [] if self._indexed_store() else chain.hashes()
+        else:
+            self.chain = list(chain)
+            hashes = [block.hash for block in self.chain]
+        self.checkpoint = checkpoint
+        self.block_heights = {block_hash: height for height, block_hash in enumerate(hashes)}
+        self._tx_locations = None
+        self._address_locations = None
 
-        genesis_block.signature = genesis_wallet.sign(genesis_block.hash)
-        genesis_block.public_key = genesis_wallet.public_key
+    def _indexed_store(self):
+        """The store behind the chain if it indexes blocks and transactions (SQLite)."""
+        chain = self.chain
+        if isinstance(chain, ChainView) and chain.store.indexes_transactions:
+            return chain.store
+        return None
+
+    def create_genesis_block(self):
+        """Start the chain from the shipped genesis block."""
+        genesis_block = load_genesis_block()
 
         self.chain.append(genesis_block)
+        self.checkpoint = Checkpoint(0, genesis_block.hash)
+        self._index_block(genesis_block)
 
     def get_latest_block(self):
         return self.chain[-1]
@@ -29,41 +217,158 @@ class Blockchain:
         """Add a new block to the chain."""
         previous_block = self.get_latest_block()
 
+        # Sign block hash using miner wallet (PQC)
         new_block = Block(
             index=len(self.chain),
             transactions=transactions,
             previous_hash=previous_block.hash
-        )
-
-        # Sign block hash using miner wallet (PQC)
-        new_block.signature = miner_wallet.sign(new_block.hash)
-        new_block.public_key = miner_wallet.public_key
+        ).signed_by(miner_wallet)
 
         self.chain.append(new_block)
 
-    def is_chain_valid(self):
-        """Verify blockchain integrity and PQC signatures."""
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
+        # Validates just the new block and advances the checkpoint
+        if not self.is_chain_valid():
+            self.chain.pop()
+            raise ValueError("New block failed validation")
+        self._index_block(new_block)
 
-            # Verify block hash
-            if current_block.hash != current_block.calculate_hash():
-                print("[!] Block hash mismatch at index", i)
-                return False
+    def _index_block(self, block):
+        self.block_heights[block.hash] = block.index
+        if self._tx_locations is not None:
+            self._index_transactions(block)
 
-            # Verify previous hash link
-            if current_block.previous_hash != previous_block.hash:
-                print("[!] Chain broken at index", i)
-                return False
+    def _index_transactions(self, block):
+        for position, tx in enumerate(block.transactions):
+            location = (block.index, position)
+            # A txid mined again resolves to its first (original) block
+            self._tx_locations.setdefault(tx.txid, location)
+            self._address_locations[tx.sender].append(location)
+            if tx.receiver != tx.sender:
+                self._address_locations[tx.receiver].append(location)
+
+    def _ensure_tx_indexes(self):
+        if self._tx_locations is None:
+            self._tx_locations = {}
+            self._address_locations = defaultdict(list)
+            # An indexed store answers for its own blocks; only blocks
+            # added since loading need indexing here
+            store = self._indexed_store()
+            for block in self.chain[len(store) if store else 0:]:
+                self._index_transactions(block)
+
+    def get_block_by_hash(self, block_hash):
+        """Return the block with this hash, or None."""
+        height = self.block_heights.get(block_hash)
+        store = self._indexed_store()
+        if height is None and store is not None:
+            height = store.block_height(block_hash)
+        return None if height is None else self.chain[height]
 
-            # Verify PQC signature
-            if not current_block.verify_block_signature():
-                print("[!] Invalid block signature at index", i)
+    def get_transaction(self, txid):
+        """
+        Return (block, position, transaction) for a mined txid, or None.
+        A txid mined more than once resolves to its first occurrence.
+        """
+        self._ensure_tx_indexes()
+        store = self._indexed_store()
+        # Stored blocks come first, so the store answers before the
+        # blocks added since loading
+        location = None if store is None else store.transaction_location(txid)
+        if location is None:
+            location = self._tx_locations.get(txid)
+        if location is None:
+            return None
+        block = self.chain[location[0]]
+        return block, location[1], block.transactions[location[1]]
+
+    def address_history(self, address, start=0, limit=None):
+        """
+        Return (block, position, transaction) for the transactions of an
+        address, oldest first; start and limit select a page, and only
+        the blocks on that page are loaded.
+        """
+        self._ensure_tx_indexes()
+        locations = self._address_locations.get(address, [])
+        store = self._indexed_store()
+        if store is None:
+            end = None if limit is None else start + limit
+            page = locations[start:end]
+        else:
+            # The store pages its own rows; a short page continues into
+            # the blocks mined since loading
+            page = store.address_locations(address, start, limit)
+            if limit is None or len(page) < limit:
+                stored = len(store)
+                skip = 0 if page or not start else \
+                    max(0, start - store.address_count(address))
+                end = None if limit is None else skip + limit - len(page)
+                page += [
+                    location for location in locations if location[0] >= stored
+                ][skip:end]
+
+        return [
+            (self.chain[height], position, self.chain[height].transactions[position])
+            for height, position in page
+        ]
+
+    def headers(self):
+        return [block.header for block in self.chain]
+
+    def validated_height(self):
+        """
+        Height of the checkpoint if it still matches this chain, else 0.
+        Blocks are immutable, so a matching hash means nothing at or
+        below it has changed.
+        """
+        checkpoint = self.checkpoint
+        if (checkpoint is not None and checkpoint.height < len(self.chain)
+                and self.chain[checkpoint.height].hash == checkpoint.hash):
+            return checkpoint.height
+        return 0
+
+    def is_chain_valid(self, check_bodies=True, full=False):
+        """
+        Verify blockchain integrity and PQC signatures.
+        Only blocks above the validated checkpoint are checked, so an
+        unchanged chain answers in O(1); full=True re-validates from
+        genesis for audits. Links and signatures are checked on headers
+        alone; with check_bodies, transactions are also checked against
+        each header (loading lazy bodies as needed) and the checkpoint
+        moves up to the tip.
+        """
+        start = 1 if full else self.validated_height() + 1
+        if start >= len(self.chain):
+            return True
+
+        if not validate_headers([block.header for block in self.chain[start - 1:]]):
+            return False
+
+        if not check_bodies:
+            return True
+
+        for block in self.chain[start:]:
+            if not block.verify_body():
+                print("[!] Block hash mismatch at index", block.index)
                 return False
 
+        tip = self.get_latest_block()
+        self.checkpoint = Checkpoint(tip.index, tip.hash)
         return True
-    
+
+    def audit(self, parallel=None):
+        """
+        Re-validate the whole chain, including transaction signatures,
+        across the worker pool. Returns an AuditReport; a clean audit
+        moves the checkpoint to the tip.
+        """
+        report = audit_chain(self.chain, parallel)
+        if report.valid:
+            tip = self.get_latest_block()
+            self.checkpoint = Checkpoint(tip.index, tip.hash)
+        else:
+            print(f"[!] Audit failed at index {report.first_bad_index}: {report.reason}")
+        return report
+
 
 
 
@@ -86,15 +391,13 @@ if __name__ == "__main__":
     tx_hash = temp_tx.calculate_hash()
     tx_signature = miner_wallet.sign(tx_hash)
 
-    tx = Transaction(
-        sender="Alice",
-        receiver="Bob",
-        amount=25,
+    tx = temp_tx.replace(
         signature=tx_signature,
-        public_key=miner_wallet.public_key,
-        timestamp=temp_tx.timestamp
+        public_key=miner_wallet.get_verification_key(),
+        scheme=miner_wallet.scheme_id
     )
 
     blockchain.add_block([tx], miner_wallet)
 
-    print("Blockchain valid:", blockchain.is_chain_valid())
\ No newline at end of file
+    print("Blockchain valid:", blockchain.is_chain_valid())
+    print("Audit:", blockchain.audit())
\ No newline at end of file
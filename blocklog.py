@@ -0,0 +1,695 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import zlib
+from collections import OrderedDict, namedtuple
+from collections.abc import Sequence
+from block import Block, BlockHeader
+from pqc_crypto import sha256
+from transaction import Transaction
+
+# Segments are rotated once they grow past this size
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# fsync policies: after every append, every FSYNC_BATCH_SIZE appends, or never
+FSYNC_ALWAYS = "always"
+FSYNC_BATCH = "batch"
+FSYNC_NEVER = "never"
+FSYNC_BATCH_SIZE = 16
+
+# Segment formats. Binary segments start with MAGIC and a u16 format
+# number, and store headers and bodies in their binary encodings (raw
+# signature and key bytes, length-prefixed); format 3 also moves public
+# keys into the PublicKeyTable. Format 1 segments have no file header
+# and store compact JSON. Older formats are still read, and appends
+# always go to a new segment in the current format.
+MAGIC = b"PQCLOG"
+JSON_LOG_FORMAT = 1
+BINARY_LOG_FORMAT = 2
+LOG_FORMAT = 3
+_SEGMENT_HEADER = struct.Struct(">6sH")
+
+# Public key table file: MAGIC_KEYS, then per key its length, CRC-32 of
+# hash + key, the SHA-256 of the key and the key itself. Keys no longer
+# than a reference (digests, Merkle roots) stay inline in records.
+KEYS_FILENAME = "keys"
+MAGIC_KEYS = b"PQCKEY"
+_KEYS_HEADER = struct.Struct(">6sH")
+_KEY_ENTRY = struct.Struct(">II")
+KEYS_FORMAT = 1
+KEY_REFERENCE_SIZE = 32
+_INLINE_KEY, _KEY_REFERENCE = 0, 1
+
+# Decoded public keys kept for interning
+KEY_CACHE_SIZE = 4096
+
+# Frame: header length, body length, CRC-32 of header + body (big-endian
+# u32s), then the header and the body (the block's transactions).
+# Keeping them apart lets headers load without decoding any body.
+_FRAME = struct.Struct(">III")
+_TX_COUNT = struct.Struct(">I")
+
+# Offset index, kept next to the segments so opening the log reads one
+# small entry per block instead of every record: MAGIC_INDEX, then per
+# block its segment, offset, header and body lengths and raw block hash.
+# It is derived data; records missing from it are re-indexed on open.
+INDEX_FILENAME = "index"
+MAGIC_INDEX = b"PQCIDX"
+_INDEX_HEADER = struct.Struct(">6sH")
+_INDEX_ENTRY = struct.Struct(">IQII32s")
+INDEX_FORMAT = 1
+
+# Decoded blocks a ChainView keeps in memory
+CHAIN_CACHE_SIZE = 256
+
+# Where one block's record lives, and its hash
+BlockLocation = namedtuple(
+    "BlockLocation", ["segment", "offset", "header_length", "body_length", "block_hash"]
+)
+
+
+def _record_end(location):
+    return location.offset + _FRAME.size + location.header_length + location.body_length
+
+
+def _frame_end(data, offset):
+    """Where the frame starting at offset ends, per its lengths (may be past EOF)."""
+    if offset + _FRAME.size > len(data):
+        return len(data) + 1
+    header_length, body_length, _ = _FRAME.unpack_from(data, offset)
+    return offset + _FRAME.size + header_length + body_length
+
+
+def encode_record(block, log_format=LOG_FORMAT, keys=None):
+    """
+    Return (header, body) payload bytes for one block. The current
+    format needs the log's PublicKeyTable.
+    """
+    if log_format == JSON_LOG_FORMAT:
+        header = json.dumps(block.header.to_dict(), separators=(",", ":")).encode()
+        body = json.dumps(
+            [tx.to_dict() for tx in block.transactions], separators=(",", ":")
+        ).encode()
+        return header, body
+
+    if log_format == BINARY_LOG_FORMAT:
+        keys = None
+    elif keys is None:
+        raise ValueError("This log format stores keys in a PublicKeyTable")
+    transactions = block.transactions
+    body = [_TX_COUNT.pack(len(transactions))]
+    body.extend(tx.to_bytes(keys) for tx in transactions)
+    return block.header.to_bytes(keys), b"".join(body)
+
+
+def frame_record(block, log_format=LOG_FORMAT, keys=None):
+    """Return one block's complete framed record."""
+    header, body = encode_record(block, log_format, keys)
+    return _FRAME.pack(len(header), len(body), zlib.crc32(header + body)) + header + body
+
+
+def decode_header(data, log_format=LOG_FORMAT, keys=None):
+    if log_format == JSON_LOG_FORMAT:
+        return BlockHeader.from_dict(json.loads(data))
+    return BlockHeader.from_bytes(data, keys if log_format != BINARY_LOG_FORMAT else None)
+
+
+def decode_body(data, log_format=LOG_FORMAT, keys=None):
+    """Decode a body payload into a list of Transactions."""
+    if log_format == JSON_LOG_FORMAT:
+        return [Transaction.from_dict(tx_data) for tx_data in json.loads(data)]
+
+    if log_format == BINARY_LOG_FORMAT:
+        keys = None
+    (count,) = _TX_COUNT.unpack_from(data, 0)
+    offset = _TX_COUNT.size
+    transactions = []
+    for _ in range(count):
+        tx, offset = Transaction.decode(data, offset, keys)
+        transactions.append(tx)
+    return transactions
+
+
+def segment_format(data):
+    """Return (format, offset of the first record) for a segment's bytes."""
+    if not data.startswith(MAGIC):
+        return JSON_LOG_FORMAT, 0
+    if len(data) < _SEGMENT_HEADER.size:
+        return LOG_FORMAT, _SEGMENT_HEADER.size
+    _, log_format = _SEGMENT_HEADER.unpack_from(data, 0)
+    if log_format not in (JSON_LOG_FORMAT, BINARY_LOG_FORMAT, LOG_FORMAT):
+        raise ValueError(f"Unsupported block log format: {log_format}")
+    return log_format, _SEGMENT_HEADER.size
+
+
+def _fsync_directory(path):
+    """Make a new or renamed file's directory entry durable."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class PublicKeyTable:
+    """
+    Each distinct public key stored once, addressed by the SHA-256 of its
+    bytes. pack() turns a key into a record field (a reference, or the
+    key itself when that is no longer) and unpack() decodes one. With a
+    filename, keys persist in an append-only file that is mmapped, and
+    only key offsets are held in memory.
+
+    Decoded keys are interned in a bounded LRU cache, so blocks that
+    share a key (a Merkle wallet signing many blocks, or a block decoded
+    again after leaving a ChainView cache) share one key object.
+    """
+
+    def __init__(self, filename=None, fsync=FSYNC_ALWAYS, cache_size=KEY_CACHE_SIZE):
+        self.filename = filename
+        self.fsync = fsync
+        self.cache_size = cache_size
+        self._keys = None
+        self._map = None
+        self._decoded = OrderedDict()
+
+    def __len__(self):
+        return len(self._table())
+
+    def _table(self):
+        """
+        Key hash -> key bytes, or -> (offset, length) in the file, read
+        on first use.
+        """
+        if self._keys is None:
+            self._keys = {}
+            if self.filename is not None and os.path.exists(self.filename):
+                self._load()
+        return self._keys
+
+    def _load(self):
+        with open(self.filename, "rb") as f:
+            data = f.read()
+        if len(data) >= _KEYS_HEADER.size and \
+                _KEYS_HEADER.unpack_from(data, 0) != (MAGIC_KEYS, KEYS_FORMAT):
+            raise ValueError(f"Unsupported key table: {self.filename}")
+
+        offset = _KEYS_HEADER.size
+        while offset < len(data):
+            start = offset + _KEY_ENTRY.size
+            if start > len(data):
+                break
+            length, crc = _KEY_ENTRY.unpack_from(data, offset)
+            end = start + KEY_REFERENCE_SIZE + length
+            if end > len(data):
+                break
+            if zlib.crc32(data[start:end]) != crc:
+                # Only an entry cut off by the end of the file is torn
+                if end < len(data):
+                    raise ValueError(f"Corrupt key entry in {self.filename} at offset {offset}")
+                break
+            self._keys[data[start:start + KEY_REFERENCE_SIZE]] = \
+                (start + KEY_REFERENCE_SIZE, length)
+            offset = end
+
+        if offset < len(data):
+            print(f"[!] Truncating torn key entry in {self.filename} at offset {offset}")
+            with open(self.filename, "r+b") as f:
+                f.truncate(offset if offset >= _KEYS_HEADER.size else 0)
+
+    def pack(self, data):
+        """Record field for the key bytes `data`, storing the key if it is new."""
+        if len(data) <= KEY_REFERENCE_SIZE:
+            return bytes((_INLINE_KEY,)) + data
+        key_hash = sha256(data)
+        table = self._table()
+        if key_hash not in table:
+            if self.filename is None:
+                table[key_hash] = bytes(data)
+            else:
+                table[key_hash] = self._append(key_hash, data)
+        return bytes((_KEY_REFERENCE,)) + key_hash
+
+    def _append(self, key_hash, data):
+        """Append a key to the file and return its (offset, length)."""
+        # Records that reference the key are written after it, so the
+        # key is made durable first
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        with open(self.filename, "ab") as f:
+            if f.tell() == 0:
+                f.write(_KEYS_HEADER.pack(MAGIC_KEYS, KEYS_FORMAT))
+            f.write(_KEY_ENTRY.pack(len(data), zlib.crc32(key_hash + data)))
+            f.write(key_hash)
+            offset = f.tell()
+            f.write(data)
+            if self.fsync != FSYNC_NEVER:
+                f.flush()
+                os.fsync(f.fileno())
+        return offset, len(data)
+
+    def _key_data(self, key_hash):
+        entry = self._table().get(key_hash)
+        if entry is None or self.filename is None:
+            return entry
+        offset, length = entry
+        if self._map is None or len(self._map) < offset + length:
+            if self._map is not None:
+                self._map.close()
+            with open(self.filename, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:offset + length]
+
+    def unpack(self, scheme, field):
+        """The interned key object for a record field written by pack()."""
+        cache_key = (scheme.name, field)
+        key = self._decoded.get(cache_key)
+        if key is not None:
+            self._decoded.move_to_end(cache_key)
+            return key
+
+        data = field[1:]
+        if field[0] == _KEY_REFERENCE:
+            data = self._key_data(data)
+            if data is None:
+                raise ValueError(f"Unknown public key {field[1:].hex()}")
+        key = scheme.public_key_from_bytes(data)
+        self._decoded[cache_key] = key
+        if len(self._decoded) > self.cache_size:
+            self._decoded.popitem(last=False)
+        return key
+
+    def intern(self, scheme, data):
+        """The interned key object for raw key bytes."""
+        return self.unpack(scheme, bytes((_INLINE_KEY,)) + data)
+
+    def sync(self):
+        if self.filename is not None and os.path.exists(self.filename):
+            with open(self.filename, "rb+") as f:
+                os.fsync(f.fileno())
+
+    def reset(self):
+        """Forget loaded and decoded keys (the file changed underneath)."""
+        if self._map is not None:
+            self._map.close()
+        self._keys = None
+        self._map = None
+        self._decoded = OrderedDict()
+
+
+class BlockLog:
+    """
+    Append-only log of framed block records split into numbered segment
+    files. Appending a block writes one frame, so the cost of saving a
+    block does not depend on the length of the chain. Opening the log
+    reads only the offset index; records are read through mmap when
+    they are accessed.
+    """
+
+    def __init__(self, directory, fsync=FSYNC_ALWAYS,
+                 segment_max_bytes=SEGMENT_MAX_BYTES):
+        if fsync not in (FSYNC_ALWAYS, FSYNC_BATCH, FSYNC_NEVER):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.directory = directory
+        self.index_filename = os.path.join(directory, INDEX_FILENAME)
+        self.keys = PublicKeyTable(os.path.join(directory, KEYS_FILENAME), fsync)
+        self.fsync = fsync
+        self.segment_max_bytes = segment_max_bytes
+        self._file = None
+        self._segment = None
+        self._formats = {}
+        self._maps = {}
+        self._entries = None
+        self._unsynced = 0
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{number:06d}.seg")
+
+    def segments(self):
+        """Segment numbers present on disk, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(name[:-4]) for name in os.listdir(self.directory)
+            if name.endswith(".seg") and name[:-4].isdigit()
+        )
+
+    def size(self):
+        """Total bytes across all segments and the key table."""
+        keys = self.keys.filename
+        return sum(
+            os.path.getsize(self._segment_path(n)) for n in self.segments()
+        ) + (os.path.getsize(keys) if os.path.exists(keys) else 0)
+
+    # Transactions are not indexed by the log; Blockchain builds that
+    # index in memory
+    indexes_transactions = False
+
+    def __len__(self):
+        return len(self.entries())
+
+    def hashes(self):
+        """Every block hash, from the index."""
+        return [location.block_hash for location in self.entries()]
+
+    def header_at(self, height):
+        return self.read_header(self.entries()[height])
+
+    def body_at(self, height):
+        return self.read_body(self.entries()[height])
+
+    def entries(self):
+        """
+        BlockLocation of every record, in chain order. Loaded from the
+        offset index on first use; records written after the last indexed
+        one (or every record, if the index is missing or stale) are
+        scanned and indexed.
+        """
+        if self._entries is None:
+            self._open_index()
+        return self._entries
+
+    def _open_index(self):
+        entries = self._read_index()
+        segments = self.segments()
+        if entries:
+            last = entries[-1]
+            if last.segment not in segments or \
+                    _record_end(last) > os.path.getsize(self._segment_path(last.segment)):
+                entries = []
+
+        if not entries:
+            scanned = list(self._scan())
+        elif entries[-1].segment == segments[-1] and _record_end(entries[-1]) == \
+                os.path.getsize(self._segment_path(segments[-1])):
+            scanned = []
+        else:
+            scanned = list(self._scan((entries[-1].segment, _record_end(entries[-1]))))
+        self._entries = entries + scanned
+        # Rewrite the index if records were added to it, or it is missing
+        # or has a torn entry at the end
+        expected = _INDEX_HEADER.size + len(self._entries) * _INDEX_ENTRY.size
+        if segments and (not os.path.exists(self.index_filename)
+                         or os.path.getsize(self.index_filename) != expected):
+            self._write_index(self.index_filename, self._entries)
+
+    def _read_index(self):
+        """Entries from the index file; [] if it is missing or unreadable."""
+        if not os.path.exists(self.index_filename):
+            return []
+        with open(self.index_filename, "rb") as f:
+            data = f.read()
+        if len(data) < _INDEX_HEADER.size or \
+                _INDEX_HEADER.unpack_from(data, 0) != (MAGIC_INDEX, INDEX_FORMAT):
+            return []
+        count = (len(data) - _INDEX_HEADER.size) // _INDEX_ENTRY.size
+        return [
+            self._index_entry(_INDEX_ENTRY.unpack_from(
+                data, _INDEX_HEADER.size + i * _INDEX_ENTRY.size))
+            for i in range(count)
+        ]
+
+    @staticmethod
+    def _index_entry(fields):
+        segment, offset, header_length, body_length, block_hash = fields
+        return BlockLocation(segment, offset, header_length, body_length, block_hash.hex())
+
+    @staticmethod
+    def _pack_index_entry(location):
+        return _INDEX_ENTRY.pack(*location[:4], bytes.fromhex(location.block_hash))
+
+    @staticmethod
+    def _write_index(filename, entries):
+        """Write a complete index file (via a temporary file and rename)."""
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename + ".tmp", "wb") as f:
+            f.write(_INDEX_HEADER.pack(MAGIC_INDEX, INDEX_FORMAT))
+            f.write(b"".join(BlockLog._pack_index_entry(e) for e in entries))
+        os.replace(filename + ".tmp", filename)
+
+    def _scan(self, resume=None):
+        """
+        Yield the BlockLocation of every record after resume (a
+        (segment, offset) pair), or of every record. Each frame's CRC is
+        checked and its header decoded for the block hash. A torn frame
+        at the end of the newest segment (a crash mid-append: the frame
+        runs to or past the end of the file) is truncated away; damage
+        anywhere else raises ValueError.
+        """
+        self.close()
+        segments = self.segments()
+        for number in segments:
+            if resume is not None and number < resume[0]:
+                continue
+            path = self._segment_path(number)
+            with open(path, "rb") as f:
+                data = f.read()
+
+            log_format, offset = segment_format(data)
+            self._formats[number] = log_format
+            if offset > len(data):
+                # Torn segment header: handled like a torn first record
+                offset = 0
+            if resume is not None and number == resume[0]:
+                offset = resume[1]
+            while offset < len(data):
+                frame = self._read_frame(data, offset)
+                if frame is None:
+                    if number != segments[-1] or _frame_end(data, offset) < len(data):
+                        raise ValueError(f"Corrupt record in {path} at offset {offset}")
+                    print(f"[!] Truncating torn record in {path} at offset {offset}")
+                    with open(path, "r+b") as f:
+                        f.truncate(offset)
+                    return
+
+                header_length, body_length = frame
+                start = offset + _FRAME.size
+                header = decode_header(
+                    data[start:start + header_length], log_format, self.keys
+                )
+                yield BlockLocation(number, offset, header_length, body_length, header.hash)
+                offset = start + header_length + body_length
+
+    @staticmethod
+    def _read_frame(data, offset):
+        """Return (header_length, body_length) if a whole, intact frame starts here."""
+        if offset + _FRAME.size > len(data):
+            return None
+        header_length, body_length, crc = _FRAME.unpack_from(data, offset)
+        start = offset + _FRAME.size
+        end = start + header_length + body_length
+        if end > len(data) or zlib.crc32(data[start:end]) != crc:
+            return None
+        return header_length, body_length
+
+    def _segment_format(self, number):
+        if number not in self._formats:
+            with open(self._segment_path(number), "rb") as f:
+                self._formats[number] = segment_format(f.read(_SEGMENT_HEADER.size))[0]
+        return self._formats[number]
+
+    def _map(self, segment, end):
+        """Read-only mmap of a segment covering at least `end` bytes."""
+        segment_map = self._maps.get(segment)
+        if segment_map is None or len(segment_map) < end:
+            self.flush()
+            if segment_map is not None:
+                segment_map.close()
+            with open(self._segment_path(segment), "rb") as f:
+                segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = segment_map
+        return segment_map
+
+    def _record(self, location):
+        """Return the (header, body) payloads of a record, CRC-checked."""
+        segment_map = self._map(location.segment, _record_end(location))
+        if self._read_frame(segment_map, location.offset) != location[2:4]:
+            raise ValueError(
+                f"Corrupt record in {self._segment_path(location.segment)} "
+                f"at offset {location.offset}"
+            )
+        start = location.offset + _FRAME.size
+        middle = start + location.header_length
+        return segment_map[start:middle], segment_map[middle:_record_end(location)]
+
+    def read_header(self, location):
+        """Decode the header of one record."""
+        header = self._record(location)[0]
+        return decode_header(header, self._segment_format(location.segment), self.keys)
+
+    def read_body(self, location):
+        """Decode the transactions of one record."""
+        body = self._record(location)[1]
+        return decode_body(body, self._segment_format(location.segment), self.keys)
+
+    def append(self, block):
+        """Append one block record, index it and return its BlockLocation."""
+        entries = self.entries()
+        record = frame_record(block, LOG_FORMAT, self.keys)
+        f = self._open_for_append(len(record))
+        offset = f.tell()
+        f.write(record)
+
+        header_length, body_length, _ = _FRAME.unpack_from(record, 0)
+        location = BlockLocation(self._segment, offset, header_length, body_length, block.hash)
+        entries.append(location)
+
+        self._unsynced += 1
+        if self.fsync == FSYNC_ALWAYS or (
+                self.fsync == FSYNC_BATCH and self._unsynced >= FSYNC_BATCH_SIZE):
+            self.sync()
+        # The index is rebuilt from the log if this write is lost, so it
+        # is never fsynced
+        if os.path.exists(self.index_filename):
+            with open(self.index_filename, "ab") as index:
+                index.write(self._pack_index_entry(location))
+        else:
+            self._write_index(self.index_filename, entries)
+        return location
+
+    def _open_for_append(self, record_size):
+        """
+        Return the newest segment opened for append. A new segment is
+        started when that one is full or in an older format.
+        """
+        if self._file is not None and (
+                self._file.tell() + record_size <= self.segment_max_bytes
+                or self._file.tell() == _SEGMENT_HEADER.size):
+            return self._file
+
+        self.close()
+        segments = self.segments()
+        number = segments[-1] if segments else 0
+        path = self._segment_path(number)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size and (self._segment_format(number) != LOG_FORMAT
+                     or size + record_size > self.segment_max_bytes):
+            number += 1
+            path = self._segment_path(number)
+
+        os.makedirs(self.directory, exist_ok=True)
+        created = not os.path.exists(path)
+        self._file = open(path, "ab")
+        self._segment = number
+        if self._file.tell() == 0:
+            self._file.write(_SEGMENT_HEADER.pack(MAGIC, LOG_FORMAT))
+            self._formats[number] = LOG_FORMAT
+        if created and self.fsync != FSYNC_NEVER:
+            _fsync_directory(self.directory)
+        return self._file
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def sync(self):
+        """Flush and fsync the open segment."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        """Close the append handle, every mapping and the key table."""
+        if self._file is not None:
+            if self.fsync != FSYNC_NEVER:
+                self.sync()
+            self._file.close()
+            self._file = None
+        for segment_map in self._maps.values():
+            segment_map.close()
+        self._maps = {}
+        self.keys.reset()
+
+    def rewrite(self, blocks):
+        """
+        Compact: write blocks into fresh, densely packed segments and
+        swap them in place of the current ones. Returns the new entries.
+        """
+        self.flush()
+        staging = BlockLog(self.directory + ".tmp", FSYNC_NEVER, self.segment_max_bytes)
+        staging.clear()
+        for block in blocks:
+            staging.append(block)
+        staging.sync()
+        staging.keys.sync()
+        staging.close()
+
+        self.close()
+        old = self.directory + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.isdir(self.directory):
+            os.rename(self.directory, old)
+        os.rename(staging.directory, self.directory)
+        _fsync_directory(os.path.dirname(os.path.abspath(self.directory)))
+        shutil.rmtree(old, ignore_errors=True)
+
+        self._formats = {}
+        self._entries = staging.entries()
+        return self._entries
+
+    def clear(self):
+        """Delete every segment, the index and the key table."""
+        self.close()
+        self._formats = {}
+        self._entries = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ChainView(Sequence):
+    """
+    The chain as a sequence over a block store (a BlockLog or an
+    SQLiteLedger): len() and block hashes come from the store's index,
+    and a block is decoded only when accessed (its body on first use).
+    Only the most recently used CHAIN_CACHE_SIZE blocks are kept.
+    Blocks appended after loading are held in memory until stored.
+    """
+
+    def __init__(self, store, cache_size=CHAIN_CACHE_SIZE):
+        self.store = store
+        self.cache_size = cache_size
+        self._stored = len(store)
+        self._appended = []
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return self._stored + len(self._appended)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chain index out of range")
+        if index >= self._stored:
+            return self._appended[index - self._stored]
+
+        block = self._cache.get(index)
+        if block is None:
+            block = Block.from_header(self.store.header_at(index), load_body=self.store.body_at)
+            self._cache[index] = block
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(index)
+        return block
+
+    def hashes(self):
+        """Every block hash, without decoding any block."""
+        return self.store.hashes()[:self._stored] + [block.hash for block in self._appended]
+
+    def append(self, block):
+        self._appended.append(block)
+
+    def pop(self):
+        """Remove the last appended block; stored blocks cannot be removed."""
+        if not self._appended:
+            raise IndexError("cannot pop a stored block")
+        return self._appended.pop()
+
+    def mark_stored(self, store):
+        """Called once store holds every block of this view; drops the in-memory copies."""
+        if store is self.store and len(store) == len(self):
+            self._stored = len(self)
+            self._appended = []
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Compact the ledger and checkpoint the chain
+"""
+
+from blockchain import Blockchain
+from ledger import open_ledger
+from state import AccountState
+
+
+def compact_ledger(ledger):
+    """
+    Validate the saved chain, rewrite its storage compactly (fresh log
+    segments, or VACUUM for SQLite) and save a checkpoint and
+    account-state snapshot at the tip.
+    """
+    print("\n" + "="*60)
+    print("COMPACTING LEDGER")
+    print("="*60)
+
+    chain = ledger.load_blockchain(lazy=True)
+    if chain is None:
+        print("❌ No saved blockchain found!")
+        return False
+
+    size_before = ledger.size()
+
+    blockchain = Blockchain(chain, ledger.load_checkpoint())
+    if not blockchain.is_chain_valid():
+        print("❌ Chain is invalid; not compacting")
+        return False
+
+    ledger.compact(blockchain.chain)
+    ledger.save_checkpoint(blockchain.checkpoint)
+    print(f"✓ Rewrote {len(chain)} blocks: {size_before} bytes -> {ledger.size()} bytes")
+    print(f"✓ Checkpoint at height {blockchain.checkpoint.height}")
+
+    state = AccountState.from_snapshot(ledger.load_snapshot())
+    state.sync(blockchain.chain)
+    ledger.save_snapshot(state.snapshot())
+    print(f"✓ Account-state snapshot at height {state.height}")
+
+    print("\n✅ Ledger compacted successfully!")
+    print("="*60)
+    return True
+
+
+if __name__ == "__main__":
+    compact_ledger(open_ledger())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Convert a blockchain.json ledger to the binary block log, or copy the
+file ledger into the SQLite backend (--sqlite)
+"""
+
+import os
+import sys
+from ledger import Ledger
+from sqlite_ledger import SQLiteLedger
+
+
+def convert_ledger(ledger):
+    """
+    Rewrite the saved chain (a blockchain.json file, or a log with
+    older JSON segments) as binary segments and check that it reloads
+    to the same blocks. The original JSON file is left in place.
+    """
+    print("\n" + "="*60)
+    print("CONVERTING LEDGER")
+    print("="*60)
+
+    json_size = os.path.getsize(ledger.filename) if os.path.exists(ledger.filename) else 0
+    log_size = ledger.log.size()
+    chain = ledger.load_blockchain()
+    if chain is None:
+        print("❌ No saved blockchain found!")
+        return False
+
+    ledger.compact(chain)
+    reloaded = Ledger(ledger.filename).load_blockchain()
+    if [block.hash for block in reloaded] != [block.hash for block in chain]:
+        print("❌ Converted log does not reload to the same chain!")
+        return False
+
+    before = log_size or json_size
+    after = ledger.log.size()
+    print(f"✓ Converted {len(chain)} blocks: {before} bytes -> {after} bytes "
+          f"({before / after:.1f}x smaller)")
+    if json_size:
+        print(f"✓ {ledger.filename} is no longer read and can be deleted")
+
+    print("\n✅ Ledger converted successfully!")
+    print("="*60)
+    return True
+
+
+def copy_ledger(source, target):
+    """
+    Copy the chain, checkpoint and state snapshot from one ledger
+    backend to another, replacing what the target holds.
+    """
+    print("\n" + "="*60)
+    print("COPYING LEDGER")
+    print("="*60)
+
+    chain = source.load_blockchain(lazy=True)
+    if chain is None:
+        print("❌ No saved blockchain found!")
+        return False
+
+    target.compact(chain)
+    target.save_checkpoint(source.load_checkpoint())
+    snapshot = source.load_snapshot()
+    if snapshot is not None:
+        target.save_snapshot(snapshot)
+
+    if [header.hash for header in target.load_headers()] != [block.hash for block in chain]:
+        print("❌ Copied ledger does not hold the same chain!")
+        return False
+
+    print(f"✓ Copied {len(chain)} blocks ({target.size()} bytes)")
+    print("\n✅ Ledger copied successfully!")
+    print("="*60)
+    return True
+
+
+if __name__ == "__main__":
+    if "--sqlite" in sys.argv[1:]:
+        copy_ledger(Ledger(), SQLiteLedger())
+    else:
+        convert_ledger(Ledger(*sys.argv[1:2]))
@@ -0,0 +1,109 @@
+import threading
+from collections import deque
+
+from pqc_crypto import get_scheme
+
+# Number of ready key pairs the pool tries to hold
+DEFAULT_POOL_SIZE = 32
+
+# Refill starts when the pool drops below this many key pairs
+DEFAULT_LOW_WATER = 8
+
+
+class KeyPool:
+    """
+    Pool of pre-generated key pairs for one signature scheme.
+    A background thread keeps it topped up, so creating a Wallet on the
+    request path takes a ready key pair instead of running keygen.
+    """
+
+    def __init__(self, scheme=None, size=DEFAULT_POOL_SIZE,
+                 low_water=DEFAULT_LOW_WATER, **params):
+        self.scheme = get_scheme(scheme)
+        self.params = params
+        self.size = size
+        self.low_water = low_water
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+
+        self._keys = deque()
+        self._lock = threading.Lock()
+        self._refill = threading.Event()
+        self._stopped = False
+
+        self._refill.set()
+        self._thread = threading.Thread(target=self._refill_loop, daemon=True)
+        self._thread.start()
+
+    def matches(self, scheme, params):
+        """Return True if this pool's key pairs fit a wallet's scheme/params."""
+        return scheme is self.scheme and params == self.params
+
+    def take(self):
+        """
+        Take a ready key pair, or return None if the pool is empty.
+        Wakes the refill thread once the pool drops below the low-water mark.
+        """
+        with self._lock:
+            keypair = self._keys.popleft() if self._keys else None
+            if keypair is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if len(self._keys) < self.low_water:
+                self._refill.set()
+        return keypair
+
+    def _refill_loop(self):
+        while True:
+            self._refill.wait()
+            if self._stopped:
+                return
+
+            while len(self._keys) < self.size and not self._stopped:
+                keypair = self.scheme.generate_keypair(None, **self.params)
+                with self._lock:
+                    self._keys.append(keypair)
+                    self.generated += 1
+
+            # Checked under the lock, so a concurrent stop() cannot have
+            # its wake-up cleared
+            with self._lock:
+                if not self._stopped and len(self._keys) >= self.low_water:
+                    self._refill.clear()
+
+    def stop(self):
+        """Stop the refill thread."""
+        with self._lock:
+            self._stopped = True
+            self._refill.set()
+        self._thread.join()
+
+    def stats(self):
+        """Return pool counters."""
+        with self._lock:
+            return {
+                "scheme": self.scheme.name,
+                "available": len(self._keys),
+                "size": self.size,
+                "low_water": self.low_water,
+                "hits": self.hits,
+                "misses": self.misses,
+                "generated": self.generated
+            }
+
+
+# ---------------- TEST KEY POOL ----------------
+if __name__ == "__main__":
+    import time
+    from wallet import Wallet
+
+    pool = KeyPool(size=8, low_water=2)
+    time.sleep(0.5)
+
+    wallets = [Wallet(key_pool=pool) for _ in range(12)]
+    print("Wallets created:", len(wallets))
+    print("Pool stats:", pool.stats())
+    pool.stop()
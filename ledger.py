@@ -1,88 +1,157 @@
 import json
 import os
-from block import Block
-from transaction import Transaction
+from block import Block, BlockHeader
+from blockchain import Checkpoint
+from blocklog import BlockLog, ChainView, FSYNC_ALWAYS
+from sqlite_ledger import SQLiteLedger
+from state import StateSnapshot
 
 
 class Ledger:
-    def __init__(self, filename="data/blockchain.json"):
+    """
+    Blocks are stored in an append-only segment log of binary records
+    (see blocklog.py): saving after a block is mined appends just that
+    block. Ledgers written as a single JSON file are still read and are
+    migrated into the log on the next save (or by convert_ledger.py).
+    """
+
+    indexes_transactions = False
+
+    def __init__(self, filename="data/blockchain.json", fsync=FSYNC_ALWAYS):
         self.filename = filename
+        base = os.path.splitext(filename)[0]
+        self.log = BlockLog(base + "_segments", fsync=fsync)
+        # Written by older versions; only read when the log is empty
+        self.headers_filename = base + "_headers.json"
+        self.checkpoint_filename = base + "_checkpoint.json"
+        self.snapshot_filename = base + "_state.json"
 
     def save_blockchain(self, blockchain):
-        """Save blockchain to JSON file."""
-        data = []
-
-        for block in blockchain.chain:
-            block_data = {
-                "index": block.index,
-                "timestamp": block.timestamp,
-                "previous_hash": block.previous_hash,
-                "hash": block.hash,
-                "signature": [sig.hex() for sig in block.signature],
-                "public_key": [
-                    (pk0.hex(), pk1.hex()) for pk0, pk1 in block.public_key
-                ],
-                "transactions": [
-                    {
-                        "sender": tx.sender,
-                        "receiver": tx.receiver,
-                        "amount": tx.amount,
-                        "timestamp": tx.timestamp,
-                        "signature": [sig.hex() for sig in tx.signature],
-                        "public_key": [
-                            (pk0.hex(), pk1.hex()) for pk0, pk1 in tx.public_key
-                        ]
-                    }
-                    for tx in block.transactions
-                ]
-            }
-            data.append(block_data)
-
-        with open(self.filename, "w") as f:
-            json.dump(data, f, indent=4)
-
-    def load_blockchain(self):
-        """Load blockchain from JSON file."""
-        if not os.path.exists(self.filename):
+        """
+        Append the blocks added since the last save, then save the
+        checkpoint. If the chain no longer extends what is on disk (it
+        was replaced), the log is rewritten instead.
+        """
+        chain = blockchain.chain
+        entries = self.log.entries()
+        saved = len(entries)
+
+        if saved > len(chain) or (saved and chain[saved - 1].hash != entries[-1].block_hash):
+            self.compact(chain)
+        else:
+            for block in chain[saved:]:
+                self.log.append(block)
+            if isinstance(chain, ChainView):
+                chain.mark_stored(self.log)
+        self.save_checkpoint(blockchain.checkpoint)
+
+    def compact(self, chain):
+        """Rewrite the log as exactly these blocks, in fresh segments."""
+        self.log.rewrite(chain)
+        if isinstance(chain, ChainView):
+            chain.mark_stored(self.log)
+
+    def sync(self):
+        """Force appended blocks to disk, whatever the fsync policy."""
+        self.log.sync()
+
+    def size(self):
+        """Bytes on disk (all log segments and the key table)."""
+        return self.log.size()
+
+    def save_checkpoint(self, checkpoint):
+        """Persist the highest validated block (height and hash)."""
+        if checkpoint is None:
+            return
+        with open(self.checkpoint_filename, "w") as f:
+            json.dump(checkpoint._asdict(), f)
+
+    def load_checkpoint(self):
+        """Load the validated checkpoint, or None if there is none."""
+        if not os.path.exists(self.checkpoint_filename):
             return None
+        with open(self.checkpoint_filename, "r") as f:
+            return Checkpoint(**json.load(f))
 
+    def save_snapshot(self, snapshot):
+        """Persist an account-state snapshot."""
+        with open(self.snapshot_filename, "w") as f:
+            json.dump(snapshot._asdict(), f)
+
+    def load_snapshot(self):
+        """Load the latest account-state snapshot, or None if there is none."""
+        if not os.path.exists(self.snapshot_filename):
+            return None
+        with open(self.snapshot_filename, "r") as f:
+            return StateSnapshot(**json.load(f))
+
+    def clear(self):
+        """Delete every file this ledger writes."""
+        self.log.clear()
+        for filename in (self.filename, self.headers_filename,
+                         self.checkpoint_filename, self.snapshot_filename):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def _load_legacy(self):
+        """Parse a ledger saved as one JSON file, or None if there is none."""
+        if not os.path.exists(self.filename):
+            return None
         with open(self.filename, "r") as f:
-            data = json.load(f)
+            return json.load(f)
 
+    def load_headers(self):
+        """Load block headers only; no block body is read."""
+        entries = self.log.entries()
+        if entries:
+            return [self.log.read_header(location) for location in entries]
+
+        data = self._load_legacy()
+        if data is None:
+            return None
+        return [BlockHeader.from_dict(block_data) for block_data in data]
+
+    def load_blockchain(self, lazy=False):
+        """
+        Load the blockchain from the log.
+        With lazy=True this returns a ChainView: only the offset index is
+        read, and each block is decoded from the mmapped log when it is
+        accessed. Legacy single-file ledgers are always loaded in full.
+        """
+        entries = self.log.entries()
+        if not entries:
+            data = self._load_legacy()
+            if data is None:
+                return None
+            return [Block.from_dict(block_data) for block_data in data]
+
+        if lazy:
+            return ChainView(self.log)
+
+        # Rebuilt from header fields and body, so the hash is recomputed
         chain = []
+        for location in entries:
+            header = self.log.read_header(location)
+            chain.append(Block(
+                header.index, self.log.read_body(location), header.previous_hash,
+                header.signature, header.public_key, header.timestamp,
+                header.scheme, header.version
+            ))
+        return chain
 
-        for block_data in data:
-            transactions = []
-            for tx_data in block_data["transactions"]:
-                tx = Transaction(
-                    sender=tx_data["sender"],
-                    receiver=tx_data["receiver"],
-                    amount=tx_data["amount"],
-                    signature=[bytes.fromhex(s) for s in tx_data["signature"]],
-                    public_key=[
-                        (bytes.fromhex(pk0), bytes.fromhex(pk1))
-                        for pk0, pk1 in tx_data["public_key"]
-                    ],
-                    timestamp=tx_data["timestamp"]
-                )
-                transactions.append(tx)
-
-            block = Block(
-                index=block_data["index"],
-                transactions=transactions,
-                previous_hash=block_data["previous_hash"],
-                signature=[bytes.fromhex(s) for s in block_data["signature"]],
-                public_key=[
-                    (bytes.fromhex(pk0), bytes.fromhex(pk1))
-                    for pk0, pk1 in block_data["public_key"]
-                ],
-                timestamp=block_data["timestamp"]
-            )
-
-            chain.append(block)
 
-        return chain
-    
+def open_ledger(backend=None):
+    """
+    Open the configured ledger backend: "file" (the block log, which
+    also reads blockchain.json) or "sqlite". Defaults to the
+    PQC_LEDGER_BACKEND environment variable, then "file".
+    """
+    backend = backend or os.environ.get("PQC_LEDGER_BACKEND", "file")
+    if backend == "file":
+        return Ledger()
+    if backend == "sqlite":
+        return SQLiteLedger()
+    raise ValueError(f"Unknown ledger backend: {backend}")
 
 
     # ---------------- TEST LEDGER ----------------
@@ -106,13 +175,10 @@ if __name__ == "__main__":
     tx_hash = temp_tx.calculate_hash()
     tx_signature = miner_wallet.sign(tx_hash)
 
-    tx = Transaction(
-        sender="Alice",
-        receiver="Bob",
-        amount=50,
+    tx = temp_tx.replace(
         signature=tx_signature,
-        public_key=miner_wallet.public_key,
-        timestamp=temp_tx.timestamp
+        public_key=miner_wallet.get_verification_key(),
+        scheme=miner_wallet.scheme_id
     )
 
     blockchain.add_block([tx], miner_wallet)
@@ -121,4 +187,12 @@ if __name__ == "__main__":
     print("Blockchain saved to file.")
 
     loaded_chain = ledger.load_blockchain()
-    print("Blocks loaded from file:", len(loaded_chain))
\ No newline at end of file
+    print("Blocks loaded from file:", len(loaded_chain))
+
+    lazy_chain = ledger.load_blockchain(lazy=True)
+    print("Headers loaded, bodies pending:", sum(not b.body_loaded for b in lazy_chain))
+
+    size = ledger.log.size()
+    blockchain.add_block([], miner_wallet)
+    ledger.save_blockchain(blockchain)
+    print("Bytes appended for the next block:", ledger.log.size() - size)
\ No newline at end of file
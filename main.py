@@ -1,7 +1,7 @@
 from wallet import Wallet
 from transaction import Transaction
 from blockchain import Blockchain
-from ledger import Ledger
+from ledger import open_ledger
 
 
 def print_menu():
@@ -16,14 +16,15 @@ def print_menu():
 
 
 def main():
-    ledger = Ledger()
-    blockchain = Blockchain()
+    ledger = open_ledger()
 
-    # Load blockchain from file if exists
-    loaded_chain = ledger.load_blockchain()
+    # Load blockchain from file if exists; genesis only for a new ledger
+    loaded_chain = ledger.load_blockchain(lazy=True)
     if loaded_chain:
-        blockchain.chain = loaded_chain
+        blockchain = Blockchain(loaded_chain, ledger.load_checkpoint())
         print("[+] Blockchain loaded from disk.")
+    else:
+        blockchain = Blockchain()
 
     wallet = None
     pending_transactions = []
@@ -64,13 +65,10 @@ def main():
             tx_hash = temp_tx.calculate_hash()
             signature = wallet.sign(tx_hash)
 
-            tx = Transaction(
-                sender=wallet.get_address(),
-                receiver=receiver,
-                amount=amount,
+            tx = temp_tx.replace(
                 signature=signature,
-                public_key=wallet.public_key,
-                timestamp=temp_tx.timestamp
+                public_key=wallet.get_verification_key(),
+                scheme=wallet.scheme_id
             )
 
             pending_transactions.append(tx)
@@ -136,6 +136,18 @@ def get_profile(user_id):
     return profile
 
 
+def user_exists(user_id):
+    """Return True if a user with this id is registered."""
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT 1 FROM users WHERE id = ?", (user_id,))
+
+    found = cursor.fetchone() is not None
+    conn.close()
+    return found
+
+
 def get_balance(user_id):
     """Get user balance.
     
@@ -1,70 +1,1052 @@
+import atexit
 import hashlib
+import os
 import secrets
+import struct
+import threading
+from collections import OrderedDict, namedtuple
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
 
 # Number of bits for message hash (SHA-256 = 256 bits)
 HASH_BITS = 256
 
+# Size of every Lamport secret, public hash and signature chunk
+CHUNK_BYTES = 32
+
+# Flat Lamport buffers: keys hold (value0, value1) for each bit back to
+# back, signatures hold one chunk per bit
+LAMPORT_KEY_BYTES = 2 * HASH_BITS * CHUNK_BYTES         # 16384
+LAMPORT_SIGNATURE_BYTES = HASH_BITS * CHUNK_BYTES       # 8192
+
+# Size of the seed a seeded Lamport private key is expanded from
+SEED_BYTES = 32
+
+# Bits of every byte value, most significant first: _BYTE_BITS[byte][j]
+_BYTE_BITS = tuple(
+    tuple((value >> (7 - j)) & 1 for j in range(8)) for value in range(256)
+)
+
+# Unpackers for the 8 chunks one digest byte selects from its 8 pairs
+# of a flat key, so selection runs in C rather than one slice per bit:
+# _BYTE_SELECT[byte] takes value<bit> of each pair, _BYTE_OTHER the rest
+_BYTE_SELECT = tuple(
+    struct.Struct("".join(
+        f"{CHUNK_BYTES}x{CHUNK_BYTES}s" if bit else f"{CHUNK_BYTES}s{CHUNK_BYTES}x"
+        for bit in bits
+    ))
+    for bits in _BYTE_BITS
+)
+_BYTE_OTHER = tuple(_BYTE_SELECT[255 - value] for value in range(256))
+_BYTE_BASES = tuple(
+    16 * CHUNK_BYTES * position for position in range(HASH_BITS // 8)
+)
+
+# PRF inputs (index, bit) for the 2 * 256 secrets of a seeded Lamport key
+_LAMPORT_LABELS = tuple(
+    (i.to_bytes(2, "big") + b"\x00", i.to_bytes(2, "big") + b"\x01")
+    for i in range(HASH_BITS)
+)
+
+# Splits a flat Lamport signature into its 256 chunks
+_SIGNATURE_CHUNKS = struct.Struct(f"{CHUNK_BYTES}s" * HASH_BITS)
+
+# Default Merkle tree height: a Merkle key signs 2 ** height messages
+MERKLE_TREE_HEIGHT = 4
+
+# Default Winternitz parameter: larger w = smaller signatures, more hashing
+WINTERNITZ_W = 16
+WINTERNITZ_VALUES = (4, 16, 256)
+
 
 def sha256(data: bytes) -> bytes:
     """Return SHA-256 hash of input data."""
     return hashlib.sha256(data).digest()
 
 
+def chunks(buffer, size: int = CHUNK_BYTES):
+    """
+    Split a flat buffer into 32-byte chunks.
+    Pass a memoryview for zero-copy chunks; for 32-byte pieces plain
+    bytes slices are cheaper, so hot paths slice bytes directly.
+    """
+    return [buffer[i:i + size] for i in range(0, len(buffer), size)]
+
+
+def hash_chunks(buffer) -> bytes:
+    """Hash every 32-byte chunk of a flat buffer, concatenating the results."""
+    digest = hashlib.sha256
+    return b''.join([
+        digest(buffer[i:i + CHUNK_BYTES]).digest()
+        for i in range(0, len(buffer), CHUNK_BYTES)
+    ])
+
+
+def as_flat(value) -> bytes:
+    """
+    Return a Lamport key or signature as one flat buffer.
+    Lists of chunks or (value0, value1) pairs are joined once.
+    """
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return b''.join(
+        b''.join(item) if isinstance(item, (tuple, list)) else item
+        for item in value
+    )
+
+
 def generate_lamport_keypair():
     """
     Generate a Lamport key pair.
-    Private key: 256 pairs of random values
-    Public key: Hash of private key values
+    Private key: 256 pairs of random values (one flat 16 KB buffer)
+    Public key: Hash of private key values (one flat 16 KB buffer)
+    """
+    private_key = secrets.token_bytes(LAMPORT_KEY_BYTES)
+    public_key = hash_chunks(private_key)
+
+    return private_key, public_key
+
+
+def derive_lamport_secret(seed: bytes, index: int, bit: int) -> bytes:
+    """
+    Derive one Lamport secret value from a seed.
+    PRF: BLAKE2b keyed with the seed over (index, bit).
+    """
+    return hashlib.blake2b(
+        index.to_bytes(2, "big") + bytes((bit,)),
+        key=seed,
+        digest_size=32
+    ).digest()
+
+
+def derive_wots_secret(seed: bytes, chain_index: int) -> bytes:
+    """
+    Derive the start of one WOTS chain from a seed.
+    Same PRF as derive_lamport_secret under a distinct "wots" label, so a
+    seed reused across schemes never yields the same secret twice.
+    """
+    return hashlib.blake2b(
+        b"wots" + chain_index.to_bytes(2, "big"),
+        key=seed,
+        digest_size=32
+    ).digest()
+
+
+class SeededLamportKey:
+    """
+    Lamport private key stored as a single seed.
+    Secret values are expanded on demand: only the revealed half when
+    signing, or the full flat key when it is really needed.
     """
-    private_key = []
-    public_key = []
 
-    for _ in range(HASH_BITS):
-        sk0 = secrets.token_bytes(32)
-        sk1 = secrets.token_bytes(32)
-        private_key.append((sk0, sk1))
+    __slots__ = ("seed",)
+
+    def __init__(self, seed: bytes):
+        if len(seed) != SEED_BYTES:
+            raise ValueError(f"Seed must be {SEED_BYTES} bytes")
+        self.seed = seed
+
+    def expand(self) -> bytes:
+        """Derive the full flat private key."""
+        seed = self.seed
+        blake2b = hashlib.blake2b
+        return b''.join([
+            blake2b(label, key=seed, digest_size=32).digest()
+            for labels in _LAMPORT_LABELS for label in labels
+        ])
+
+    def select(self, bits) -> bytes:
+        """Derive only the secrets revealed for the given message bits."""
+        seed = self.seed
+        blake2b = hashlib.blake2b
+        return b''.join([
+            blake2b(labels[bit], key=seed, digest_size=32).digest()
+            for labels, bit in zip(_LAMPORT_LABELS, bits)
+        ])
+
+
+def generate_seeded_lamport_keypair(seed: bytes = None):
+    """
+    Generate a Lamport key pair from a single 32-byte seed.
+    Private key: SeededLamportKey (the seed only)
+    Public key: Hash of the derived private key values
+    Passing an existing seed reproduces the same key pair.
+    """
+    if seed is None:
+        seed = secrets.token_bytes(SEED_BYTES)
 
-        pk0 = sha256(sk0)
-        pk1 = sha256(sk1)
-        public_key.append((pk0, pk1))
+    private_key = SeededLamportKey(seed)
+    public_key = hash_chunks(private_key.expand())
 
     return private_key, public_key
 
 
-def sign_message(message: str, private_key):
+def lamport_public_key_digest(public_key) -> bytes:
+    """Return SHA-256 of the concatenated Lamport public key."""
+    return sha256(as_flat(public_key))
+
+
+# ---------------- COMPACT LAMPORT SIGNATURES ----------------
+
+# Revealed preimages plus the public hashes of the unrevealed sides,
+# each a flat 8 KB buffer. Together they rebuild the full public key,
+# so a verifier only needs its 32-byte hash (the wallet address).
+CompactSignature = namedtuple("CompactSignature", ["revealed", "complement"])
+
+
+def message_bits(message: str):
+    """Return the 256 bits of the message hash, most significant first."""
+    message_hash = sha256(message.encode())
+    return list(chain.from_iterable(map(_BYTE_BITS.__getitem__, message_hash)))
+
+
+def lamport_select(message: str, key, table=_BYTE_SELECT):
     """
-    Sign a message using Lamport private key.
+    Return the chunks of a flat Lamport key selected by each message bit
+    (with table=_BYTE_OTHER, the other half of each pair instead).
     """
     message_hash = sha256(message.encode())
-    signature = []
+    return list(chain.from_iterable(
+        table[byte].unpack_from(key, base)
+        for base, byte in zip(_BYTE_BASES, message_hash)
+    ))
+
+
+def sign_compact_message(message: str, private_key):
+    """
+    Sign a message with a Lamport private key in compact form.
+    """
+    if isinstance(private_key, SeededLamportKey):
+        private_key = private_key.expand()
+    key = as_flat(private_key)
+    digest = hashlib.sha256
+    return CompactSignature(
+        b''.join(lamport_select(message, key)),
+        b''.join([
+            digest(other).digest()
+            for other in lamport_select(message, key, _BYTE_OTHER)
+        ])
+    )
+
+
+def lamport_public_key_from_compact(message: str, signature: CompactSignature):
+    """Rebuild the flat Lamport public key from a compact signature."""
+    digest = hashlib.sha256
+    return b''.join(chain.from_iterable(
+        (other, digest(preimage).digest()) if bit
+        else (digest(preimage).digest(), other)
+        for bit, preimage, other in zip(
+            message_bits(message),
+            chunks(as_flat(signature.revealed)),
+            chunks(as_flat(signature.complement))
+        )
+    ))
+
+
+def compact_signature_is_well_formed(signature: CompactSignature):
+    return (len(as_flat(signature.revealed)) == LAMPORT_SIGNATURE_BYTES
+            and len(as_flat(signature.complement)) == LAMPORT_SIGNATURE_BYTES)
+
+
+def verify_compact_signature(message: str, signature: CompactSignature, key_hash):
+    """
+    Verify a compact Lamport signature against the public key hash.
+    A full public key is also accepted and hashed first.
+    """
+    if not isinstance(signature, CompactSignature) or isinstance(key_hash, WotsPublicKey):
+        return False
+    if not compact_signature_is_well_formed(signature):
+        return False
+    if not isinstance(key_hash, bytes) or len(key_hash) != CHUNK_BYTES:
+        key_hash = lamport_public_key_digest(key_hash)
+
+    public_key = lamport_public_key_from_compact(message, signature)
+    return lamport_public_key_digest(public_key) == key_hash
+
+
+# ---------------- MERKLE SIGNATURES ----------------
+
+MerkleSignature = namedtuple(
+    "MerkleSignature",
+    ["leaf_index", "ots_signature", "auth_path"]
+)
+
+
+def merkle_node(left: bytes, right: bytes) -> bytes:
+    """Hash two child nodes into their parent node."""
+    return sha256(b"\x01" + left + right)
+
+
+def build_merkle_tree(leaves):
+    """
+    Build all levels of a Merkle tree.
+    Returns a list of levels, from the leaves up to [root].
+    A last node without a sibling is promoted to the next level unchanged.
+    """
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [
+            merkle_node(level[i], level[i + 1])
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) & 1:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_auth_path(levels, leaf_index: int):
+    """Return the sibling hashes from a leaf up to (excluding) the root."""
+    path = []
+    index = leaf_index
+    for level in levels[:-1]:
+        if index ^ 1 < len(level):
+            path.append(level[index ^ 1])
+        index >>= 1
+    return path
+
+
+def merkle_root_from_path(leaf: bytes, leaf_index: int, auth_path, leaf_count=None):
+    """
+    Recompute the Merkle root from a leaf and its authentication path.
+    leaf_count is needed when it is not a power of two, so levels where
+    the node was promoted without a sibling are known. Returns None if the
+    path does not fit the tree shape.
+    """
+    if leaf_count is None:
+        leaf_count = 1 << len(auth_path)
+    if not 0 <= leaf_index < leaf_count:
+        return None
+
+    node = leaf
+    index = leaf_index
+    width = leaf_count
+    siblings = iter(auth_path)
+    while width > 1:
+        if index ^ 1 < width:
+            sibling = next(siblings, None)
+            if sibling is None:
+                return None
+            if index & 1:
+                node = merkle_node(sibling, node)
+            else:
+                node = merkle_node(node, sibling)
+        index >>= 1
+        width = (width + 1) >> 1
+    if next(siblings, None) is not None:
+        return None
+    return node
+
+
+class MerklePrivateKey:
+    """
+    Merkle (XMSS-style) private key.
+    Every leaf is a seeded Lamport one-time key derived from one master
+    seed; the tree levels are kept so authentication paths are free.
+    """
+
+    __slots__ = ("seed", "height", "levels", "next_leaf")
+
+    def __init__(self, seed: bytes, height: int, levels, next_leaf: int = 0):
+        self.seed = seed
+        self.height = height
+        self.levels = levels
+        self.next_leaf = next_leaf
+
+    def leaf_key(self, leaf_index: int):
+        """Return the Lamport key pair of a leaf."""
+        leaf_seed = hashlib.blake2b(
+            leaf_index.to_bytes(4, "big"),
+            key=self.seed,
+            digest_size=SEED_BYTES
+        ).digest()
+        return generate_seeded_lamport_keypair(leaf_seed)
+
+    def leaves_remaining(self):
+        return (1 << self.height) - self.next_leaf
+
+
+def generate_merkle_keypair(height: int = MERKLE_TREE_HEIGHT, seed: bytes = None):
+    """
+    Generate a Merkle key pair over 2 ** height Lamport leaves.
+    Private key: MerklePrivateKey
+    Public key: 32-byte Merkle root
+    """
+    if seed is None:
+        seed = secrets.token_bytes(SEED_BYTES)
+
+    private_key = MerklePrivateKey(seed, height, None)
+    leaves = [
+        lamport_public_key_digest(private_key.leaf_key(i)[1])
+        for i in range(1 << height)
+    ]
+    private_key.levels = build_merkle_tree(leaves)
+
+    return private_key, private_key.levels[-1][0]
+
+
+def sign_merkle_message(message: str, private_key: MerklePrivateKey):
+    """
+    Sign a message with the next unused leaf of a Merkle private key.
+    """
+    if private_key.leaves_remaining() <= 0:
+        raise ValueError("Merkle key exhausted: all one-time leaves are used")
+
+    leaf_index = private_key.next_leaf
+    private_key.next_leaf += 1
+
+    ots_private, _ = private_key.leaf_key(leaf_index)
+    return MerkleSignature(
+        leaf_index=leaf_index,
+        ots_signature=sign_compact_message(message, ots_private),
+        auth_path=merkle_auth_path(private_key.levels, leaf_index)
+    )
+
+
+def verify_merkle_signature(message: str, signature: MerkleSignature, root: bytes):
+    """
+    Verify a Merkle signature: the leaf public key is rebuilt from the
+    compact leaf signature, then hashed up the authentication path.
+    """
+    if not isinstance(signature, MerkleSignature) or not isinstance(root, bytes):
+        return False
+    ots_signature = signature.ots_signature
+    if not isinstance(ots_signature, CompactSignature) or \
+            not isinstance(signature.leaf_index, int):
+        return False
+    if not compact_signature_is_well_formed(ots_signature):
+        return False
+
+    leaf = lamport_public_key_digest(
+        lamport_public_key_from_compact(message, ots_signature)
+    )
+    computed_root = merkle_root_from_path(
+        leaf, signature.leaf_index, signature.auth_path
+    )
+    return computed_root == root
+
+
+# ---------------- WINTERNITZ SIGNATURES ----------------
+
+WotsPublicKey = namedtuple("WotsPublicKey", ["w", "chains"])
+WotsSignature = namedtuple("WotsSignature", ["w", "chains"])
+
+
+def wots_parameters(w: int):
+    """
+    Return (bits per digit, message digits, checksum digits) for w.
+    w = 16 gives 64 + 3 = 67 chains of 32 bytes.
+    """
+    if w not in WINTERNITZ_VALUES:
+        raise ValueError(f"Winternitz parameter must be one of {WINTERNITZ_VALUES}")
+
+    log_w = w.bit_length() - 1
+    len1 = HASH_BITS // log_w
+    max_checksum = len1 * (w - 1)
+    len2 = 1
+    while w ** len2 <= max_checksum:
+        len2 += 1
+    return log_w, len1, len2
+
+
+def wots_digits(message: str, w: int):
+    """Split the message hash into base-w digits followed by the checksum."""
+    log_w, len1, len2 = wots_parameters(w)
+    value = int.from_bytes(sha256(message.encode()), "big")
+    mask = w - 1
+
+    digits = [
+        (value >> (HASH_BITS - log_w * (i + 1))) & mask for i in range(len1)
+    ]
+    checksum = sum(mask - d for d in digits)
+    digits.extend(
+        (checksum >> (log_w * (len2 - 1 - i))) & mask for i in range(len2)
+    )
+    return digits
+
+
+def wots_chain(value: bytes, chain_index: int, start: int, steps: int) -> bytes:
+    """Apply `steps` chain hashes, each tweaked by chain index and position."""
+    for position in range(start, start + steps):
+        value = sha256(
+            chain_index.to_bytes(2, "big") + position.to_bytes(1, "big") + value
+        )
+    return value
+
+
+class WotsPrivateKey:
+    """
+    Winternitz one-time private key, expanded from a single seed.
+    """
+
+    __slots__ = ("seed", "w")
+
+    def __init__(self, seed: bytes, w: int = WINTERNITZ_W):
+        self.seed = seed
+        self.w = w
 
-    for i, bit in enumerate(message_hash):
-        for j in range(8):
-            bit_value = (bit >> (7 - j)) & 1
-            signature.append(private_key[i * 8 + j][bit_value])
+    def chain_start(self, chain_index: int) -> bytes:
+        return derive_wots_secret(self.seed, chain_index)
 
-    return signature
+
+def generate_wots_keypair(w: int = WINTERNITZ_W, seed: bytes = None):
+    """
+    Generate a Winternitz (WOTS) key pair.
+    Private key: WotsPrivateKey (seed + w)
+    Public key: end of every hash chain (w - 1 steps from the secret)
+    """
+    if seed is None:
+        seed = secrets.token_bytes(SEED_BYTES)
+
+    _, len1, len2 = wots_parameters(w)
+    private_key = WotsPrivateKey(seed, w)
+    public_key = WotsPublicKey(w, [
+        wots_chain(private_key.chain_start(i), i, 0, w - 1)
+        for i in range(len1 + len2)
+    ])
+
+    return private_key, public_key
+
+
+def sign_wots_message(message: str, private_key: WotsPrivateKey):
+    """Sign a message: walk chain i forward by message digit i."""
+    digits = wots_digits(message, private_key.w)
+    return WotsSignature(private_key.w, [
+        wots_chain(private_key.chain_start(i), i, 0, digit)
+        for i, digit in enumerate(digits)
+    ])
+
+
+def wots_public_key_from_signature(message: str, signature: WotsSignature):
+    """Complete every chain of a signature to recover the public key."""
+    w = signature.w
+    digits = wots_digits(message, w)
+    if len(signature.chains) != len(digits):
+        return None
+    return WotsPublicKey(w, [
+        wots_chain(value, i, digit, w - 1 - digit)
+        for i, (value, digit) in enumerate(zip(signature.chains, digits))
+    ])
+
+
+def verify_wots_signature(message: str, signature: WotsSignature,
+                          public_key: WotsPublicKey):
+    """
+    Verify a WOTS signature by completing its chains.
+    The public key may also be given as its 32-byte hash.
+    """
+    # w comes from the signer, so an unsupported one is an invalid
+    # signature rather than an error
+    if not isinstance(signature, WotsSignature) or signature.w not in WINTERNITZ_VALUES:
+        return False
+    if not isinstance(public_key, (bytes, WotsPublicKey)):
+        return False
+    recovered = wots_public_key_from_signature(message, signature)
+    if recovered is None:
+        return False
+    if isinstance(public_key, bytes):
+        return wots_public_key_digest(recovered) == public_key
+    if signature.w != public_key.w:
+        return False
+    return recovered.chains == list(public_key.chains)
+
+
+def wots_public_key_digest(public_key: WotsPublicKey) -> bytes:
+    """Return SHA-256 of the concatenated WOTS public key chains."""
+    return sha256(b''.join(public_key.chains))
+
+
+# ---------------- SIGN / VERIFY ----------------
+
+def sign_message(message: str, private_key):
+    """
+    Sign a message with any supported private key.
+    Lamport keys produce a Lamport signature, Merkle private keys sign with their next unused leaf;
+    WOTS private keys produce a Winternitz signature.
+    """
+    if isinstance(private_key, MerklePrivateKey):
+        return sign_merkle_message(message, private_key)
+    if isinstance(private_key, WotsPrivateKey):
+        return sign_wots_message(message, private_key)
+    return sign_lamport_message(message, private_key)
 
 
 def verify_signature(message: str, signature, public_key):
+    """
+    Verify any supported signature, dispatching on its type.
+    Lamport signatures are checked against the full public key, Merkle
+    signatures are verified against the Merkle root, Winternitz
+    signatures against the WOTS chain ends, and compact signatures
+    against the 32-byte public key hash.
+    """
+    if isinstance(signature, MerkleSignature):
+        return verify_merkle_signature(message, signature, public_key)
+    if isinstance(signature, WotsSignature):
+        if not isinstance(public_key, (WotsPublicKey, bytes)):
+            return False
+        return verify_wots_signature(message, signature, public_key)
+    if isinstance(signature, CompactSignature):
+        return verify_compact_signature(message, signature, public_key)
+    return verify_lamport_signature(message, signature, public_key)
+
+
+def sign_lamport_message(message: str, private_key):
+    """
+    Sign a message using Lamport private key.
+    """
+    if isinstance(private_key, SeededLamportKey):
+        return private_key.select(message_bits(message))
+
+    key = as_flat(private_key)
+    return b''.join(lamport_select(message, key))
+
+
+def verify_lamport_signature(message: str, signature, public_key):
     """
     Verify Lamport signature using public key.
     """
-    message_hash = sha256(message.encode())
-    sig_index = 0
+    # Other schemes' signatures and keys are namedtuples
+    if isinstance(signature, tuple) or isinstance(public_key, tuple):
+        return False
+    signature = as_flat(signature)
+    public_key = as_flat(public_key)
+    if len(signature) != LAMPORT_SIGNATURE_BYTES or len(public_key) != LAMPORT_KEY_BYTES:
+        return False
+
+    digest = hashlib.sha256
+    revealed_hashes = [
+        digest(chunk).digest() for chunk in _SIGNATURE_CHUNKS.unpack(signature)
+    ]
+    return revealed_hashes == lamport_select(message, public_key)
+
+
+# ---------------- SERIALIZATION ----------------
+
+def encode_signature(signature):
+    """Convert a signature into a JSON-serializable value."""
+    if isinstance(signature, MerkleSignature):
+        return {
+            "leaf_index": signature.leaf_index,
+            "ots_signature": encode_signature(signature.ots_signature),
+            "auth_path": [node.hex() for node in signature.auth_path]
+        }
+    if isinstance(signature, WotsSignature):
+        return {
+            "w": signature.w,
+            "chains": [value.hex() for value in signature.chains]
+        }
+    if isinstance(signature, CompactSignature):
+        return {
+            "revealed": as_flat(signature.revealed).hex(),
+            "complement": as_flat(signature.complement).hex()
+        }
+    return as_flat(signature).hex()
+
+
+def _decode_flat(data) -> bytes:
+    """Decode a hex buffer, or a legacy list of hex chunks / pairs."""
+    if isinstance(data, str):
+        return bytes.fromhex(data)
+    return b''.join(
+        b''.join(bytes.fromhex(v) for v in item) if isinstance(item, (list, tuple))
+        else bytes.fromhex(item)
+        for item in data
+    )
+
+
+def decode_signature(data):
+    """Rebuild a signature produced by encode_signature."""
+    if isinstance(data, dict) and "revealed" in data:
+        return CompactSignature(
+            _decode_flat(data["revealed"]),
+            _decode_flat(data["complement"])
+        )
+    if isinstance(data, dict) and "chains" in data:
+        return WotsSignature(
+            data["w"], [bytes.fromhex(value) for value in data["chains"]]
+        )
+    if isinstance(data, dict):
+        return MerkleSignature(
+            leaf_index=data["leaf_index"],
+            ots_signature=decode_signature(data["ots_signature"]),
+            auth_path=[bytes.fromhex(node) for node in data["auth_path"]]
+        )
+    return _decode_flat(data)
+
+
+def encode_public_key(public_key):
+    """
+    Convert a public key for JSON: a flat Lamport key, WOTS chains, or a
+    32-byte value (Merkle root or public key hash), as hex.
+    """
+    if isinstance(public_key, WotsPublicKey):
+        return {
+            "w": public_key.w,
+            "chains": [value.hex() for value in public_key.chains]
+        }
+    return as_flat(public_key).hex()
+
+
+def decode_public_key(data):
+    """Rebuild a public key produced by encode_public_key."""
+    if isinstance(data, dict):
+        return WotsPublicKey(
+            data["w"], [bytes.fromhex(value) for value in data["chains"]]
+        )
+    return _decode_flat(data)
+
+
+def signature_size(signature) -> int:
+    """Return the number of raw bytes carried by a signature."""
+    if isinstance(signature, MerkleSignature):
+        return (4 + signature_size(signature.ots_signature)
+                + 32 * len(signature.auth_path))
+    if isinstance(signature, WotsSignature):
+        return 1 + sum(len(value) for value in signature.chains)
+    if isinstance(signature, CompactSignature):
+        return len(as_flat(signature.revealed)) + len(as_flat(signature.complement))
+    return len(as_flat(signature))
+
+
+def signature_bytes(signature) -> bytes:
+    """Return a canonical byte encoding of any supported signature."""
+    if isinstance(signature, MerkleSignature):
+        return (signature.leaf_index.to_bytes(4, "big")
+                + signature_bytes(signature.ots_signature)
+                + b''.join(signature.auth_path))
+    if isinstance(signature, WotsSignature):
+        return signature.w.to_bytes(2, "big") + b''.join(signature.chains)
+    if isinstance(signature, CompactSignature):
+        return as_flat(signature.revealed) + as_flat(signature.complement)
+    return as_flat(signature)
+
+
+def public_key_bytes(public_key) -> bytes:
+    """Return a canonical byte encoding of any supported public key."""
+    if isinstance(public_key, WotsPublicKey):
+        return public_key.w.to_bytes(2, "big") + b''.join(public_key.chains)
+    return as_flat(public_key)
+
+
+def compact_signature_from_bytes(data: bytes) -> CompactSignature:
+    """Inverse of signature_bytes for compact Lamport signatures."""
+    return CompactSignature(
+        bytes(data[:LAMPORT_SIGNATURE_BYTES]),
+        bytes(data[LAMPORT_SIGNATURE_BYTES:2 * LAMPORT_SIGNATURE_BYTES])
+    )
+
+
+def wots_signature_from_bytes(data: bytes) -> WotsSignature:
+    """Inverse of signature_bytes for WOTS signatures."""
+    return WotsSignature(int.from_bytes(data[:2], "big"), chunks(bytes(data[2:])))
+
+
+def wots_public_key_from_bytes(data: bytes):
+    """Inverse of public_key_bytes for a WOTS key or its 32-byte hash."""
+    if len(data) == CHUNK_BYTES:
+        return bytes(data)
+    return WotsPublicKey(int.from_bytes(data[:2], "big"), chunks(bytes(data[2:])))
+
+
+def merkle_signature_from_bytes(data: bytes) -> MerkleSignature:
+    """Inverse of signature_bytes for Merkle signatures."""
+    ots_end = 4 + 2 * LAMPORT_SIGNATURE_BYTES
+    return MerkleSignature(
+        leaf_index=int.from_bytes(data[:4], "big"),
+        ots_signature=compact_signature_from_bytes(data[4:ots_end]),
+        auth_path=chunks(bytes(data[ots_end:]))
+    )
+
 
-    for i, byte in enumerate(message_hash):
-        for j in range(8):
-            bit_value = (byte >> (7 - j)) & 1
-            expected_hash = public_key[i * 8 + j][bit_value]
+def public_key_size(public_key) -> int:
+    """Return the number of raw bytes carried by a public key."""
+    if isinstance(public_key, WotsPublicKey):
+        return 1 + sum(len(value) for value in public_key.chains)
+    return len(as_flat(public_key))
 
-            if sha256(signature[sig_index]) != expected_hash:
-                return False
 
-            sig_index += 1
+# ---------------- SCHEME REGISTRY ----------------
 
-    return True
+# A signature scheme resolved by id. Transactions and blocks record the
+# id so verifiers never have to guess the signature format.
+#   generate_keypair(seed=None, **params) -> (private_key, public_key)
+#   sign(message, private_key)            -> signature
+#   verify(message, signature, key)       -> bool
+#   key_hash(public_key)                  -> 32 bytes, hex = wallet address
+#   verification_key(public_key)          -> key stored with signatures
+#   max_signatures(private_key)           -> signatures allowed per key
+#   signature_from_bytes(data)            -> inverse of signature_bytes
+#   public_key_from_bytes(data)           -> inverse of public_key_bytes
+SignatureScheme = namedtuple(
+    "SignatureScheme",
+    ["name", "generate_keypair", "sign", "verify", "key_hash",
+     "verification_key", "max_signatures", "signature_from_bytes",
+     "public_key_from_bytes"]
+)
 
+SCHEMES = {}
+
+# Scheme of records written before scheme ids were stored
+LEGACY_SCHEME = "lamport"
+
+# Deployment-wide default, overridable with PQC_SIGNATURE_SCHEME
+DEFAULT_SCHEME = os.environ.get("PQC_SIGNATURE_SCHEME", "lamport-seeded")
+
+
+def register_scheme(scheme: SignatureScheme):
+    """Register a signature scheme under its id."""
+    SCHEMES[scheme.name] = scheme
+    return scheme
+
+
+def get_scheme(name=None) -> SignatureScheme:
+    """Return a registered scheme (the default one if name is None)."""
+    name = name or DEFAULT_SCHEME
+    try:
+        return SCHEMES[name]
+    except KeyError:
+        raise ValueError(f"Unknown signature scheme: {name}") from None
+
+
+def _generate_random_lamport_keypair(seed=None):
+    if seed is not None:
+        raise ValueError("The 'lamport' scheme does not use seeds")
+    return generate_lamport_keypair()
+
+
+register_scheme(SignatureScheme(
+    name="lamport",
+    generate_keypair=_generate_random_lamport_keypair,
+    sign=sign_lamport_message,
+    verify=verify_lamport_signature,
+    key_hash=lamport_public_key_digest,
+    verification_key=lambda public_key: public_key,
+    max_signatures=lambda private_key: 1,
+    signature_from_bytes=bytes,
+    public_key_from_bytes=bytes
+))
+
+register_scheme(SignatureScheme(
+    name="lamport-seeded",
+    generate_keypair=generate_seeded_lamport_keypair,
+    sign=sign_compact_message,
+    verify=verify_compact_signature,
+    key_hash=lamport_public_key_digest,
+    verification_key=lamport_public_key_digest,
+    max_signatures=lambda private_key: 1,
+    signature_from_bytes=compact_signature_from_bytes,
+    public_key_from_bytes=bytes
+))
+
+register_scheme(SignatureScheme(
+    name="wots",
+    generate_keypair=lambda seed=None, w=WINTERNITZ_W: generate_wots_keypair(w, seed),
+    sign=sign_wots_message,
+    verify=verify_wots_signature,
+    key_hash=wots_public_key_digest,
+    verification_key=wots_public_key_digest,
+    max_signatures=lambda private_key: 1,
+    signature_from_bytes=wots_signature_from_bytes,
+    public_key_from_bytes=wots_public_key_from_bytes
+))
+
+register_scheme(SignatureScheme(
+    name="merkle",
+    generate_keypair=lambda seed=None, height=MERKLE_TREE_HEIGHT: generate_merkle_keypair(height, seed),
+    sign=sign_merkle_message,
+    verify=verify_merkle_signature,
+    key_hash=sha256,
+    verification_key=lambda public_key: public_key,
+    max_signatures=lambda private_key: 1 << private_key.height,
+    signature_from_bytes=merkle_signature_from_bytes,
+    public_key_from_bytes=bytes
+))
+
+
+# ---------------- VERIFICATION CACHE ----------------
+
+# Maximum number of verified signatures remembered
+VERIFY_CACHE_SIZE = 10000
+
+
+class VerificationCache:
+    """
+    Bounded LRU cache of successful signature verifications.
+    Keyed by (scheme, message digest, signature digest, public key
+    digest), so a transaction verified on admission costs one dict
+    lookup when it is re-checked at mining or chain validation.
+    Only valid results are cached: invalid signatures cannot be used
+    to flush it with garbage that would be rejected anyway.
+    """
+
+    def __init__(self, max_size=VERIFY_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(scheme_id, message, signature, public_key):
+        return (
+            scheme_id,
+            sha256(message.encode()),
+            sha256(signature_bytes(signature)),
+            sha256(public_key_bytes(public_key))
+        )
+
+    def contains(self, key):
+        """Return True (and refresh the entry) if key was verified before."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key):
+        """Remember a successful verification, evicting the oldest entry."""
+        with self._lock:
+            self._entries[key] = True
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+VERIFICATION_CACHE = VerificationCache()
+
+
+def _cache_key(item):
+    """Cache key for a verification item, or None if it cannot be cached."""
+    scheme_id, message, signature, public_key = item
+    if signature is None or public_key is None:
+        return None
+    # Keys are built before verification, so a malformed signature (e.g.
+    # a WOTS w or Merkle leaf index out of range) is left to verify_item
+    try:
+        return VerificationCache.make_key(scheme_id, message, signature, public_key)
+    except (AttributeError, TypeError, ValueError, OverflowError):
+        return None
+
+
+def verify_cached(item) -> bool:
+    """Verify one item, consulting and filling the verification cache."""
+    key = _cache_key(item)
+    if key is not None and VERIFICATION_CACHE.contains(key):
+        return True
+
+    result = verify_item(item)
+    if result and key is not None:
+        VERIFICATION_CACHE.add(key)
+    return result
+
+
+# ---------------- BATCH VERIFICATION ----------------
+
+# Batches smaller than this are verified in-process: below it the cost
+# of pickling items to worker processes outweighs the parallel speedup
+BATCH_PARALLEL_THRESHOLD = 64
+
+# Worker processes for batch verification (None = one per CPU core)
+BATCH_WORKERS = None
+
+_verify_pool = None
+
+
+def verify_item(item) -> bool:
+    """Verify one (scheme_id, message, signature, public_key) item."""
+    scheme_id, message, signature, public_key = item
+    if signature is None or public_key is None:
+        return False
+    try:
+        scheme = get_scheme(scheme_id)
+    except ValueError:
+        return False
+    return bool(scheme.verify(message, signature, public_key))
+
+
+def _verify_chunk(items):
+    return [verify_item(item) for item in items]
+
+
+def get_worker_pool():
+    """
+    Start the shared verification process pool on first use.
+    Also used for chain audits, so one set of workers serves both.
+    """
+    global _verify_pool
+    if _verify_pool is None:
+        _verify_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+        atexit.register(_verify_pool.shutdown)
+    return _verify_pool
+
+
+def verify_batch(items, parallel=None):
+    """
+    Verify many signatures at once.
+    Each item is (scheme_id, message, signature, public_key); returns a
+    list of booleans in the same order. Items already in the
+    verification cache are answered from it; the rest are verified and
+    successful results cached. Hash loops hold the GIL, so large
+    batches are split across a process pool instead of threads.
+    """
+    items = list(items)
+    keys = [_cache_key(item) for item in items]
+    results = [
+        key is not None and VERIFICATION_CACHE.contains(key) for key in keys
+    ]
+    pending = [i for i, cached in enumerate(results) if not cached]
+
+    for i, result in zip(pending, _verify_uncached([items[i] for i in pending], parallel)):
+        results[i] = result
+        if result and keys[i] is not None:
+            VERIFICATION_CACHE.add(keys[i])
+    return results
+
+
+def worker_count():
+    """Number of processes in the worker pool."""
+    return BATCH_WORKERS or os.cpu_count() or 1
+
+
+def _verify_uncached(items, parallel=None):
+    """Verify items in-process or across the process pool."""
+    workers = worker_count()
+    if parallel is None:
+        parallel = workers > 1 and len(items) >= BATCH_PARALLEL_THRESHOLD
+    if not parallel or len(items) < 2:
+        return _verify_chunk(items)
+
+    pool = get_worker_pool()
+    chunk_size = -(-len(items) // workers)
+    batches = [
+        items[i:i + chunk_size] for i in range(0, len(items), chunk_size)
+    ]
+
+    results = []
+    for batch_results in pool.map(_verify_chunk, batches):
+        results.extend(batch_results)
+    return results
 
 
 if __name__ == "__main__":
@@ -74,4 +1056,26 @@ if __name__ == "__main__":
     sig = sign_message(msg, priv)
     result = verify_signature(msg, sig, pub)
 
-    print("Signature valid:", result)
\ No newline at end of file
+    print("Signature valid:", result)
+
+    compact_sig = sign_compact_message(msg, priv)
+    print("Compact signature valid:",
+          verify_signature(msg, compact_sig, lamport_public_key_digest(pub)))
+
+    seeded_priv, seeded_pub = generate_seeded_lamport_keypair()
+    seeded_sig = sign_message(msg, seeded_priv)
+    print("Seeded signature valid:",
+          verify_signature(msg, seeded_sig, seeded_pub))
+
+    merkle_priv, merkle_root = generate_merkle_keypair()
+    for n in range(3):
+        merkle_sig = sign_message(f"{msg} #{n}", merkle_priv)
+        print(f"Merkle signature {n} valid:",
+              verify_signature(f"{msg} #{n}", merkle_sig, merkle_root))
+
+    for w in WINTERNITZ_VALUES:
+        wots_priv, wots_pub = generate_wots_keypair(w)
+        wots_sig = sign_message(msg, wots_priv)
+        print(f"WOTS w={w} signature valid:",
+              verify_signature(msg, wots_sig, wots_pub),
+              f"({len(wots_sig.chains) * 32} bytes)")
\ No newline at end of file
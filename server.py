@@ -1,15 +1,20 @@
 from flask import Flask, request, jsonify
 from blockchain import Blockchain
-from transaction import Transaction
-from wallet import Wallet
-from ledger import Ledger
+from transaction import LEGACY_TX_VERSION, Transaction
+from wallet import Wallet, MerkleWallet
+from ledger import open_ledger
+from keypool import KeyPool
+from state import AccountState, valid_amount
+from pqc_crypto import (
+    verify_batch,
+    VERIFICATION_CACHE
+)
 from models import (
     create_user,
     authenticate_user,
     create_profile,
     get_profile,
-    get_balance,
-    update_balance,
+    user_exists,
     get_username_by_wallet
 )
 
@@ -19,17 +24,47 @@ CORS(app)
 
 
 # ---------------- GLOBAL STATE ----------------
-blockchain = Blockchain()
-ledger = Ledger()
+ledger = open_ledger()
 transaction_pool = []
 
-# Load blockchain from disk
-loaded_chain = ledger.load_blockchain()
-if loaded_chain:
-    blockchain.chain = loaded_chain
+# Load blockchain from disk (genesis is only created for a new ledger)
+blockchain = Blockchain.from_ledger(ledger)
+
+# Balances derived from the chain; startup replays only the blocks
+# mined since the last snapshot
+account_state = AccountState.from_snapshot(ledger.load_snapshot())
+account_state.sync(blockchain.chain)
+
+# Pre-generated key pairs so request handlers never wait on keygen
+key_pool = KeyPool()
+
+# Miner wallet (server-side): Merkle keys keep one address across many blocks
+miner_wallet = MerkleWallet()
+
+
+def sync_account_state():
+    """Apply newly mined blocks to the balances and snapshot when due."""
+    account_state.sync(blockchain.chain)
+    if account_state.snapshot_due():
+        ledger.save_snapshot(account_state.snapshot())
+
+
+def available_balance(address):
+    """Confirmed balance minus what this address already spends in the pool."""
+    pending = sum(tx.amount for tx in transaction_pool if tx.sender == address)
+    return account_state.balance(address) - pending
 
-# Miner wallet (server-side)
-miner_wallet = Wallet()
+
+def submission_error(tx):
+    """Why a pre-signed transaction cannot join the pool, or None."""
+    if tx.version == LEGACY_TX_VERSION:
+        return "Legacy (version 1) transactions are not accepted"
+    if not valid_amount(tx.amount):
+        return "Amount must be a positive number"
+    balance = available_balance(tx.sender)
+    if balance < tx.amount:
+        return f"Insufficient balance. Sender has {balance}"
+    return None
 
 
 # ---------------- AUTH ROUTES ----------------
@@ -60,7 +95,7 @@ def register():
         user_id = create_user(username.strip(), password)
         
         # Auto-generate wallet for new user
-        wallet = Wallet()
+        wallet = Wallet(key_pool=key_pool)
         wallet_address = wallet.get_address()
         create_profile(user_id, wallet_address)
         
@@ -107,11 +142,10 @@ def login():
 @app.route("/profile/<int:user_id>", methods=["GET"])
 def profile(user_id):
     profile = get_profile(user_id)
-    balance = get_balance(user_id)
     
     # If profile doesn't exist but user exists, create it
-    if not profile and balance is not None:
-        wallet = Wallet()
+    if not profile and user_exists(user_id):
+        wallet = Wallet(key_pool=key_pool)
         wallet_address = wallet.get_address()
         create_profile(user_id, wallet_address)
         profile = get_profile(user_id)
@@ -120,26 +154,37 @@ def profile(user_id):
         return jsonify({
             "wallet_address": profile[0],
             "created_at": profile[1],
-            "balance": balance
+            "balance": available_balance(profile[0])
         })
     return jsonify({"error": "User not found"}), 404
 
 
 @app.route("/balance/<int:user_id>", methods=["GET"])
 def get_user_balance(user_id):
-    """Get current balance of user."""
-    balance = get_balance(user_id)
-    if balance is None:
+    """Get current balance of the user's wallet address."""
+    profile = get_profile(user_id)
+    if not profile:
         return jsonify({"error": "User not found"}), 404
     return jsonify({
         "user_id": user_id,
-        "balance": balance
+        "balance": available_balance(profile[0]),
+        "confirmed_balance": account_state.balance(profile[0])
+    }), 200
+
+
+@app.route("/balance/address/<address>", methods=["GET"])
+def get_address_balance(address):
+    return jsonify({
+        "address": address,
+        "balance": available_balance(address),
+        "confirmed_balance": account_state.balance(address),
+        "height": account_state.height
     }), 200
 
 
 @app.route("/create_wallet/<int:user_id>", methods=["POST"])
 def create_wallet_for_user(user_id):
-    wallet = Wallet()
+    wallet = Wallet(key_pool=key_pool)
     create_profile(user_id, wallet.get_address())
 
     return jsonify({
@@ -162,27 +207,26 @@ def send_transaction():
     sender = data.get("sender")
     receiver = data.get("receiver")
     amount = data.get("amount")
-    user_id = data.get("user_id")  # Get user_id to deduct balance
+    user_id = data.get("user_id")
     
     if not sender or not receiver or not amount:
         return jsonify({"error": "Missing sender, receiver, or amount"}), 400
     
     try:
         amount = float(amount)
-        if amount <= 0:
+        if not valid_amount(amount):
             return jsonify({"error": "Amount must be greater than 0"}), 400
-    except ValueError:
+    except (TypeError, ValueError):
         return jsonify({"error": "Invalid amount"}), 400
     
-    # Check if user has sufficient balance
-    if user_id:
-        balance = get_balance(user_id)
-        if balance < amount:
-            return jsonify({"error": f"Insufficient balance. You have {balance}"}), 400
+    # Check the sender can cover this on top of its pending transactions
+    balance = available_balance(sender)
+    if balance < amount:
+        return jsonify({"error": f"Insufficient balance. You have {balance}"}), 400
     
     # Create a wallet for this transaction (temporary solution)
     # TODO: Store user wallets in database and retrieve them
-    wallet = Wallet()
+    wallet = Wallet(key_pool=key_pool)
     
     # Create transaction data
     import time
@@ -207,36 +251,15 @@ def send_transaction():
         receiver=receiver,
         amount=amount,
         signature=signature,
-        public_key=wallet.public_key,
-        timestamp=timestamp
+        public_key=wallet.get_verification_key(),
+        timestamp=timestamp,
+        scheme=wallet.scheme_id
     )
     
     # Verify transaction
     if not tx.verify():
         return jsonify({"error": "Transaction verification failed"}), 400
     
-    # Deduct balance from sender if user_id provided
-    if user_id:
-        new_balance = update_balance(user_id, -amount)
-    
-    # Find receiver user_id by wallet address and credit their balance
-    # Try to match receiver address with a user's wallet
-    try:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT user_id FROM profiles WHERE wallet_address = ?",
-            (receiver,)
-        )
-        receiver_profile = cursor.fetchone()
-        conn.close()
-        
-        if receiver_profile:
-            receiver_user_id = receiver_profile[0]
-            update_balance(receiver_user_id, amount)  # Credit receiver
-    except Exception as e:
-        print(f"Warning: Could not credit receiver: {e}")
-    
     # Add to transaction pool
     transaction_pool.append(tx)
     
@@ -248,26 +271,44 @@ def send_transaction():
             "amount": amount,
             "timestamp": timestamp
         },
-        "new_balance": new_balance if user_id else None
+        "new_balance": available_balance(sender) if user_id else None
     }), 200
 
 
 @app.route("/add_transaction", methods=["POST"])
 def add_transaction():
-    """Advanced endpoint for pre-signed transactions."""
+    """
+    Advanced endpoint for pre-signed transactions.
+    Accepts one transaction object, or a list of them verified as a batch.
+    """
     data = request.json
 
-    tx = Transaction(
-        sender=data["sender"],
-        receiver=data["receiver"],
-        amount=data["amount"],
-        signature=[bytes.fromhex(s) for s in data["signature"]],
-        public_key=[
-            (bytes.fromhex(pk0), bytes.fromhex(pk1))
-            for pk0, pk1 in data["public_key"]
-        ],
-        timestamp=data["timestamp"]
-    )
+    if isinstance(data, list):
+        try:
+            transactions = [Transaction.from_dict(item) for item in data]
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "Malformed transaction in batch"}), 400
+
+        # Checked in order, so each sees the balance left by the ones before
+        results = verify_batch(tx.verification_item() for tx in transactions)
+        for i, tx in enumerate(transactions):
+            if results[i] and submission_error(tx) is None:
+                transaction_pool.append(tx)
+            else:
+                results[i] = False
+        return jsonify({
+            "message": f"{sum(results)} of {len(results)} transactions added",
+            "results": results
+        }), 200
+
+    try:
+        tx = Transaction.from_dict(data)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Malformed transaction"}), 400
+
+    error = submission_error(tx)
+    if error is not None:
+        return jsonify({"error": error}), 400
 
     if not tx.verify():
         return jsonify({"error": "Invalid transaction"}), 400
@@ -283,8 +324,18 @@ def mine():
     if not transaction_pool:
         return jsonify({"error": "No transactions to mine"}), 400
 
+    # Re-check every pending signature, and that the confirmed balances
+    # cover each transfer, before it is committed to a block
+    results = verify_batch(tx.verification_item() for tx in transaction_pool)
+    transaction_pool = account_state.covered(
+        tx for tx, valid in zip(transaction_pool, results) if valid
+    )
+    if not transaction_pool:
+        return jsonify({"error": "No valid transactions to mine"}), 400
+
     blockchain.add_block(transaction_pool, miner_wallet)
     ledger.save_blockchain(blockchain)
+    sync_account_state()
     
     # Get the latest block
     latest_block = blockchain.chain[-1]
@@ -301,33 +352,139 @@ def mine():
     }), 200
 
 
+def transaction_json(tx):
+    return {
+        "txid": tx.txid,
+        "sender": get_username_by_wallet(tx.sender),
+        "sender_address": tx.sender,
+        "receiver": get_username_by_wallet(tx.receiver),
+        "receiver_address": tx.receiver,
+        "amount": tx.amount,
+        "timestamp": tx.timestamp
+    }
+
+
+def block_json(block):
+    return {
+        "index": block.index,
+        "timestamp": block.timestamp,
+        "previous_hash": block.previous_hash,
+        "hash": block.hash,
+        "transactions": [transaction_json(tx) for tx in block.transactions]
+    }
+
+
+def located_transaction_json(block, position, tx):
+    data = transaction_json(tx)
+    data.update({
+        "block_index": block.index,
+        "block_hash": block.hash,
+        "position": position
+    })
+    return data
+
+
 @app.route("/chain", methods=["GET"])
 def get_chain():
+    """All blocks, or a page of them with ?start=<height>&limit=<count>."""
+    start = request.args.get("start", 0, type=int)
+    limit = request.args.get("limit", type=int)
+    end = None if limit is None else start + limit
+    return jsonify([block_json(block) for block in blockchain.chain[start:end]])
+
+
+@app.route("/block/<block_hash>", methods=["GET"])
+def get_block(block_hash):
+    block = blockchain.get_block_by_hash(block_hash)
+    if block is None:
+        return jsonify({"error": "Block not found"}), 404
+    return jsonify(block_json(block)), 200
+
+
+@app.route("/block/height/<int:height>", methods=["GET"])
+def get_block_at_height(height):
+    if height >= len(blockchain.chain):
+        return jsonify({"error": "Block not found"}), 404
+    return jsonify(block_json(blockchain.chain[height])), 200
+
+
+@app.route("/transaction/<txid>", methods=["GET"])
+def get_transaction(txid):
+    found = blockchain.get_transaction(txid)
+    if found is None:
+        return jsonify({"error": "Transaction not found in chain"}), 404
+    return jsonify(located_transaction_json(*found)), 200
+
+
+@app.route("/address/<address>/transactions", methods=["GET"])
+def get_address_history(address):
+    """All transactions of an address, or a page with ?start=<n>&limit=<count>."""
+    start = request.args.get("start", 0, type=int)
+    limit = request.args.get("limit", type=int)
     return jsonify([
-        {
-            "index": block.index,
-            "timestamp": block.timestamp,
-            "previous_hash": block.previous_hash,
-            "hash": block.hash,
-            "transactions": [
-                {
-                    "sender": get_username_by_wallet(tx.sender),
-                    "sender_address": tx.sender,
-                    "receiver": get_username_by_wallet(tx.receiver),
-                    "receiver_address": tx.receiver,
-                    "amount": tx.amount,
-                    "timestamp": tx.timestamp
-                }
-                for tx in block.transactions
-            ]
-        }
-        for block in blockchain.chain
-    ])
+        located_transaction_json(*found)
+        for found in blockchain.address_history(address, start, limit)
+    ]), 200
+
+
+@app.route("/proof/<txid>", methods=["GET"])
+def transaction_proof(txid):
+    """
+    Merkle inclusion proof for a mined transaction.
+    The header lets a light client check the block hash commits to the root.
+    """
+    found = blockchain.get_transaction(txid)
+    if found is None:
+        return jsonify({"error": "Transaction not found in chain"}), 404
+
+    block = found[0]
+    proof = block.merkle_proof(txid)
+    if proof is None:
+        return jsonify({
+            "error": f"Block {block.index} is version {block.version}; "
+                     "inclusion proofs need a version-3 block"
+        }), 404
+
+    return jsonify({
+        "block_index": block.index,
+        "block_hash": block.hash,
+        "header": block.header.hashed_fields(),
+        "proof": proof._asdict()
+    }), 200
 
 
 @app.route("/verify", methods=["GET"])
 def verify_chain():
-    return jsonify({"valid": blockchain.is_chain_valid()})
+    """
+    Validate blocks above the checkpoint (O(1) when nothing is new).
+    ?full=1 runs a parallel audit of every block and transaction and
+    reports the first bad index.
+    """
+    full = request.args.get("full", "").lower() in ("1", "true", "yes")
+    checkpoint = blockchain.checkpoint
+
+    if full:
+        report = blockchain.audit()
+        response = {"valid": report.valid, "full": True, "audit": report._asdict()}
+    else:
+        valid = blockchain.is_chain_valid()
+        response = {"valid": valid, "full": False}
+
+    if blockchain.checkpoint != checkpoint:
+        ledger.save_checkpoint(blockchain.checkpoint)
+
+    response["validated_height"] = blockchain.validated_height()
+    return jsonify(response)
+
+
+@app.route("/state/verify", methods=["GET"])
+def verify_state():
+    """Replay the chain from genesis and compare with the live balances."""
+    return jsonify({
+        "consistent": account_state.verify(blockchain.chain),
+        "height": account_state.height,
+        "accounts": len(account_state.balances)
+    })
 
 
 @app.route("/status", methods=["GET"])
@@ -344,7 +501,7 @@ def status():
 @app.route("/admin/clear_database", methods=["POST"])
 def admin_clear_database():
     """Clear all database and blockchain data. WARNING: This is irreversible!"""
-    global blockchain, transaction_pool, ledger
+    global blockchain, transaction_pool, ledger, account_state
     
     try:
         import sqlite3
@@ -360,15 +517,16 @@ def admin_clear_database():
         conn.close()
         
         # Clear blockchain files
-        if os.path.exists("data/blockchain.json"):
-            os.remove("data/blockchain.json")
+        ledger.clear()
         if os.path.exists("data/ledger.json"):
             os.remove("data/ledger.json")
         
         # Reset in-memory state
         blockchain = Blockchain()
-        ledger = Ledger()
+        ledger = open_ledger()
         transaction_pool = []
+        account_state = AccountState()
+        account_state.sync(blockchain.chain)
         
         return jsonify({
             "message": "✅ Database and blockchain cleared successfully!",
@@ -403,7 +561,9 @@ def admin_status():
             "users": user_count,
             "profiles": profile_count,
             "blocks": len(blockchain.chain),
-            "pending_transactions": len(transaction_pool)
+            "pending_transactions": len(transaction_pool),
+            "key_pool": key_pool.stats(),
+            "verification_cache": VERIFICATION_CACHE.stats()
         }), 200
     
     except Exception as e:
@@ -0,0 +1,414 @@
+import json
+import os
+import sqlite3
+from block import Block, BlockHeader
+from blockchain import Checkpoint
+from blocklog import ChainView, PublicKeyTable
+from pqc_crypto import get_scheme, public_key_bytes, sha256, signature_bytes
+from state import StateSnapshot
+from transaction import Transaction
+
+DB_PATH = "database/database.db"
+
+# Blocks and transactions reference public keys by the SHA-256 of their
+# bytes. amount has no declared type so SQLite keeps ints and floats
+# apart (legacy txids hash 10 and 10.0 differently).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS public_keys (
+    key_hash BLOB PRIMARY KEY,
+    public_key BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS blocks (
+    height INTEGER PRIMARY KEY,
+    hash TEXT UNIQUE NOT NULL,
+    version INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    previous_hash TEXT NOT NULL,
+    merkle_root TEXT,
+    scheme TEXT NOT NULL,
+    signature BLOB,
+    key_hash BLOB REFERENCES public_keys(key_hash)
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    height INTEGER NOT NULL REFERENCES blocks(height),
+    position INTEGER NOT NULL,
+    txid TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    sender TEXT NOT NULL,
+    receiver TEXT NOT NULL,
+    amount,
+    timestamp REAL NOT NULL,
+    scheme TEXT NOT NULL,
+    signature BLOB,
+    key_hash BLOB REFERENCES public_keys(key_hash),
+    PRIMARY KEY (height, position)
+);
+
+CREATE INDEX IF NOT EXISTS transactions_txid ON transactions(txid);
+CREATE INDEX IF NOT EXISTS transactions_sender ON transactions(sender);
+CREATE INDEX IF NOT EXISTS transactions_receiver ON transactions(receiver);
+
+CREATE TABLE IF NOT EXISTS ledger_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Version 3 headers hash the transaction count; it is counted from the
+# transactions table (one primary-key range per block)
+_BLOCK_COLUMNS = """
+    b.height, b.hash, b.version, b.timestamp, b.previous_hash, b.merkle_root,
+    b.scheme, b.signature, k.public_key,
+    (SELECT COUNT(*) FROM transactions c WHERE c.height = b.height)
+"""
+
+_TRANSACTION_COLUMNS = """
+    t.version, t.sender, t.receiver, t.amount, t.timestamp, t.scheme,
+    t.signature, k.public_key
+"""
+
+
+def _key_row(public_key):
+    """Return (key_hash, key bytes) for a public key, or None."""
+    if public_key is None:
+        return None
+    data = public_key_bytes(public_key)
+    return sha256(data), data
+
+
+def _signature_row(signature):
+    return None if signature is None else signature_bytes(signature)
+
+
+def _header_from_row(row, keys):
+    height, block_hash, version, timestamp, previous_hash, merkle_root, \
+        scheme_id, signature, public_key, tx_count = row
+    scheme = get_scheme(scheme_id)
+    return BlockHeader(
+        index=height,
+        timestamp=timestamp,
+        previous_hash=previous_hash,
+        merkle_root=merkle_root,
+        signature=None if signature is None else scheme.signature_from_bytes(signature),
+        public_key=None if public_key is None else keys.intern(scheme, public_key),
+        scheme=scheme.name,
+        version=version,
+        block_hash=block_hash,
+        tx_count=tx_count
+    )
+
+
+def _transaction_from_row(row, keys):
+    version, sender, receiver, amount, timestamp, scheme_id, signature, public_key = row
+    scheme = get_scheme(scheme_id)
+    return Transaction(
+        sender=sender,
+        receiver=receiver,
+        amount=amount,
+        signature=None if signature is None else scheme.signature_from_bytes(signature),
+        public_key=None if public_key is None else keys.intern(scheme, public_key),
+        timestamp=timestamp,
+        scheme=scheme.name,
+        version=version
+    )
+
+
+class SQLiteLedger:
+    """
+    Ledger backend that keeps blocks, transactions and public keys in
+    SQLite, indexed on block hash and height, txid, sender and receiver.
+    Same interface as Ledger, and also a block store for ChainView, so
+    lookups, pagination and address history are indexed queries.
+    """
+
+    indexes_transactions = True
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        # Decoded keys are interned, so blocks sharing a key share the object
+        self.keys = PublicKeyTable()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # One connection per call, as in models.py, so request threads
+        # never share a connection
+        return sqlite3.connect(self.db_path)
+
+    def _query(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    # ---------------- WRITES ----------------
+
+    def save_blockchain(self, blockchain):
+        """
+        Insert the blocks added since the last save, and the checkpoint,
+        in one transaction. If the chain no longer extends what is stored
+        (it was replaced), the stored blocks are replaced instead.
+        """
+        chain = blockchain.chain
+        conn = self._connect()
+        try:
+            with conn:
+                saved = conn.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+                if saved:
+                    (tip_hash,) = conn.execute(
+                        "SELECT hash FROM blocks WHERE height = ?", (saved - 1,)
+                    ).fetchone()
+                if saved > len(chain) or (saved and chain[saved - 1].hash != tip_hash):
+                    self._delete_blocks(conn)
+                    saved = 0
+                self._insert_blocks(conn, chain[saved:])
+                if blockchain.checkpoint is not None:
+                    self._set_meta(conn, "checkpoint", blockchain.checkpoint._asdict())
+        finally:
+            conn.close()
+        if isinstance(chain, ChainView):
+            chain.mark_stored(self)
+
+    @staticmethod
+    def _delete_blocks(conn):
+        conn.execute("DELETE FROM transactions")
+        conn.execute("DELETE FROM blocks")
+        conn.execute("DELETE FROM public_keys")
+
+    @staticmethod
+    def _insert_blocks(conn, blocks):
+        """Batch-insert blocks with their transactions and public keys."""
+        keys, block_rows, tx_rows = {}, [], []
+        for block in blocks:
+            key = _key_row(block.public_key)
+            if key is not None:
+                keys[key[0]] = key[1]
+            block_rows.append((
+                block.index, block.hash, block.version, block.timestamp,
+                block.previous_hash, block.merkle_root, block.scheme,
+                _signature_row(block.signature), key and key[0]
+            ))
+            for position, tx in enumerate(block.transactions):
+                key = _key_row(tx.public_key)
+                if key is not None:
+                    keys[key[0]] = key[1]
+                tx_rows.append((
+                    block.index, position, tx.txid, tx.version, tx.sender,
+                    tx.receiver, tx.amount, tx.timestamp, tx.scheme,
+                    _signature_row(tx.signature), key and key[0]
+                ))
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO public_keys VALUES (?, ?)", keys.items()
+        )
+        conn.executemany(
+            "INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", block_rows
+        )
+        conn.executemany(
+            "INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", tx_rows
+        )
+
+    def compact(self, chain):
+        """
+        Make the stored blocks exactly chain and reclaim free pages. A
+        view of this ledger already is its contents, so only VACUUM runs.
+        """
+        if not (isinstance(chain, ChainView) and chain.store is self):
+            conn = self._connect()
+            try:
+                with conn:
+                    self._delete_blocks(conn)
+                    self._insert_blocks(conn, chain)
+            finally:
+                conn.close()
+        conn = self._connect()
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def sync(self):
+        """Every save commits, so there is nothing left to flush."""
+
+    def _set_meta(self, conn, name, value):
+        conn.execute(
+            "INSERT OR REPLACE INTO ledger_meta VALUES (?, ?)", (name, json.dumps(value))
+        )
+
+    def _get_meta(self, name):
+        rows = self._query("SELECT value FROM ledger_meta WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_checkpoint(self, checkpoint):
+        """Persist the highest validated block (height and hash)."""
+        if checkpoint is None:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                self._set_meta(conn, "checkpoint", checkpoint._asdict())
+        finally:
+            conn.close()
+
+    def load_checkpoint(self):
+        """Load the validated checkpoint, or None if there is none."""
+        data = self._get_meta("checkpoint")
+        return None if data is None else Checkpoint(**data)
+
+    def save_snapshot(self, snapshot):
+        """Persist an account-state snapshot."""
+        conn = self._connect()
+        try:
+            with conn:
+                self._set_meta(conn, "snapshot", snapshot._asdict())
+        finally:
+            conn.close()
+
+    def load_snapshot(self):
+        """Load the latest account-state snapshot, or None if there is none."""
+        data = self._get_meta("snapshot")
+        return None if data is None else StateSnapshot(**data)
+
+    def clear(self):
+        """Delete every block, key, checkpoint and snapshot (users are kept)."""
+        conn = self._connect()
+        try:
+            with conn:
+                self._delete_blocks(conn)
+                conn.execute("DELETE FROM ledger_meta")
+        finally:
+            conn.close()
+
+    def size(self):
+        """Bytes on disk (the whole database file)."""
+        return os.path.getsize(self.db_path)
+
+    # ---------------- READS ----------------
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM blocks")[0][0]
+
+    def hashes(self):
+        """Every block hash, in height order."""
+        return [row[0] for row in self._query("SELECT hash FROM blocks ORDER BY height")]
+
+    def header_at(self, height):
+        rows = self._query(
+            f"SELECT {_BLOCK_COLUMNS} FROM blocks b "
+            "LEFT JOIN public_keys k ON k.key_hash = b.key_hash WHERE b.height = ?",
+            (height,)
+        )
+        if not rows:
+            raise IndexError(f"No block at height {height}")
+        return _header_from_row(rows[0], self.keys)
+
+    def body_at(self, height):
+        rows = self._query(
+            f"SELECT {_TRANSACTION_COLUMNS} FROM transactions t "
+            "LEFT JOIN public_keys k ON k.key_hash = t.key_hash "
+            "WHERE t.height = ? ORDER BY t.position",
+            (height,)
+        )
+        return [_transaction_from_row(row, self.keys) for row in rows]
+
+    def load_headers(self):
+        """Load every block header, or None if nothing is stored."""
+        rows = self._query(
+            f"SELECT {_BLOCK_COLUMNS} FROM blocks b "
+            "LEFT JOIN public_keys k ON k.key_hash = b.key_hash ORDER BY b.height"
+        )
+        return [_header_from_row(row, self.keys) for row in rows] or None
+
+    def load_blockchain(self, lazy=False):
+        """
+        Load the blockchain. With lazy=True this returns a ChainView that
+        queries each block when it is accessed.
+        """
+        if not len(self):
+            return None
+        if lazy:
+            return ChainView(self)
+
+        # Rebuilt from header fields and body, so the hash is recomputed
+        return [
+            Block(header.index, self.body_at(header.index), header.previous_hash,
+                  header.signature, header.public_key, header.timestamp,
+                  header.scheme, header.version)
+            for header in self.load_headers()
+        ]
+
+    def block_height(self, block_hash):
+        """Height of the block with this hash, or None."""
+        rows = self._query("SELECT height FROM blocks WHERE hash = ?", (block_hash,))
+        return rows[0][0] if rows else None
+
+    def transaction_location(self, txid):
+        """(height, position) of a stored txid's first occurrence, or None."""
+        rows = self._query(
+            "SELECT height, position FROM transactions WHERE txid = ? "
+            "ORDER BY height, position LIMIT 1",
+            (txid,)
+        )
+        return rows[0] if rows else None
+
+    def address_locations(self, address, start=0, limit=None):
+        """
+        (height, position) of the stored transactions of an address, in
+        order; start and limit select a page (LIMIT -1 is no limit).
+        """
+        return self._query(
+            "SELECT height, position FROM transactions WHERE sender = ? "
+            "UNION SELECT height, position FROM transactions WHERE receiver = ? "
+            "ORDER BY height, position LIMIT ? OFFSET ?",
+            (address, address, -1 if limit is None else limit, start)
+        )
+
+    def address_count(self, address):
+        """Number of stored transactions of an address."""
+        return self._query(
+            "SELECT COUNT(*) FROM ("
+            "SELECT height, position FROM transactions WHERE sender = ? "
+            "UNION SELECT height, position FROM transactions WHERE receiver = ?)",
+            (address, address)
+        )[0][0]
+
+
+# ---------------- TEST SQLITE LEDGER ----------------
+if __name__ == "__main__":
+    from blockchain import Blockchain
+    from wallet import Wallet
+
+    blockchain = Blockchain()
+    ledger = SQLiteLedger("data/blockchain.db")
+    miner_wallet = Wallet()
+
+    temp_tx = Transaction(
+        sender="Alice",
+        receiver="Bob",
+        amount=50,
+        signature=None,
+        public_key=None
+    )
+    tx = temp_tx.replace(
+        signature=miner_wallet.sign(temp_tx.calculate_hash()),
+        public_key=miner_wallet.get_verification_key(),
+        scheme=miner_wallet.scheme_id
+    )
+    blockchain.add_block([tx], miner_wallet)
+
+    ledger.save_blockchain(blockchain)
+    print("Blockchain saved to", ledger.db_path)
+
+    loaded = Blockchain.from_ledger(ledger)
+    print("Blocks stored:", len(loaded.chain))
+    print("Transaction found at:", ledger.transaction_location(tx.txid))
+    print("Bob's transactions:", len(loaded.address_history("Bob")))
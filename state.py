@@ -0,0 +1,149 @@
+import math
+from collections import namedtuple
+
+# Balance of an address that has not been seen on the chain yet; every
+# new account starts with this, as users.balance did
+INITIAL_BALANCE = 1000
+
+# Blocks between persisted snapshots
+SNAPSHOT_INTERVAL = 100
+
+# Balances after applying blocks 0..height; block_hash pins the chain
+StateSnapshot = namedtuple("StateSnapshot", ["height", "block_hash", "balances"])
+
+
+def valid_amount(amount):
+    """True for an amount a transfer may move: a positive, finite number."""
+    return (isinstance(amount, (int, float)) and not isinstance(amount, bool)
+            and math.isfinite(amount) and amount > 0)
+
+
+class AccountState:
+    """
+    Address -> balance map derived only from the chain.
+    Blocks are applied in order; balance reads are dict lookups, and
+    verify() proves the map matches a replay of the chain.
+    """
+
+    def __init__(self, initial_balance=INITIAL_BALANCE):
+        self.initial_balance = initial_balance
+        self.balances = {}
+        self.height = -1
+        self.block_hash = None
+        self.snapshot_height = -1
+
+    @classmethod
+    def from_snapshot(cls, snapshot, initial_balance=INITIAL_BALANCE):
+        """Resume from a StateSnapshot (or start empty if it is None)."""
+        state = cls(initial_balance)
+        if snapshot is not None:
+            state.balances = dict(snapshot.balances)
+            state.height = snapshot.height
+            state.block_hash = snapshot.block_hash
+            state.snapshot_height = snapshot.height
+        return state
+
+    def balance(self, address):
+        return self.balances.get(address, self.initial_balance)
+
+    def apply_block(self, block):
+        """
+        Apply one block's transfers; blocks must arrive in height order.
+        A transaction without a valid amount (mined before amounts were
+        checked) moves nothing.
+        """
+        if block.index != self.height + 1:
+            raise ValueError(f"Expected block {self.height + 1}, got {block.index}")
+
+        balances = self.balances
+        initial = self.initial_balance
+        for tx in block.transactions:
+            amount = tx.amount
+            if not valid_amount(amount):
+                print(f"[!] Skipping transaction {tx.txid} with invalid amount {amount!r}")
+                continue
+            balances[tx.sender] = balances.get(tx.sender, initial) - amount
+            balances[tx.receiver] = balances.get(tx.receiver, initial) + amount
+
+        self.height = block.index
+        self.block_hash = block.hash
+
+    def covered(self, transactions):
+        """
+        Return the transactions that can be applied in order: each has a
+        valid amount its sender can cover after the ones before it.
+        """
+        balances = {}
+        covered = []
+        for tx in transactions:
+            amount = tx.amount
+            if not valid_amount(amount):
+                continue
+            sender_balance = balances.get(tx.sender, self.balance(tx.sender))
+            if sender_balance < amount:
+                continue
+            balances[tx.sender] = sender_balance - amount
+            balances[tx.receiver] = balances.get(tx.receiver, self.balance(tx.receiver)) + amount
+            covered.append(tx)
+        return covered
+
+    def sync(self, chain):
+        """
+        Apply every block above the current height. If the block at that
+        height is no longer the one applied (the chain was replaced), the
+        state is rebuilt from genesis.
+        """
+        if self.height >= 0 and (self.height >= len(chain)
+                                 or chain[self.height].hash != self.block_hash):
+            self.balances = {}
+            self.height = -1
+            self.block_hash = None
+            self.snapshot_height = -1
+
+        for block in chain[self.height + 1:]:
+            self.apply_block(block)
+
+    def snapshot_due(self, interval=SNAPSHOT_INTERVAL):
+        return self.height - self.snapshot_height >= interval
+
+    def snapshot(self):
+        """Return a StateSnapshot of the current balances."""
+        self.snapshot_height = self.height
+        return StateSnapshot(self.height, self.block_hash, dict(self.balances))
+
+    def verify(self, chain):
+        """Return True if replaying chain from genesis gives these balances."""
+        replay = AccountState(self.initial_balance)
+        replay.sync(chain)
+        return (replay.height, replay.block_hash, replay.balances) == \
+            (self.height, self.block_hash, self.balances)
+
+
+# ---------------- TEST ACCOUNT STATE ----------------
+if __name__ == "__main__":
+    from blockchain import Blockchain
+    from transaction import Transaction
+    from wallet import Wallet
+
+    blockchain = Blockchain()
+    miner_wallet = Wallet()
+
+    temp_tx = Transaction(
+        sender="Alice",
+        receiver="Bob",
+        amount=25,
+        signature=None,
+        public_key=None
+    )
+    tx = temp_tx.replace(
+        signature=miner_wallet.sign(temp_tx.calculate_hash()),
+        public_key=miner_wallet.get_verification_key(),
+        scheme=miner_wallet.scheme_id
+    )
+    blockchain.add_block([tx], miner_wallet)
+
+    state = AccountState()
+    state.sync(blockchain.chain)
+    print("Alice:", state.balance("Alice"))
+    print("Bob:", state.balance("Bob"))
+    print("Consistent with chain:", state.verify(blockchain.chain))
@@ -0,0 +1,907 @@
+"""
+Test script for transactions, blocks and the ledger.
+
+Usage:
+    python test_chain.py
+"""
+
+import sys
+import os
+import tempfile
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from transaction import LEGACY_TX_VERSION, Transaction
+from wallet import Wallet
+
+
+def make_transaction(wallet=None, receiver="receiver", amount=10, version=None):
+    """Build a transaction signed by wallet (a fresh one by default)."""
+    wallet = wallet or Wallet()
+    params = {} if version is None else {"version": version}
+    tx = Transaction(wallet.get_address(), receiver, amount, None, None, **params)
+    return tx.replace(
+        signature=wallet.sign(tx.calculate_hash()),
+        public_key=wallet.get_verification_key(),
+        scheme=wallet.scheme_id
+    )
+
+
+def test_transaction_binary_round_trip():
+    """to_bytes/from_bytes preserves the txid and the signature."""
+    for name in ("lamport", "lamport-seeded", "wots", "merkle"):
+        tx = make_transaction(Wallet(scheme=name))
+        decoded = Transaction.from_bytes(tx.to_bytes())
+
+        assert decoded.txid == tx.txid
+        assert decoded.scheme == tx.scheme
+        assert decoded.verify()
+
+
+def test_transaction_is_immutable():
+    """Fields cannot be reassigned; replace() derives a re-hashed copy."""
+    tx = make_transaction()
+
+    try:
+        tx.amount = 11
+        assert False, "Transaction should be immutable"
+    except AttributeError:
+        pass
+    assert not hasattr(tx, "__dict__")
+
+    changed = tx.replace(amount=11)
+    assert changed.txid != tx.txid
+    assert not changed.verify()
+    assert tx.replace(signature=None).txid == tx.txid
+
+
+def test_block_is_immutable_and_round_trips():
+    """Blocks are frozen, signed_by() returns a signed copy, dicts round-trip."""
+    from block import Block
+
+    wallet = Wallet()
+    block = Block(1, [make_transaction()], "0" * 64).signed_by(wallet)
+
+    try:
+        block.previous_hash = "tampered"
+        assert False, "Block should be immutable"
+    except AttributeError:
+        pass
+    assert isinstance(block.transactions, tuple)
+    assert block.verify_block_signature()
+
+    reloaded = Block.from_dict(block.to_dict())
+    assert reloaded.hash == block.hash
+    assert reloaded.verify_block_signature()
+
+
+def test_legacy_transactions_keep_json_hash():
+    """Version 1 transactions still hash the sorted-key JSON dict."""
+    tx = make_transaction(version=LEGACY_TX_VERSION)
+
+    assert tx.verify()
+    assert Transaction.from_bytes(tx.to_bytes()).txid == tx.txid
+
+
+def test_transaction_amount_is_validated():
+    """Fields that do not fit the binary body raise TypeError/ValueError."""
+    for amount, error in (("10", TypeError), (True, TypeError), (None, TypeError),
+                          (1 << 63, ValueError), (-(1 << 63) - 1, ValueError)):
+        try:
+            Transaction("a", "b", amount, None, None)
+        except error:
+            pass
+        else:
+            raise AssertionError(f"amount {amount!r} was accepted")
+
+    bad_fields = (({"timestamp": "x"}, TypeError), ({"sender": "a" * 0x10000}, ValueError),
+                  ({"sender": 5}, TypeError), ({"receiver": None}, TypeError),
+                  ({"version": "2"}, ValueError))
+    for version in (LEGACY_TX_VERSION, 2):
+        for fields, error in bad_fields:
+            params = dict(sender="a", receiver="b", amount=10, signature=None,
+                          public_key=None, version=version)
+            params.update(fields)
+            try:
+                Transaction(**params)
+            except error:
+                pass
+            else:
+                raise AssertionError(f"{fields} was accepted")
+
+    # Legacy records keep whatever amount they were written with
+    for amount in ("10", True, 1 << 70):
+        tx = Transaction("a", "b", amount, None, None, version=LEGACY_TX_VERSION)
+        decoded = Transaction.from_bytes(tx.to_bytes())
+        assert (decoded.amount, decoded.txid) == (amount, tx.txid)
+
+
+def test_inclusion_proofs_for_every_tree_shape():
+    """Every txid proves against the root, for odd and even block sizes."""
+    from block import Block, verify_inclusion_proof
+
+    wallet = Wallet()
+    transactions = [make_transaction(wallet, amount=n) for n in range(1, 10)]
+    for size in range(1, len(transactions) + 1):
+        block = Block(1, transactions[:size], "0" * 64)
+        header = block.header.hashed_fields()
+        for tx in block.transactions:
+            proof = block.merkle_proof(tx.txid)
+            assert verify_inclusion_proof(proof, header)
+            assert len(proof.path) <= size.bit_length()
+
+    proof = block.merkle_proof(transactions[0].txid)
+    assert not verify_inclusion_proof(proof._replace(txid=transactions[1].txid), header)
+    assert not verify_inclusion_proof(proof._replace(leaf_index=1), header)
+    assert not verify_inclusion_proof(proof._replace(path=proof.path[:-1]), header)
+    assert block.merkle_proof("00" * 32) is None
+
+
+def test_inclusion_proof_rejects_internal_nodes_and_old_blocks():
+    """An internal node is not a txid, the leaf count is the header's, and
+    blocks before version 3 give no proofs."""
+    from block import (
+        ROOT_BLOCK_VERSION, Block, InclusionProof, _merkle_levels,
+        verify_inclusion_proof
+    )
+
+    transactions = [make_transaction(amount=n) for n in range(1, 5)]
+    block = Block(1, transactions, "0" * 64)
+    header = block.header.hashed_fields()
+    levels = _merkle_levels([tx.txid for tx in transactions], block.version)
+    forged = InclusionProof(
+        txid=levels[1][0].hex(), leaf_index=0, leaf_count=2, path=[levels[1][1].hex()]
+    )
+    assert not verify_inclusion_proof(forged, header)
+    assert not verify_inclusion_proof(forged._replace(leaf_count=4), header)
+
+    proof = block.merkle_proof(transactions[0].txid)
+    assert not verify_inclusion_proof(proof._replace(leaf_count=5), header)
+    assert not verify_inclusion_proof(proof, dict(header, tx_count=5))
+
+    old = block.replace(version=ROOT_BLOCK_VERSION)
+    assert old.merkle_proof(transactions[0].txid) is None
+    assert not verify_inclusion_proof(proof, old.header.hashed_fields())
+
+
+def test_block_hash_commits_to_merkle_root():
+    """Versions 2 and 3 hash the header; legacy blocks keep the txid-list hash."""
+    from block import LEGACY_BLOCK_VERSION, ROOT_BLOCK_VERSION, Block, BlockHeader, header_hash
+
+    transactions = [make_transaction(), make_transaction()]
+    block = Block(1, transactions, "0" * 64)
+    legacy = block.replace(version=LEGACY_BLOCK_VERSION)
+    root_only = block.replace(version=ROOT_BLOCK_VERSION)
+
+    assert block.hash == header_hash(block.header.hashed_fields())
+    assert block.header.hashed_fields()["tx_count"] == 2
+    assert root_only.hash == header_hash(root_only.header.hashed_fields())
+    assert len({legacy.hash, root_only.hash, block.hash}) == 3
+    assert block.replace(transactions=transactions[:1]).hash != block.hash
+
+    for old in (root_only, block):
+        assert Block.from_dict(old.to_dict()).hash == old.hash
+        assert BlockHeader.from_bytes(old.header.to_bytes()).hash == old.hash
+
+    legacy_record = legacy.to_dict()
+    del legacy_record["version"]
+    assert Block.from_dict(legacy_record).hash == legacy.hash
+
+
+def test_lazy_ledger_validates_headers_without_bodies():
+    """A lazily loaded chain validates links and signatures on headers alone."""
+    from block import Block
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        for _ in range(3):
+            chain.add_block([make_transaction(), make_transaction()], miner)
+        ledger.save_blockchain(chain)
+
+        loaded = Blockchain()
+        loaded.set_chain(ledger.load_blockchain(lazy=True))
+        assert loaded.is_chain_valid(check_bodies=False)
+        assert not any(block.body_loaded for block in loaded.chain)
+        assert loaded.is_chain_valid()
+        assert [b.hash for b in loaded.chain] == [b.hash for b in chain.chain]
+
+        # A body that no longer matches its header is caught once loaded
+        block = chain.chain[2]
+        forged = [block.transactions[0].replace(amount=1000)] + list(block.transactions[1:])
+        ledger.compact(chain.chain[:2] + [Block.from_header(block.header, forged)]
+                       + chain.chain[3:])
+
+        tampered = Blockchain()
+        tampered.set_chain(Ledger(ledger.filename).load_blockchain(lazy=True))
+        assert tampered.is_chain_valid(check_bodies=False)
+        assert not tampered.is_chain_valid()
+
+
+def test_checkpoint_limits_validation_to_new_blocks():
+    """Appends advance the checkpoint; full=True still audits every block."""
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    chain = Blockchain()
+    miner = Wallet()
+    for _ in range(3):
+        chain.add_block([make_transaction()], miner)
+    assert chain.validated_height() == 3
+
+    # Swap an old block for one with a bad signature: the incremental
+    # check trusts the checkpoint, the audit does not
+    chain.chain[1] = chain.chain[1].replace(signature=chain.chain[2].signature)
+    assert chain.is_chain_valid()
+    assert not chain.is_chain_valid(full=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        chain = Blockchain()
+        chain.add_block([make_transaction()], miner)
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        ledger.save_blockchain(chain)
+
+        loaded = Blockchain()
+        loaded.set_chain(ledger.load_blockchain(lazy=True), ledger.load_checkpoint())
+        assert loaded.validated_height() == 1
+        assert loaded.is_chain_valid()
+        assert not any(block.body_loaded for block in loaded.chain)
+
+
+def test_audit_reports_first_bad_index():
+    """Serial and parallel audits agree and name the first bad block."""
+    from blockchain import Blockchain, audit_chain
+
+    chain = Blockchain()
+    miner = Wallet()
+    for _ in range(4):
+        chain.add_block([make_transaction(), make_transaction()], miner)
+
+    for parallel in (False, True):
+        report = audit_chain(chain.chain, parallel=parallel)
+        assert report.valid and report.first_bad_index is None
+        assert report.transactions == 8
+
+    # A transaction signed by someone else, in blocks 2 and 4
+    forged = make_transaction().replace(signature=make_transaction().signature)
+    blocks = list(chain.chain)
+    for index in (4, 2):
+        blocks[index] = blocks[index].replace(transactions=[forged]).signed_by(miner)
+
+    for parallel in (False, True):
+        report = audit_chain(blocks, parallel=parallel)
+        assert not report.valid
+        assert report.first_bad_index == 2
+
+
+def test_indexes_find_blocks_transactions_and_addresses():
+    """Hash, txid and address lookups agree with the chain, also after reload."""
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    alice, bob = Wallet(scheme="merkle", height=3), Wallet()
+    chain = Blockchain()
+    miner = Wallet()
+    first = make_transaction(alice, receiver=bob.get_address())
+    chain.add_block([make_transaction(), first], miner)
+    assert chain.get_transaction(first.txid)[1:] == (1, first)
+
+    # Indexes built on first use are kept current by add_block
+    second = make_transaction(alice, receiver="carol")
+    chain.add_block([second], miner)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        ledger.save_blockchain(chain)
+        loaded = Blockchain()
+        loaded.set_chain(ledger.load_blockchain(lazy=True))
+
+        for blockchain in (chain, loaded):
+            for block in blockchain.chain:
+                assert blockchain.get_block_by_hash(block.hash).index == block.index
+            block, position, tx = blockchain.get_transaction(second.txid)
+            assert (block.index, position, tx.txid) == (2, 0, second.txid)
+
+            history = blockchain.address_history(alice.get_address())
+            assert [tx.txid for _, _, tx in history] == [first.txid, second.txid]
+            assert len(blockchain.address_history(bob.get_address())) == 1
+            assert blockchain.get_block_by_hash("0" * 64) is None
+            assert blockchain.get_transaction("0" * 64) is None
+
+
+def test_account_state_replays_from_snapshot():
+    """Balances follow the chain and resume from a snapshot."""
+    from blockchain import Blockchain
+    from ledger import Ledger
+    from state import INITIAL_BALANCE, AccountState
+
+    alice = Wallet(scheme="merkle", height=3)
+    chain = Blockchain()
+    miner = Wallet()
+    chain.add_block([make_transaction(alice, receiver="bob", amount=100)], miner)
+
+    state = AccountState()
+    state.sync(chain.chain)
+    assert state.balance(alice.get_address()) == INITIAL_BALANCE - 100
+    assert state.balance("bob") == INITIAL_BALANCE + 100
+    assert state.balance("nobody") == INITIAL_BALANCE
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        ledger.save_snapshot(state.snapshot())
+        chain.add_block([make_transaction(alice, receiver="bob", amount=50)], miner)
+
+        resumed = AccountState.from_snapshot(ledger.load_snapshot())
+        assert resumed.height == 1
+        resumed.sync(chain.chain)
+        assert resumed.height == 2
+        assert resumed.balance("bob") == INITIAL_BALANCE + 150
+        assert resumed.verify(chain.chain)
+
+    resumed.balances["bob"] += 1
+    assert not resumed.verify(chain.chain)
+
+    # A replaced chain is replayed from genesis
+    resumed.sync(Blockchain().chain)
+    assert resumed.height == 0 and resumed.balance("bob") == INITIAL_BALANCE
+
+
+def test_account_state_skips_invalid_amounts_and_overdrafts():
+    """Bad amounts on chain move nothing; covered() drops what cannot be paid."""
+    from blockchain import Blockchain
+    from state import INITIAL_BALANCE, AccountState
+
+    legacy = Transaction("alice", "bob", "100", None, None, version=LEGACY_TX_VERSION)
+    chain = Blockchain()
+    chain.add_block([legacy, make_transaction(receiver="bob", amount=-5)], Wallet())
+
+    state = AccountState()
+    state.sync(chain.chain)
+    assert state.height == 1
+    assert state.balance("alice") == state.balance("bob") == INITIAL_BALANCE
+
+    payer = Wallet(scheme="merkle", height=3)
+    pays = [make_transaction(payer, amount=amount) for amount in (600, 600, 400)]
+    assert state.covered(pays + [legacy]) == [pays[0], pays[2]]
+
+
+def test_from_ledger_skips_genesis_keygen_for_saved_chain():
+    """Loading a saved chain never builds a throwaway genesis wallet."""
+    import blockchain as blockchain_module
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        fresh = Blockchain.from_ledger(ledger)
+        assert len(fresh.chain) == 1
+        fresh.add_block([make_transaction()], Wallet())
+        ledger.save_blockchain(fresh)
+
+        def no_keygen(*args, **kwargs):
+            raise AssertionError("genesis wallet created for a saved chain")
+
+        original, blockchain_module.Wallet = blockchain_module.Wallet, no_keygen
+        try:
+            loaded = Blockchain.from_ledger(ledger)
+        finally:
+            blockchain_module.Wallet = original
+
+        assert [b.hash for b in loaded.chain] == [b.hash for b in fresh.chain]
+        assert loaded.validated_height() == 1
+
+
+def test_genesis_is_fixed_and_reproducible():
+    """Every new chain starts from the shipped genesis, which rebuilds exactly."""
+    import json
+    from blockchain import (
+        GENESIS_FILE,
+        GENESIS_HASH,
+        Blockchain,
+        build_genesis_block
+    )
+
+    assert Blockchain().chain[0].hash == Blockchain().chain[0].hash == GENESIS_HASH
+    assert Blockchain().chain[0].verify_block_signature()
+
+    with open(GENESIS_FILE) as f:
+        assert build_genesis_block().to_dict() == json.load(f)
+
+
+def test_transactions_round_trip_through_ledger():
+    """Saved transactions reload with the same txid and still verify."""
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        chain.add_block([make_transaction(), make_transaction(version=1)], Wallet())
+        ledger.save_blockchain(chain)
+
+        loaded = ledger.load_blockchain()
+        for saved, reloaded in zip(chain.chain[1].transactions, loaded[1].transactions):
+            assert reloaded.txid == saved.txid
+            assert reloaded.verify()
+
+
+def test_saving_appends_only_new_blocks():
+    """Each save appends one record per new block; earlier bytes are untouched."""
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        chain.add_block([make_transaction()], miner)
+        ledger.save_blockchain(chain)
+        size = ledger.log.size()
+        with open(ledger.log._segment_path(0), "rb") as f:
+            before = f.read()
+
+        chain.add_block([make_transaction()], miner)
+        ledger.save_blockchain(chain)
+        with open(ledger.log._segment_path(0), "rb") as f:
+            after = f.read()
+        assert after[:size] == before
+        assert ledger.log.size() - size < size
+
+        # A replaced chain is rewritten instead of appended to
+        other = Blockchain()
+        other.add_block([make_transaction()], miner)
+        ledger.save_blockchain(other)
+        reloaded = Ledger(ledger.filename).load_blockchain()
+        assert [b.hash for b in reloaded] == [b.hash for b in other.chain]
+
+
+def test_torn_append_is_truncated_on_load():
+    """A partially written last record is dropped and the log stays appendable."""
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        chain.add_block([make_transaction()], miner)
+        ledger.save_blockchain(chain)
+        size = ledger.log.size()
+
+        chain.add_block([make_transaction()], miner)
+        ledger.save_blockchain(chain)
+        with open(ledger.log._segment_path(0), "r+b") as f:
+            f.truncate(ledger.log.size() - 7)
+
+        reopened = Ledger(ledger.filename)
+        loaded = Blockchain.from_ledger(reopened)
+        assert len(loaded.chain) == 2
+        assert ledger.log.size() == size
+
+        loaded.add_block([make_transaction()], miner)
+        reopened.save_blockchain(loaded)
+        assert len(Ledger(ledger.filename).load_blockchain()) == 3
+
+
+def test_legacy_json_ledger_migrates_to_log():
+    """A ledger saved as one JSON file still loads and moves into the log."""
+    import json
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        chain.add_block([make_transaction()], Wallet())
+        with open(ledger.filename, "w") as f:
+            json.dump([block.to_dict() for block in chain.chain], f, indent=4)
+
+        loaded = Blockchain.from_ledger(ledger)
+        assert [b.hash for b in loaded.chain] == [b.hash for b in chain.chain]
+        ledger.save_blockchain(loaded)
+        assert len(ledger.log.segments()) == 1
+        assert [h.hash for h in Ledger(ledger.filename).load_headers()] == \
+            [b.hash for b in chain.chain]
+
+
+def test_block_header_binary_round_trip():
+    """Binary headers decode to the same hash and still verify, for every scheme."""
+    from block import Block, BlockHeader
+    from blockchain import load_genesis_block
+
+    headers = [load_genesis_block().header]
+    for name in ("lamport", "lamport-seeded", "wots", "merkle"):
+        block = Block(1, [make_transaction()], "ab" * 32, None, None).signed_by(Wallet(scheme=name))
+        headers.append(block.header)
+
+    for header in headers:
+        decoded = BlockHeader.from_bytes(header.to_bytes())
+        assert decoded.to_dict() == header.to_dict()
+        assert decoded.verify_signature()
+
+
+def test_json_segments_still_load_and_appends_go_binary():
+    """A log written with JSON records loads; new blocks go to a binary segment."""
+    from blockchain import Blockchain
+    from blocklog import JSON_LOG_FORMAT, LOG_FORMAT, frame_record
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        chain.add_block([make_transaction(), make_transaction(version=1)], miner)
+        os.makedirs(ledger.log.directory)
+        with open(ledger.log._segment_path(0), "wb") as f:
+            f.write(b"".join(frame_record(b, JSON_LOG_FORMAT) for b in chain.chain))
+
+        loaded = Blockchain.from_ledger(ledger)
+        assert [b.hash for b in loaded.chain] == [b.hash for b in chain.chain]
+        assert loaded.is_chain_valid(full=True)
+
+        loaded.add_block([make_transaction()], miner)
+        ledger.save_blockchain(loaded)
+        assert ledger.log.segments() == [0, 1]
+        assert ledger.log._segment_format(1) == LOG_FORMAT
+        reloaded = Ledger(ledger.filename).load_blockchain()
+        assert [b.hash for b in reloaded] == [b.hash for b in loaded.chain]
+
+
+def test_chain_view_decodes_blocks_on_access():
+    """A loaded chain is a view: startup reads the index, blocks decode when used."""
+    from blockchain import Blockchain
+    from blocklog import BlockLog, ChainView
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        for _ in range(4):
+            chain.add_block([make_transaction()], miner)
+        ledger.save_blockchain(chain)
+
+        def no_scan(self, resume=None):
+            raise AssertionError("log scanned although the index is current")
+
+        original, BlockLog._scan = BlockLog._scan, no_scan
+        try:
+            reopened = Ledger(ledger.filename)
+            loaded = Blockchain.from_ledger(reopened)
+        finally:
+            BlockLog._scan = original
+
+        assert isinstance(loaded.chain, ChainView)
+        assert len(loaded.chain) == 5 and not loaded.chain._cache
+        assert loaded.block_heights == chain.block_heights
+        block = loaded.get_block_by_hash(chain.chain[3].hash)
+        assert [tx.txid for tx in block.transactions] == \
+            [tx.txid for tx in chain.chain[3].transactions]
+
+        loaded.chain.cache_size = 2
+        assert [b.hash for b in loaded.chain] == [b.hash for b in chain.chain]
+        assert len(loaded.chain._cache) == 2
+        assert loaded.audit(parallel=False).valid
+
+        # Mined blocks are stored by the next save and leave memory
+        loaded.add_block([make_transaction()], miner)
+        reopened.save_blockchain(loaded)
+        assert not loaded.chain._appended and len(loaded.chain) == 6
+        assert Ledger(ledger.filename).load_headers()[-1].hash == loaded.chain[-1].hash
+
+
+def test_missing_or_stale_index_is_rebuilt():
+    """The offset index is rebuilt from the segments when lost or behind."""
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        chain.add_block([make_transaction()], miner)
+        ledger.save_blockchain(chain)
+        with open(ledger.log.index_filename, "rb") as f:
+            stale_index = f.read()
+
+        chain.add_block([make_transaction()], miner)
+        ledger.save_blockchain(chain)
+        with open(ledger.log.index_filename, "wb") as f:
+            f.write(stale_index + b"torn")
+        assert Ledger(ledger.filename).log.entries() == ledger.log.entries()
+
+        os.remove(ledger.log.index_filename)
+        assert Ledger(ledger.filename).log.entries() == ledger.log.entries()
+        assert os.path.exists(ledger.log.index_filename)
+
+
+def test_sqlite_ledger_round_trips_and_appends():
+    """The SQLite backend saves incrementally and reloads the same chain."""
+    from blockchain import Blockchain
+    from sqlite_ledger import SQLiteLedger
+    from state import AccountState
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = SQLiteLedger(os.path.join(tmp, "chain.db"))
+        chain = Blockchain()
+        miner = Wallet()
+        legacy = make_transaction(version=1)
+        chain.add_block([make_transaction(amount=2.5), legacy], miner)
+        ledger.save_blockchain(chain)
+        chain.add_block([make_transaction()], miner)
+        ledger.save_blockchain(chain)
+        state = AccountState()
+        state.sync(chain.chain)
+        ledger.save_snapshot(state.snapshot())
+
+        for loaded in (ledger.load_blockchain(), ledger.load_blockchain(lazy=True)):
+            assert [b.hash for b in loaded] == [b.hash for b in chain.chain]
+            assert [tx.txid for tx in loaded[1].transactions] == \
+                [tx.txid for tx in chain.chain[1].transactions]
+            assert all(tx.verify() for tx in loaded[1].transactions)
+        assert ledger.load_checkpoint() == chain.checkpoint
+        assert ledger.load_snapshot().balances == state.balances
+
+        # A replaced chain replaces the stored blocks
+        other = Blockchain()
+        other.add_block([make_transaction()], miner)
+        ledger.save_blockchain(other)
+        assert ledger.hashes() == [b.hash for b in other.chain]
+
+
+def test_sqlite_ledger_answers_lookups_with_queries():
+    """Block, transaction and address lookups go to the SQLite indexes."""
+    from blockchain import Blockchain
+    from sqlite_ledger import SQLiteLedger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = SQLiteLedger(os.path.join(tmp, "chain.db"))
+        chain = Blockchain()
+        miner = Wallet()
+        for _ in range(3):
+            chain.add_block([make_transaction(receiver="alice"), make_transaction()], miner)
+        ledger.save_blockchain(chain)
+
+        loaded = Blockchain.from_ledger(ledger)
+        assert not loaded.block_heights
+        assert loaded.get_block_by_hash(chain.chain[2].hash).index == 2
+        tx = chain.chain[3].transactions[1]
+        block, position, found = loaded.get_transaction(tx.txid)
+        assert (block.index, position, found.txid) == (3, 1, tx.txid)
+
+        # Blocks mined after loading are found before and after saving
+        loaded.add_block([make_transaction(receiver="alice")], miner)
+        for _ in range(2):
+            history = loaded.address_history("alice")
+            assert [(b.index, p) for b, p, _ in history] == [(1, 0), (2, 0), (3, 0), (4, 0)]
+            ledger.save_blockchain(loaded)
+        page = loaded.address_history("alice", start=1, limit=2)
+        assert [b.index for b, _, _ in page] == [2, 3]
+
+        # Pages run across stored and newly mined blocks, in SQL and memory
+        for _ in range(2):
+            loaded.add_block([make_transaction(receiver="alice")], miner)
+        pages = [
+            [b.index for b, _, _ in loaded.address_history("alice", start, 2)]
+            for start in range(0, 8, 2)
+        ]
+        assert pages == [[1, 2], [3, 4], [5, 6], []]
+        assert [b.index for b, _, _ in loaded.address_history("alice", 3)] == [4, 5, 6]
+        assert [b.index for b, _, _ in loaded.address_history("alice", 5)] == [6]
+        assert ledger.address_locations("alice", 1, 2) == [(2, 0), (3, 0)]
+        assert ledger.address_count("alice") == 4
+
+
+def test_open_ledger_selects_backend():
+    """PQC_LEDGER_BACKEND (or the argument) picks the file or SQLite ledger."""
+    from ledger import Ledger, open_ledger
+    from sqlite_ledger import SQLiteLedger
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            assert isinstance(open_ledger("file"), Ledger)
+            assert isinstance(open_ledger("sqlite"), SQLiteLedger)
+            try:
+                open_ledger("csv")
+                assert False, "Unknown backend should raise"
+            except ValueError:
+                pass
+        finally:
+            os.chdir(cwd)
+
+
+def test_public_keys_are_stored_once_and_interned():
+    """Full keys go to the key table once; loaded records share key objects."""
+    from blockchain import Blockchain
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        tx = make_transaction(Wallet(scheme="lamport"))
+        chain.add_block([tx, make_transaction()], miner)
+        chain.add_block([tx], miner)
+        ledger.save_blockchain(chain)
+        assert len(ledger.log.keys) == 1
+
+        loaded = Ledger(ledger.filename).load_blockchain(lazy=True)
+        assert len(loaded[1].transactions[0].public_key) > 32
+        assert loaded[1].transactions[0].public_key is loaded[2].transactions[0].public_key
+        assert [b.hash for b in loaded] == [b.hash for b in chain.chain]
+
+        ledger.compact(loaded)
+        assert len(ledger.log.keys) == 1
+        assert Blockchain.from_ledger(ledger).is_chain_valid(full=True)
+
+
+def test_binary_segments_without_key_table_still_load():
+    """Segments from before the key table load; new blocks use the current format."""
+    from blockchain import Blockchain
+    from blocklog import BINARY_LOG_FORMAT, LOG_FORMAT, MAGIC, _SEGMENT_HEADER, frame_record
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        chain.add_block([make_transaction(Wallet(scheme="lamport"))], miner)
+        os.makedirs(ledger.log.directory)
+        with open(ledger.log._segment_path(0), "wb") as f:
+            f.write(_SEGMENT_HEADER.pack(MAGIC, BINARY_LOG_FORMAT))
+            f.write(b"".join(frame_record(b, BINARY_LOG_FORMAT) for b in chain.chain))
+
+        loaded = Blockchain.from_ledger(ledger)
+        assert loaded.is_chain_valid(full=True)
+        assert len(ledger.log.keys) == 0
+
+        loaded.add_block([make_transaction(Wallet(scheme="lamport"))], miner)
+        ledger.save_blockchain(loaded)
+        assert ledger.log._segment_format(1) == LOG_FORMAT
+        assert len(ledger.log.keys) == 1
+        reloaded = Ledger(ledger.filename).load_blockchain()
+        assert [b.hash for b in reloaded] == [b.hash for b in loaded.chain]
+
+
+def test_corrupt_middle_record_raises_instead_of_truncating():
+    """A bad record with data after it is corruption, not a torn append."""
+    from blockchain import Blockchain
+    from blocklog import _FRAME
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        for _ in range(4):
+            chain.add_block([make_transaction()], miner)
+        ledger.save_blockchain(chain)
+        ledger.log.close()
+        location = ledger.log.entries()[1]
+        path = ledger.log._segment_path(location.segment)
+        size = os.path.getsize(path)
+
+        with open(path, "r+b") as f:
+            f.seek(location.offset + _FRAME.size + location.header_length + 5)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        os.remove(ledger.log.index_filename)
+
+        try:
+            Ledger(ledger.filename).load_blockchain()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("corrupt record was not reported")
+        assert os.path.getsize(path) == size
+
+
+def test_corrupt_key_entry_raises_instead_of_truncating():
+    """A bad key table entry with entries after it raises; a torn tail is dropped."""
+    from blockchain import Blockchain
+    from blocklog import _KEY_ENTRY, _KEYS_HEADER, PublicKeyTable
+    from ledger import Ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "blockchain.json"))
+        chain = Blockchain()
+        miner = Wallet()
+        for _ in range(3):
+            chain.add_block([make_transaction(Wallet(scheme="lamport"))], miner)
+        ledger.save_blockchain(chain)
+        filename = ledger.log.keys.filename
+        with open(filename, "rb") as f:
+            data = f.read()
+
+        corrupt = bytearray(data)
+        corrupt[_KEYS_HEADER.size + _KEY_ENTRY.size + 40] ^= 0x01
+        with open(filename, "wb") as f:
+            f.write(corrupt)
+        try:
+            len(PublicKeyTable(filename))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("corrupt key entry was not reported")
+        assert os.path.getsize(filename) == len(data)
+
+        with open(filename, "wb") as f:
+            f.write(data[:-3])
+        assert len(PublicKeyTable(filename)) == 2
+
+
+def test_duplicate_txid_resolves_to_first_block_on_every_backend():
+    """A txid mined twice is found in its first block, whatever the store."""
+    from blockchain import Blockchain
+    from ledger import Ledger
+    from sqlite_ledger import SQLiteLedger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        miner = Wallet()
+        tx = make_transaction()
+        chain = Blockchain()
+        chain.add_block([tx], miner)
+        chain.add_block([make_transaction(), tx], miner)
+        assert chain.get_transaction(tx.txid)[0].index == 1
+
+        for ledger in (Ledger(os.path.join(tmp, "blockchain.json")),
+                       SQLiteLedger(os.path.join(tmp, "ledger.db"))):
+            ledger.save_blockchain(chain)
+            loaded = Blockchain.from_ledger(ledger)
+            loaded.add_block([tx], miner)
+            block, position, found = loaded.get_transaction(tx.txid)
+            assert (block.index, position, found.txid) == (1, 0, tx.txid)
+
+
+def main():
+    tests = [
+        test_transaction_binary_round_trip,
+        test_transaction_is_immutable,
+        test_block_is_immutable_and_round_trips,
+        test_inclusion_proofs_for_every_tree_shape,
+        test_inclusion_proof_rejects_internal_nodes_and_old_blocks,
+        test_block_hash_commits_to_merkle_root,
+        test_lazy_ledger_validates_headers_without_bodies,
+        test_checkpoint_limits_validation_to_new_blocks,
+        test_audit_reports_first_bad_index,
+        test_indexes_find_blocks_transactions_and_addresses,
+        test_account_state_replays_from_snapshot,
+        test_account_state_skips_invalid_amounts_and_overdrafts,
+        test_from_ledger_skips_genesis_keygen_for_saved_chain,
+        test_genesis_is_fixed_and_reproducible,
+        test_legacy_transactions_keep_json_hash,
+        test_transaction_amount_is_validated,
+        test_transactions_round_trip_through_ledger,
+        test_saving_appends_only_new_blocks,
+        test_torn_append_is_truncated_on_load,
+        test_legacy_json_ledger_migrates_to_log,
+        test_block_header_binary_round_trip,
+        test_json_segments_still_load_and_appends_go_binary,
+        test_chain_view_decodes_blocks_on_access,
+        test_missing_or_stale_index_is_rebuilt,
+        test_sqlite_ledger_round_trips_and_appends,
+        test_sqlite_ledger_answers_lookups_with_queries,
+        test_open_ledger_selects_backend,
+        test_duplicate_txid_resolves_to_first_block_on_every_backend,
+        test_public_keys_are_stored_once_and_interned,
+        test_binary_segments_without_key_table_still_load,
+        test_corrupt_middle_record_raises_instead_of_truncating,
+        test_corrupt_key_entry_raises_instead_of_truncating,
+    ]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ ALL TESTS PASSED!")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,377 @@
+"""
+Test script for the PQC signature primitives.
+
+Usage:
+    python test_pqc_crypto.py
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pqc_crypto import (
+    SCHEMES,
+    get_scheme,
+    decode_public_key,
+    decode_signature,
+    derive_lamport_secret,
+    encode_public_key,
+    encode_signature,
+    generate_lamport_keypair,
+    generate_merkle_keypair,
+    generate_seeded_lamport_keypair,
+    generate_wots_keypair,
+    lamport_public_key_digest,
+    sign_compact_message,
+    sign_message,
+    VerificationCache,
+    VERIFICATION_CACHE,
+    verify_batch,
+    verify_cached,
+    verify_item,
+    verify_signature,
+    WotsPrivateKey
+)
+from keypool import KeyPool
+from wallet import Wallet, MerkleWallet
+
+
+def test_lamport_sign_verify():
+    """Lamport signatures verify and reject tampered messages."""
+    priv, pub = generate_lamport_keypair()
+    sig = sign_message("hello", priv)
+
+    assert verify_signature("hello", sig, pub)
+    assert not verify_signature("hello!", sig, pub)
+
+
+def test_lamport_keys_and_signatures_are_flat_buffers():
+    """Keys and signatures are single 16 KB / 8 KB buffers."""
+    priv, pub = generate_lamport_keypair()
+    sig = sign_message("flat", priv)
+
+    assert isinstance(pub, bytes) and len(pub) == 16384
+    assert isinstance(sig, bytes) and len(sig) == 8192
+
+
+def test_legacy_list_encoding_still_decodes():
+    """Ledger data written as hex lists decodes to the flat format."""
+    priv, pub = generate_lamport_keypair()
+    sig = sign_message("legacy", priv)
+    legacy_sig = [sig[i:i + 32].hex() for i in range(0, len(sig), 32)]
+    legacy_pub = [
+        (pub[i:i + 32].hex(), pub[i + 32:i + 64].hex())
+        for i in range(0, len(pub), 64)
+    ]
+
+    assert decode_signature(legacy_sig) == sig
+    assert decode_public_key(legacy_pub) == pub
+
+
+def test_seeded_lamport_is_deterministic():
+    """The same seed always expands to the same key pair."""
+    seed = bytes(range(32))
+    priv_a, pub_a = generate_seeded_lamport_keypair(seed)
+    priv_b, pub_b = generate_seeded_lamport_keypair(seed)
+
+    assert pub_a == pub_b
+    assert sign_message("msg", priv_a) == sign_message("msg", priv_b)
+    assert verify_signature("msg", sign_message("msg", priv_a), pub_b)
+
+
+def test_wallet_restored_from_seed():
+    """A seeded wallet reloads to the same address from its seed."""
+    wallet = Wallet()
+    restored = Wallet.from_seed(wallet.get_seed())
+
+    assert restored.get_address() == wallet.get_address()
+
+
+def test_compact_signature_verifies_against_key_hash():
+    """Compact signatures need only the 32-byte public key hash."""
+    priv, pub = generate_lamport_keypair()
+    key_hash = lamport_public_key_digest(pub)
+    sig = sign_compact_message("hello", priv)
+
+    assert verify_signature("hello", sig, key_hash)
+    assert verify_signature("hello", sig, pub)
+    assert not verify_signature("hello!", sig, key_hash)
+    assert verify_signature("hello", decode_signature(encode_signature(sig)), key_hash)
+
+
+def test_compact_wallet_verification_key_is_address():
+    """A compact wallet's verification key is its address bytes."""
+    wallet = Wallet()
+    sig = wallet.sign("tx")
+
+    assert wallet.get_verification_key() == bytes.fromhex(wallet.get_address())
+    assert verify_signature("tx", sig, wallet.get_verification_key())
+
+
+def test_merkle_signs_many_messages_under_one_root():
+    """Every leaf of a Merkle key verifies against the same root."""
+    priv, root = generate_merkle_keypair(height=2)
+
+    for n in range(4):
+        sig = sign_message(f"tx {n}", priv)
+        assert verify_signature(f"tx {n}", sig, root)
+        assert not verify_signature(f"tx {n + 1}", sig, root)
+
+    try:
+        sign_message("one too many", priv)
+        assert False, "Exhausted Merkle key should refuse to sign"
+    except ValueError:
+        pass
+
+
+def test_merkle_signature_round_trips_through_json():
+    """Merkle signatures survive encode/decode for the ledger."""
+    priv, root = generate_merkle_keypair(height=1)
+    sig = sign_message("ledger", priv)
+
+    assert verify_signature("ledger", decode_signature(encode_signature(sig)), root)
+
+
+def test_merkle_wallet_keeps_address():
+    """A Merkle wallet keeps its address until all leaves are used."""
+    wallet = MerkleWallet(height=2)
+    address = wallet.get_address()
+
+    for n in range(4):
+        wallet.sign(f"msg {n}")
+        assert wallet.get_address() == address
+
+    wallet.sign("rotate")
+    assert wallet.get_address() != address
+
+
+def test_wots_sign_verify_for_every_w():
+    """WOTS signatures verify for each supported Winternitz parameter."""
+    for w in (4, 16, 256):
+        priv, pub = generate_wots_keypair(w)
+        sig = sign_message("payment", priv)
+
+        assert verify_signature("payment", sig, pub)
+        assert not verify_signature("payment!", sig, pub)
+        assert verify_signature(
+            "payment",
+            decode_signature(encode_signature(sig)),
+            decode_public_key(encode_public_key(pub))
+        )
+
+
+def test_wots_signature_with_unsupported_w_is_invalid():
+    """A client-supplied w outside WINTERNITZ_VALUES fails verification cleanly."""
+    wallet = Wallet(scheme="wots")
+    signature = wallet.sign("payment")
+    public_key = wallet.get_verification_key()
+
+    items = [
+        ("wots", "payment", signature._replace(w=w), public_key)
+        for w in (2, 8, 0, "16")
+    ]
+    for item in items:
+        assert verify_item(item) is False
+        assert verify_cached(item) is False
+    assert verify_batch(items, parallel=False) == [False] * len(items)
+    assert verify_batch(items, parallel=True) == [False] * len(items)
+
+
+def test_wots_and_lamport_secrets_are_domain_separated():
+    """One seed never yields the same secret for a WOTS chain and a Lamport key."""
+    seed = bytes(32)
+    wots_key = WotsPrivateKey(seed)
+    for i in range(8):
+        assert wots_key.chain_start(i) != derive_lamport_secret(seed, i, 0)
+        assert wots_key.chain_start(i) != derive_lamport_secret(seed, i, 1)
+
+
+def test_every_registered_scheme_round_trips():
+    """Keygen/sign/verify resolve through the registry for every scheme."""
+    for name in SCHEMES:
+        wallet = Wallet(scheme=name)
+        sig = wallet.sign("registry")
+        scheme = get_scheme(wallet.scheme_id)
+
+        assert scheme.verify("registry", sig, wallet.get_verification_key())
+        assert not scheme.verify("registry?", sig, wallet.get_verification_key())
+
+
+def test_unknown_scheme_is_rejected():
+    """Unknown scheme ids raise instead of silently falling back."""
+    try:
+        get_scheme("rsa")
+        assert False, "Unknown scheme should raise"
+    except ValueError:
+        pass
+
+
+def test_verify_batch_returns_per_item_results():
+    """Batch verification matches one-by-one verification, in order."""
+    items = []
+    for n in range(6):
+        wallet = Wallet()
+        sig = wallet.sign(f"tx {n}")
+        message = f"tx {n}" if n % 3 else "tampered"
+        items.append((wallet.scheme_id, message, sig, wallet.get_verification_key()))
+    expected = [False, True, True, False, True, True]
+
+    assert verify_batch(items, parallel=False) == expected
+    assert verify_batch(items, parallel=True) == expected
+
+
+def test_verification_cache_hits_on_reverify():
+    """A signature verified once is answered from the cache afterwards."""
+    wallet = Wallet()
+    item = (wallet.scheme_id, "cached", wallet.sign("cached"),
+            wallet.get_verification_key())
+
+    assert verify_cached(item)
+    hits = VERIFICATION_CACHE.hits
+    assert verify_cached(item)
+    assert VERIFICATION_CACHE.hits == hits + 1
+    assert verify_batch([item]) == [True]
+    assert VERIFICATION_CACHE.hits == hits + 2
+
+
+def test_verification_cache_is_bounded():
+    """The LRU cache evicts its oldest entries beyond max_size."""
+    cache = VerificationCache(max_size=2)
+    for n in range(3):
+        cache.add(("lamport", n))
+
+    assert cache.evictions == 1
+    assert not cache.contains(("lamport", 0))
+    assert cache.contains(("lamport", 2))
+
+
+def wait_for(condition, timeout=10):
+    """Poll until condition() is true or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_key_pool_counts_hits_and_misses():
+    """Wallets take pooled key pairs while any are ready, and count misses."""
+    pool = KeyPool(size=2, low_water=0)
+    try:
+        wait_for(lambda: pool.stats()["available"] == 2)
+        wallets = [Wallet(key_pool=pool) for _ in range(3)]
+        stats = pool.stats()
+
+        assert (stats["hits"], stats["misses"]) == (2, 1)
+        assert len({wallet.get_address() for wallet in wallets}) == 3
+        assert wallets[0].scheme.verify(
+            "pooled", wallets[0].sign("pooled"), wallets[0].get_verification_key()
+        )
+    finally:
+        pool.stop()
+
+
+def test_key_pool_refills_below_low_water():
+    """Taking the pool below its low-water mark tops it back up to size."""
+    pool = KeyPool(size=4, low_water=2)
+    try:
+        wait_for(lambda: pool.stats()["available"] == 4)
+        for _ in range(3):
+            assert pool.take() is not None
+        wait_for(lambda: pool.stats()["available"] == 4)
+        assert pool.stats()["generated"] == 7
+    finally:
+        pool.stop()
+
+
+def test_key_pool_stops_during_refill():
+    """stop() returns promptly even while a refill is running."""
+    pool = KeyPool(size=200)
+    time.sleep(0.02)
+    stopper = threading.Thread(target=pool.stop)
+    stopper.start()
+    stopper.join(timeout=10)
+
+    assert not stopper.is_alive()
+
+
+def test_signature_of_another_scheme_is_rejected():
+    """A signature checked under the wrong scheme id is invalid, not an error."""
+    items = []
+    for signer in SCHEMES:
+        wallet = Wallet(scheme=signer)
+        signature = decode_signature(encode_signature(wallet.sign("mismatch")))
+        public_key = wallet.get_verification_key()
+        items.extend(
+            (name, "mismatch", signature, public_key)
+            for name in SCHEMES if name != signer
+        )
+
+    for item in items:
+        assert verify_item(item) is False
+    assert verify_batch(items, parallel=False) == [False] * len(items)
+    assert verify_batch(items, parallel=True) == [False] * len(items)
+
+
+def test_malformed_signatures_are_invalid_through_the_cache():
+    """Signatures the cache cannot key still verify to False, not raise."""
+    from transaction import Transaction
+
+    wots, merkle = Wallet(scheme="wots"), MerkleWallet(height=2)
+    transactions = []
+    for wallet, changes in ((wots, {"w": 99999}), (wots, {"w": "x"}),
+                            (merkle, {"leaf_index": -1})):
+        tx = Transaction(wallet.get_address(), "receiver", 10, None, None)
+        signature = wallet.sign(tx.txid)._replace(**changes)
+        transactions.append(tx.replace(
+            signature=signature,
+            public_key=wallet.get_verification_key(),
+            scheme=wallet.scheme_id
+        ))
+
+    for tx in transactions:
+        assert tx.verify() is False
+    items = [tx.verification_item() for tx in transactions]
+    assert verify_batch(items, parallel=False) == [False] * len(items)
+    assert verify_batch(items, parallel=True) == [False] * len(items)
+
+
+def main():
+    tests = [
+        test_lamport_sign_verify,
+        test_lamport_keys_and_signatures_are_flat_buffers,
+        test_legacy_list_encoding_still_decodes,
+        test_seeded_lamport_is_deterministic,
+        test_wallet_restored_from_seed,
+        test_compact_signature_verifies_against_key_hash,
+        test_compact_wallet_verification_key_is_address,
+        test_merkle_signs_many_messages_under_one_root,
+        test_merkle_signature_round_trips_through_json,
+        test_merkle_wallet_keeps_address,
+        test_wots_sign_verify_for_every_w,
+        test_wots_signature_with_unsupported_w_is_invalid,
+        test_wots_and_lamport_secrets_are_domain_separated,
+        test_every_registered_scheme_round_trips,
+        test_unknown_scheme_is_rejected,
+        test_verify_batch_returns_per_item_results,
+        test_verification_cache_hits_on_reverify,
+        test_verification_cache_is_bounded,
+        test_signature_of_another_scheme_is_rejected,
+        test_malformed_signatures_are_invalid_through_the_cache,
+        test_key_pool_counts_hits_and_misses,
+        test_key_pool_refills_below_low_water,
+        test_key_pool_stops_during_refill,
+    ]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ ALL TESTS PASSED!")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,31 +1,258 @@
 import time
 import json
 import hashlib
-from pqc_crypto import verify_signature
+import struct
+from pqc_crypto import (
+    DEFAULT_SCHEME,
+    LEGACY_SCHEME,
+    decode_public_key,
+    decode_signature,
+    encode_public_key,
+    encode_signature,
+    get_scheme,
+    public_key_bytes,
+    signature_bytes,
+    verify_cached
+)
+
+# Format versions: 1 hashed a sorted-key JSON dict, 2 hashes the
+# canonical binary body below
+LEGACY_TX_VERSION = 1
+TX_VERSION = 2
+
+# Binary body: version, sender, receiver (u16 length-prefixed UTF-8),
+# amount (type tag + int64 or float64) and timestamp (float64).
+# The tag keeps 10 and 10.0 distinct so legacy JSON hashes survive.
+# Legacy amounts with no binary form (strings, bools, huge ints) are
+# stored as tag 2 + length-prefixed JSON, then the timestamp.
+_VERSION = struct.Struct(">B")
+_SHORT_LEN = struct.Struct(">H")
+_LONG_LEN = struct.Struct(">I")
+_INT_AMOUNT = struct.Struct(">Bqd")
+_FLOAT_AMOUNT = struct.Struct(">Bdd")
+_AMOUNT_FORMATS = (_FLOAT_AMOUNT, _INT_AMOUNT)
+_JSON_AMOUNT = 2
+_TIMESTAMP = struct.Struct(">d")
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+_FIELDS = ("sender", "receiver", "amount", "signature", "public_key",
+           "timestamp", "scheme", "version")
+
+
+def _pack_text(text, length=_SHORT_LEN):
+    data = text.encode()
+    return length.pack(len(data)) + data
+
+
+def _unpack_bytes(data, offset, length):
+    (size,) = length.unpack_from(data, offset)
+    offset += length.size
+    return bytes(data[offset:offset + size]), offset + size
+
+
+def _check_amount(amount):
+    """Raise unless amount fits the binary body (an int64 or a float)."""
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        raise TypeError(f"Transaction amount must be a number, not {type(amount).__name__}")
+    if isinstance(amount, int) and not _INT64_MIN <= amount <= _INT64_MAX:
+        raise ValueError(f"Transaction amount out of range: {amount}")
+
+
+def _check_fields(sender, receiver, timestamp, version):
+    """Raise unless the other body fields fit the binary encoding."""
+    if isinstance(version, bool) or version not in (LEGACY_TX_VERSION, TX_VERSION):
+        raise ValueError(f"Unsupported transaction version: {version!r}")
+    for name, text in (("sender", sender), ("receiver", receiver)):
+        if not isinstance(text, str):
+            raise TypeError(f"Transaction {name} must be a string, not {type(text).__name__}")
+        if len(text.encode()) > 0xFFFF:
+            raise ValueError(f"Transaction {name} is longer than {0xFFFF} bytes")
+    if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)):
+        raise TypeError(f"Transaction timestamp must be a number, not {type(timestamp).__name__}")
+
+
+def _decode_public_key(scheme, data, keys):
+    if not data:
+        return None
+    if keys is not None:
+        return keys.unpack(scheme, data)
+    return scheme.public_key_from_bytes(data)
 
 
 class Transaction:
-    def __init__(self, sender, receiver, amount, signature, public_key, timestamp=None):
-        self.sender = sender
-        self.receiver = receiver
-        self.amount = amount
-        self.timestamp = timestamp or time.time()
-        self.signature = signature
-        self.public_key = public_key
+    """
+    Immutable transaction record. Slots instead of a per-instance dict,
+    and the txid is hashed once at construction; use replace() to derive
+    a changed copy (e.g. the signed version of an unsigned transaction).
+    """
+
+    __slots__ = _FIELDS + ("txid",)
+
+    def __init__(self, sender, receiver, amount, signature, public_key, timestamp=None,
+                 scheme=None, version=TX_VERSION):
+        timestamp = timestamp or time.time()
+        _check_fields(sender, receiver, timestamp, version)
+        # Legacy txids hash JSON, so any amount they were written with loads
+        if version != LEGACY_TX_VERSION:
+            _check_amount(amount)
+        _set = object.__setattr__
+        _set(self, "sender", sender)
+        _set(self, "receiver", receiver)
+        _set(self, "amount", amount)
+        _set(self, "signature", signature)
+        _set(self, "public_key", public_key)
+        _set(self, "timestamp", timestamp)
+        _set(self, "scheme", scheme or DEFAULT_SCHEME)
+        _set(self, "version", version)
+        _set(self, "txid", self._compute_txid())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Transaction is immutable; use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Transaction is immutable")
+
+    def __reduce__(self):
+        return (self.__class__, tuple(getattr(self, name) for name in _FIELDS))
+
+    def replace(self, **changes):
+        """Return a copy with the given fields changed."""
+        fields = {name: getattr(self, name) for name in _FIELDS}
+        fields.update(changes)
+        return self.__class__(**fields)
+
+    def encode_body(self):
+        """Canonical binary encoding of the signed transaction fields."""
+        return (
+            _VERSION.pack(self.version)
+            + _pack_text(self.sender)
+            + _pack_text(self.receiver)
+            + self._pack_amount_timestamp()
+        )
+
+    def _pack_amount_timestamp(self):
+        try:
+            _check_amount(self.amount)
+        except (TypeError, ValueError):
+            # Only legacy transactions get here
+            amount = json.dumps(self.amount).encode()
+            return (bytes((_JSON_AMOUNT,)) + _LONG_LEN.pack(len(amount)) + amount
+                    + _TIMESTAMP.pack(self.timestamp))
+        if isinstance(self.amount, int):
+            return _INT_AMOUNT.pack(1, self.amount, self.timestamp)
+        return _FLOAT_AMOUNT.pack(0, self.amount, self.timestamp)
+
+    def _compute_txid(self):
+        if self.version == LEGACY_TX_VERSION:
+            tx_data = {
+                "sender": self.sender,
+                "receiver": self.receiver,
+                "amount": self.amount,
+                "timestamp": self.timestamp
+            }
+            tx_bytes = json.dumps(tx_data, sort_keys=True).encode()
+        else:
+            tx_bytes = self.encode_body()
+        return hashlib.sha256(tx_bytes).hexdigest()
 
     def calculate_hash(self):
-        tx_data = {
+        """Return the txid computed at construction."""
+        return self.txid
+
+    def to_dict(self):
+        """JSON-ready dict, as stored in the ledger and sent to the API."""
+        return {
             "sender": self.sender,
             "receiver": self.receiver,
             "amount": self.amount,
-            "timestamp": self.timestamp
+            "timestamp": self.timestamp,
+            "scheme": self.scheme,
+            "version": self.version,
+            "signature": None if self.signature is None else encode_signature(self.signature),
+            "public_key": None if self.public_key is None else encode_public_key(self.public_key)
         }
-        tx_string = json.dumps(tx_data, sort_keys=True)
-        return hashlib.sha256(tx_string.encode()).hexdigest()
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a transaction from to_dict output.
+        Records without scheme/version are pre-registry, JSON-hashed ones.
+        """
+        signature, public_key = data.get("signature"), data.get("public_key")
+        return cls(
+            sender=data["sender"],
+            receiver=data["receiver"],
+            amount=data["amount"],
+            signature=None if signature is None else decode_signature(signature),
+            public_key=None if public_key is None else decode_public_key(public_key),
+            timestamp=data["timestamp"],
+            scheme=data.get("scheme", LEGACY_SCHEME),
+            version=data.get("version", LEGACY_TX_VERSION)
+        )
+
+    def to_bytes(self, keys=None):
+        """
+        Full binary record: body, scheme id, signature and public key.
+        Round-trips through from_bytes. With a PublicKeyTable, the key
+        field holds the table's reference instead of the key.
+        """
+        signature = b"" if self.signature is None else signature_bytes(self.signature)
+        public_key = b"" if self.public_key is None else public_key_bytes(self.public_key)
+        if keys is not None and public_key:
+            public_key = keys.pack(public_key)
+        return (
+            self.encode_body()
+            + _pack_text(self.scheme)
+            + _LONG_LEN.pack(len(signature)) + signature
+            + _LONG_LEN.pack(len(public_key)) + public_key
+        )
+
+    @classmethod
+    def decode(cls, data, offset=0, keys=None):
+        """
+        Decode one binary record at offset; return (transaction, end offset).
+        keys is the PublicKeyTable the record was written with, if any.
+        """
+        (version,) = _VERSION.unpack_from(data, offset)
+        offset += _VERSION.size
+        sender, offset = _unpack_bytes(data, offset, _SHORT_LEN)
+        receiver, offset = _unpack_bytes(data, offset, _SHORT_LEN)
+        if data[offset] == _JSON_AMOUNT:
+            amount, offset = _unpack_bytes(data, offset + 1, _LONG_LEN)
+            amount = json.loads(amount)
+            (timestamp,) = _TIMESTAMP.unpack_from(data, offset)
+            offset += _TIMESTAMP.size
+        else:
+            amount_format = _AMOUNT_FORMATS[data[offset]]
+            _, amount, timestamp = amount_format.unpack_from(data, offset)
+            offset += amount_format.size
+        scheme_id, offset = _unpack_bytes(data, offset, _SHORT_LEN)
+        signature, offset = _unpack_bytes(data, offset, _LONG_LEN)
+        public_key, offset = _unpack_bytes(data, offset, _LONG_LEN)
+
+        scheme = get_scheme(scheme_id.decode())
+        tx = cls(
+            sender=sender.decode(),
+            receiver=receiver.decode(),
+            amount=amount,
+            signature=scheme.signature_from_bytes(signature) if signature else None,
+            public_key=_decode_public_key(scheme, public_key, keys),
+            timestamp=timestamp,
+            scheme=scheme.name,
+            version=version
+        )
+        return tx, offset
+
+    @classmethod
+    def from_bytes(cls, data, keys=None):
+        return cls.decode(data, 0, keys)[0]
+
+    def verification_item(self):
+        """Return (scheme, message, signature, public_key) for verify_batch."""
+        return (self.scheme, self.calculate_hash(), self.signature, self.public_key)
 
     def verify(self):
-        message = self.calculate_hash()
-        return verify_signature(message, self.signature, self.public_key)
+        return verify_cached(self.verification_item())
 
 
 if __name__ == "__main__":
@@ -48,13 +275,11 @@ if __name__ == "__main__":
     signature = sender_wallet.sign(tx_hash)
 
     # Final transaction
-    tx = Transaction(
-        sender=sender_wallet.get_address(),
-        receiver=receiver_wallet.get_address(),
-        amount=10,
+    tx = temp_tx.replace(
         signature=signature,
-        public_key=sender_wallet.public_key,
-        timestamp=temp_tx.timestamp
+        public_key=sender_wallet.get_verification_key(),
+        scheme=sender_wallet.scheme_id
     )
 
-    print("Transaction valid:", tx.verify())
\ No newline at end of file
+    print("Transaction valid:", tx.verify())
+    print("Round-trips through to_dict:", Transaction.from_dict(tx.to_dict()).txid == tx.txid)
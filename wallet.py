@@ -1,41 +1,68 @@
-import hashlib
-from pqc_crypto import generate_lamport_keypair, sign_message
-
-# Maximum number of signatures allowed per Lamport key
-MAX_KEY_USAGE = 1   # Lamport is a one-time signature scheme
+from pqc_crypto import (
+    DEFAULT_SCHEME,
+    MERKLE_TREE_HEIGHT,
+    WINTERNITZ_W,
+    get_scheme
+)
 
 
 class Wallet:
-    def __init__(self):
+    def __init__(self, scheme=None, seed=None, key_pool=None, **params):
+        """
+        Create a wallet for a registered signature scheme.
+        Extra params (e.g. w, height) are passed to the scheme's keygen.
+        With a key_pool, key pairs come from the pool when one is ready.
+        """
+        self.scheme = get_scheme(scheme or DEFAULT_SCHEME)
+        self.params = params
+        self.key_pool = key_pool
         self.private_key = None
         self.public_key = None
         self.address = None
         self.usage_count = 0
-        self._generate_new_keys()
+        self._generate_new_keys(seed)
+
+    @classmethod
+    def from_seed(cls, seed: bytes, scheme=None, **params):
+        """Reload a seeded wallet from its 32-byte seed."""
+        return cls(scheme=scheme, seed=seed, **params)
+
+    @property
+    def scheme_id(self):
+        """Id of the signature scheme, recorded on transactions and blocks."""
+        return self.scheme.name
+
+    def _generate_new_keys(self, seed=None):
+        """Generate a new key pair and reset usage counter."""
+        keypair = None
+        if (seed is None and self.key_pool is not None
+                and self.key_pool.matches(self.scheme, self.params)):
+            keypair = self.key_pool.take()
+        if keypair is None:
+            keypair = self.scheme.generate_keypair(seed, **self.params)
 
-    def _generate_new_keys(self):
-        """Generate a new Lamport key pair and reset usage counter."""
-        self.private_key, self.public_key = generate_lamport_keypair()
+        self.private_key, self.public_key = keypair
         self.address = self._generate_address()
         self.usage_count = 0
 
     def _generate_address(self):
         """Generate wallet address as SHA-256 hash of public key."""
-        public_key_bytes = b''.join(
-            pk0 + pk1 for pk0, pk1 in self.public_key
-        )
-        return hashlib.sha256(public_key_bytes).hexdigest()
+        return self.scheme.key_hash(self.public_key).hex()
+
+    def _keys_exhausted(self):
+        """Return True once the current key must not sign again."""
+        return self.usage_count >= self.scheme.max_signatures(self.private_key)
 
     def sign(self, message: str):
         """
-        Sign a message using Lamport private key.
+        Sign a message using the wallet's private key.
         Automatically regenerates keys if usage limit is exceeded.
         """
-        if self.usage_count >= MAX_KEY_USAGE:
+        if self._keys_exhausted():
             print("[!] Key usage limit reached. Generating new wallet keys...")
             self._generate_new_keys()
 
-        signature = sign_message(message, self.private_key)
+        signature = self.scheme.sign(message, self.private_key)
         self.usage_count += 1
         return signature
 
@@ -43,6 +70,51 @@ class Wallet:
         """Return wallet address."""
         return self.address
 
+    def get_verification_key(self):
+        """
+        Return the key verifiers need for this wallet's signatures:
+        the full public key, its 32-byte hash, or a Merkle root.
+        """
+        return self.scheme.verification_key(self.public_key)
+
+    def get_seed(self):
+        """Return the 32-byte seed of a seeded wallet, or None."""
+        return getattr(self.private_key, "seed", None)
+
+
+class MerkleWallet(Wallet):
+    """
+    Wallet backed by a Merkle tree of Lamport one-time keys.
+    The address (hash of the Merkle root) stays the same for
+    2 ** height signatures instead of changing after every one.
+    """
+
+    def __init__(self, height=MERKLE_TREE_HEIGHT, seed=None, next_leaf=0):
+        super().__init__(scheme="merkle", seed=seed, height=height)
+        self.private_key.next_leaf = next_leaf
+        self.usage_count = next_leaf
+
+    @classmethod
+    def from_seed(cls, seed: bytes, height=MERKLE_TREE_HEIGHT, next_leaf=0):
+        """Reload a Merkle wallet; next_leaf must skip every used leaf."""
+        return cls(height=height, seed=seed, next_leaf=next_leaf)
+
+
+class WotsWallet(Wallet):
+    """
+    Wallet backed by Winternitz one-time keys.
+    Signatures and public keys are 4-8x smaller than Lamport ones,
+    at the cost of up to w - 1 hashes per chain.
+    """
+
+    def __init__(self, w=WINTERNITZ_W, seed=None):
+        super().__init__(scheme="wots", seed=seed, w=w)
+
+    @classmethod
+    def from_seed(cls, seed: bytes, w=WINTERNITZ_W):
+        """Reload a WOTS wallet from its 32-byte seed."""
+        return cls(w=w, seed=seed)
+
 
 # ---------------- TEST WALLET ----------------
 if __name__ == "__main__":
@@ -54,4 +126,16 @@ if __name__ == "__main__":
     message = "Test Transaction"
     wallet.sign(message)
 
-    print("Message signed successfully.")
\ No newline at end of file
+    print("Message signed successfully.")
+
+    restored = Wallet.from_seed(Wallet().get_seed())
+    print("Seeded wallet restored:", restored.get_address())
+
+    merkle_wallet = MerkleWallet()
+    merkle_wallet.sign("first")
+    merkle_wallet.sign("second")
+    print("Merkle wallet address after 2 signatures:", merkle_wallet.get_address())
+
+    wots_wallet = WotsWallet()
+    wots_wallet.sign(message)
+    print("WOTS wallet address:", wots_wallet.get_address())